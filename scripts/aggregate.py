@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Precompute aggregate statistics for the site build.
+
+Reads every data/<year>.jsonl partition (or compacted data/<year>.jsonl.gz)
+through crawl.datastore, and google_cny_lny.csv, and writes one compact
+JSON artifact (site/public/stats.json) with:
+
+  - counts by term x entity_type x country_or_region x context
+  - entries per site column (CNY, LNY or both), for the home page counts
+  - monthly time series of entries by captured_on, per term, joined with
+    the Google Trends interest for the same month
+
+Per-partition aggregates are cached by content hash in .cache/aggregate/,
+so only changed partitions are re-read. Uses only the Python standard
+library.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import sys
+
+from crawl.columns import column
+from crawl.config import TERM_KEY_TO_STRING
+from crawl.datastore import DataStore
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+TRENDS_CSV = os.path.join(ROOT_DIR, "google_cny_lny.csv")
+CACHE_DIR = os.path.join(ROOT_DIR, ".cache", "aggregate")
+OUTPUT_PATH = os.path.join(ROOT_DIR, "site", "public", "stats.json")
+
+CACHE_VERSION = 2
+DIMENSIONS = ["term", "entity_type", "country_or_region", "context"]
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def entry_terms(entry):
+    """Schema term strings for an entry; arrays count once per term."""
+    term = entry.get("term_used")
+    items = term if isinstance(term, list) else [term]
+    return [TERM_KEY_TO_STRING.get(t, t) for t in items if isinstance(t, str)]
+
+
+def aggregate_partition(store, year):
+    """Return {"counts": {key: n}, "months": {YYYY-MM: {term: n}},
+    "columns": {"c"|"l"|"b": n}, "entries": n}."""
+    counts = {}
+    columns = {}
+    months = {}
+    total = 0
+    for entry in store.iter_entries(year):
+        total += 1
+        col = column(entry)
+        columns[col] = columns.get(col, 0) + 1
+        month = entry.get("captured_on", "")[:7]
+        for term in entry_terms(entry):
+            key = "\t".join([
+                term,
+                entry.get("entity_type", ""),
+                entry.get("country_or_region", ""),
+                entry.get("context", ""),
+            ])
+            counts[key] = counts.get(key, 0) + 1
+            if month:
+                bucket = months.setdefault(month, {})
+                bucket[term] = bucket.get(term, 0) + 1
+    return {"counts": counts, "months": months, "columns": columns, "entries": total}
+
+
+def load_trends(path):
+    """Return {YYYY-MM: {"lunar_new_year": n, "chinese_new_year": n}}."""
+    trends = {}
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # header
+        for row in reader:
+            if len(row) < 3:
+                continue
+            trends[row[0][:7]] = {
+                "lunar_new_year": int(row[1]),
+                "chinese_new_year": int(row[2]),
+            }
+    return trends
+
+
+def cached(name, digest, compute):
+    """Return compute() for an input, reusing the cached result if unchanged."""
+    path = os.path.join(CACHE_DIR, f"{name}.json")
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION and data.get("sha256") == digest:
+                return data["result"], False
+        except (OSError, json.JSONDecodeError, KeyError):
+            pass
+    result = compute()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "sha256": digest, "result": result},
+                  f, ensure_ascii=False)
+    return result, True
+
+
+def build_stats(partials, trends):
+    counts = {}
+    months = {}
+    columns = {"c": 0, "l": 0, "b": 0}
+    total = 0
+    for partial in partials.values():
+        total += partial["entries"]
+        for col, n in partial["columns"].items():
+            columns[col] += n
+        for key, n in partial["counts"].items():
+            counts[key] = counts.get(key, 0) + n
+        for month, terms in partial["months"].items():
+            bucket = months.setdefault(month, {})
+            for term, n in terms.items():
+                bucket[term] = bucket.get(term, 0) + n
+
+    by_term = {}
+    rows = []
+    for key in sorted(counts):
+        row = key.split("\t")
+        rows.append(row + [counts[key]])
+        by_term[row[0]] = by_term.get(row[0], 0) + counts[key]
+
+    timeseries = []
+    for month in sorted(set(months) | set(trends)):
+        timeseries.append({
+            "month": month,
+            "entries": months.get(month, {}),
+            "trends": trends.get(month),
+        })
+
+    return {
+        "total_entries": total,
+        "by_term": by_term,
+        "by_column": {"cny": columns["c"], "lny": columns["l"], "both": columns["b"]},
+        "counts": {"dimensions": DIMENSIONS + ["count"], "rows": rows},
+        "timeseries": timeseries,
+    }
+
+
+def main():
+    output = sys.argv[1] if len(sys.argv) > 1 else OUTPUT_PATH
+
+    inputs = {}
+    partials = {}
+    changed = False
+    store = DataStore()
+    for year in store.years():
+        digest = file_sha256(store.source_path(year))
+        inputs[str(year)] = digest
+        partials[str(year)], fresh = cached(
+            str(year), digest, lambda y=year: aggregate_partition(store, y))
+        changed = changed or fresh
+
+    trends = {}
+    if os.path.exists(TRENDS_CSV):
+        digest = file_sha256(TRENDS_CSV)
+        inputs["google_trends"] = digest
+        trends, fresh = cached("google_trends", digest, lambda: load_trends(TRENDS_CSV))
+        changed = changed or fresh
+
+    if not changed and os.path.exists(output):
+        try:
+            with open(output, "r", encoding="utf-8") as f:
+                if json.load(f).get("inputs") == inputs:
+                    print(f"Stats up to date: {os.path.relpath(output, ROOT_DIR)}")
+                    return
+        except (OSError, json.JSONDecodeError):
+            pass
+
+    stats = {"inputs": inputs}
+    stats.update(build_stats(partials, trends))
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(stats, f, ensure_ascii=False, separators=(",", ":"))
+
+    print(f"Wrote {os.path.relpath(output, ROOT_DIR)}: {stats['total_entries']} "
+          f"entry/entries across {len(partials)} partition(s).")
+
+
+if __name__ == "__main__":
+    main()
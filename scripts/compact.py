@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Compact closed years of the dataset into block-gzip archives.
+
+Usage:
+    python scripts/compact.py 2025              # data/2025.jsonl -> data/2025.jsonl.gz
+    python scripts/compact.py --all-closed      # Every year before the current one
+
+A compacted year is sorted by entity and stored as independently
+decompressible gzip blocks with a data/<year>.blocks.json block table.
+The crawler, validate.py, aggregate.py and the site read it transparently.
+It is read-only: new entries for it are rejected.
+"""
+
+import argparse
+import logging
+import sys
+
+from crawl.config import CURRENT_YEAR
+from crawl.datastore import DataStore
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compact closed data/<year>.jsonl partitions into block-gzip archives",
+    )
+    parser.add_argument("years", nargs="*", type=int, help="Years to compact")
+    parser.add_argument(
+        "--all-closed", action="store_true",
+        help=f"Compact every plain partition before {CURRENT_YEAR}",
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Allow compacting the current (still open) year",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    store = DataStore()
+    years = list(args.years)
+    if args.all_closed:
+        years += [y for y in store.years() if y < CURRENT_YEAR and not store.is_archived(y)]
+    if not years:
+        parser.error("Give years to compact or --all-closed")
+    open_years = [y for y in years if y >= CURRENT_YEAR]
+    if open_years and not args.force:
+        parser.error(f"{', '.join(map(str, open_years))} is still open; use --force")
+
+    failed = False
+    for year in sorted(set(years)):
+        try:
+            result = store.compact(year)
+        except ValueError as e:
+            print(f"{year}: {e}", file=sys.stderr)
+            failed = True
+            continue
+        print(f"{year}: {result['entries']} entries in {result['blocks']} block(s), "
+              f"{result['plain_bytes']:,} -> {result['archive_bytes']:,} bytes")
+    store.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,40 @@ Usage:
     python scripts/crawl.py --twitter-only         # Twitter only
     python scripts/crawl.py --web-only             # Websites only
     python scripts/crawl.py --auto-threshold 0.60  # Lower bar for auto-add
+    python scripts/crawl.py --discover             # Also find pages via sitemaps/links
+    python scripts/crawl.py --due-only             # Only refetch URLs due for recrawl
+    python scripts/crawl.py --time-budget 20       # Most valuable fetches first, stop after 20 min
+    python scripts/crawl.py --time-budget 20 --resume  # Continue the work a budgeted run left
+    python scripts/crawl.py --profile both         # CPU and memory profile per pipeline stage
+
+Distributed crawl (outputs are staged under output/parts/ until merged):
+    python scripts/crawl.py --shard 0/4            # Crawl shard 0 of 4 (by domain)
+    python scripts/crawl.py --enqueue              # Fill (or refill) the work queue
+    python scripts/crawl.py --worker               # Pull domain batches until drained
+    python scripts/crawl.py --merge                # Merge staged outputs into data/
+
+Review queue (persistent across crawls):
+    python scripts/crawl.py review list --min-confidence 0.5
+    python scripts/crawl.py review export          # Pending rows to output/review_queue.jsonl
+    python scripts/crawl.py review accept 12 15    # Append to data/<year>.jsonl
+    python scripts/crawl.py review reject --entity "Acme"
+
+Terminology-change feed (pages whose terms changed between crawls):
+    python scripts/crawl.py changes --kind to_lunar --kind to_chinese
+    python scripts/crawl.py changes --after 120     # Only changes after feed id 120
+
+Daemon (warm caches, local control API; see crawl/daemon.py):
+    python scripts/crawl.py daemon --every 60      # Serve on 127.0.0.1:8787, due-only crawl hourly
+    python scripts/crawl.py daemon --socket /tmp/crawl.sock
+    AUTH="Authorization: Bearer $(cat .cache/crawl/daemon.token)"; JSON="Content-Type: application/json"
+    curl -H "$AUTH" -H "$JSON" -d '{"url": "https://example.com/lny"}' 127.0.0.1:8787/check
+    curl -H "$AUTH" -H "$JSON" -d '{"entity": "Apple", "dry_run": true}' 127.0.0.1:8787/crawl
 """
 
 import argparse
+import json
 import logging
+import os
 import sys
 
 # Load .env if python-dotenv is available
@@ -21,10 +51,171 @@ try:
 except ImportError:
     pass
 
-from crawl.pipeline import run_pipeline
+from crawl.config import OUTPUT_DIR
+from crawl.daemon import DEFAULT_PORT, CrawlDaemon, serve
+from crawl.history import KINDS, HistoryStore
+from crawl.output import REVIEW_QUEUE_NAME
+from crawl.profiling import MODES, Profiler
+from crawl.pipeline import (
+    accept_review, enqueue_targets, export_review, merge_shards, run_pipeline,
+    run_shard, run_worker,
+)
+from crawl.reviewstore import STATES, ReviewStore
+from crawl.sharding import parse_shard
+from crawl.targets import TargetsError
+from crawl.workqueue import QUEUE_PATH
+
+
+def review_main(argv: list[str]):
+    parser = argparse.ArgumentParser(
+        prog="crawl.py review",
+        description="List, export, accept or reject candidates in the review queue",
+    )
+    parser.add_argument("action", choices=("list", "export", "accept", "reject"))
+    parser.add_argument("ids", nargs="*", type=int, help="Candidate ids (see 'list')")
+    parser.add_argument(
+        "--state", choices=(*STATES, "all"), default="pending",
+        help="State to list/export (default: pending)",
+    )
+    parser.add_argument("--entity", type=str, default=None,
+                        help="Filter by entity name (substring match)")
+    parser.add_argument("--term", type=str, default=None,
+                        help="Filter by term (e.g. lunar_new_year)")
+    parser.add_argument("--min-confidence", type=float, default=None,
+                        help="Filter by minimum confidence score")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Max candidates to list/export")
+    parser.add_argument(
+        "--output", type=str, default=os.path.join(OUTPUT_DIR, REVIEW_QUEUE_NAME),
+        help="Export path (default: scripts/crawl/output/review_queue.jsonl)",
+    )
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Show what accept would do without writing")
+    args = parser.parse_args(argv)
+
+    filters = dict(entity=args.entity, term=args.term, min_confidence=args.min_confidence)
+    state = None if args.state == "all" else args.state
+    if args.action in ("accept", "reject") and not args.ids and not any(
+            v is not None for v in filters.values()):
+        parser.error(f"{args.action} needs candidate ids or a filter")
+
+    if args.action == "export":
+        count = export_review(args.output, state=state, limit=args.limit, **filters)
+        print(f"Exported {count} candidate(s) to {args.output}")
+        return
+    if args.action == "accept":
+        result = accept_review(ids=args.ids or None, dry_run=args.dry_run, **filters)
+        print(f"Accepted {result['accepted']} candidate(s), "
+              f"appended {result['appended']} new entr{'y' if result['appended'] == 1 else 'ies'}"
+              + (" (dry run)" if args.dry_run else ""))
+        return
+
+    store = ReviewStore()
+    try:
+        if args.action == "reject":
+            selected = store.query(state="pending", ids=args.ids or None, **filters)
+            rejected = store.set_state([c["id"] for c in selected], "rejected")
+            print(f"Rejected {rejected} candidate(s)")
+            return
+        candidates = store.query(state=state, ids=args.ids or None, limit=args.limit,
+                                 **filters)
+        for c in candidates:
+            terms = c["entry"].get("term_used")
+            terms = ", ".join(terms) if isinstance(terms, list) else terms
+            print(f"{c['id']:>6}  {c['confidence']:.3f}  {c['state']:<8}  "
+                  f"{c['entity_name']}  [{terms}]  {c['source_url']}")
+            if c["factors"]:
+                print("        " + "  ".join(f"{k}={v:g}" for k, v in c["factors"].items()))
+        counts = store.counts()
+        print(f"\n{len(candidates)} shown; queue: "
+              + ", ".join(f"{counts.get(s, 0)} {s}" for s in STATES))
+    finally:
+        store.close()
+
+
+def changes_main(argv: list[str]):
+    parser = argparse.ArgumentParser(
+        prog="crawl.py changes",
+        description="Print the terminology-change feed as JSON lines, oldest first",
+    )
+    parser.add_argument("--after", type=int, default=0, metavar="ID",
+                        help="Only changes with a feed id above ID (the last one read)")
+    parser.add_argument("--since", type=str, default=None,
+                        help="Only changes observed on or after this ISO date")
+    parser.add_argument("--entity", type=str, default=None,
+                        help="Filter by entity name (substring match)")
+    parser.add_argument("--kind", choices=KINDS, action="append", default=None,
+                        help="Filter by kind of change (repeatable)")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Max changes to print")
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(read_only=True)
+    try:
+        for change in store.changes(after=args.after, since=args.since, entity=args.entity,
+                                    kinds=args.kind, limit=args.limit):
+            print(json.dumps(change.to_dict(), ensure_ascii=False))
+    finally:
+        store.close()
+
+
+def daemon_main(argv: list[str]):
+    parser = argparse.ArgumentParser(
+        prog="crawl.py daemon",
+        description="Keep crawl state warm and serve a local control API",
+    )
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"Port on 127.0.0.1 to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--socket", type=str, default=None,
+                        help="Listen on this Unix socket instead of a port")
+    parser.add_argument("--every", type=float, default=None, metavar="MINUTES",
+                        help="Start a due-only crawl of all targets every MINUTES")
+    parser.add_argument(
+        "--targets-file", type=str, default=None,
+        help="Path to targets YAML file (default: scripts/crawl/targets.yaml)",
+    )
+    parser.add_argument("--auto-threshold", type=float, default=0.70,
+                        help="Minimum confidence score for auto-adding (default: 0.70)")
+    parser.add_argument("--review-threshold", type=float, default=0.40,
+                        help="Minimum confidence score for review queue (default: 0.40)")
+    parser.add_argument("--http2", action="store_true",
+                        help="Use HTTP/2 (requires httpx[http2])")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                        help="Enable debug logging")
+    args = parser.parse_args(argv)
+    if args.every is not None and args.every <= 0:
+        parser.error("--every must be positive")
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        datefmt="%H:%M:%S",
+    )
+    daemon = CrawlDaemon(
+        targets_path=args.targets_file,
+        http2=args.http2,
+        every=args.every * 60 if args.every else None,
+        auto_threshold=args.auto_threshold,
+        review_threshold=args.review_threshold,
+    )
+    try:
+        serve(daemon, port=args.port, socket_path=args.socket)
+    except (TargetsError, ImportError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
 
 def main():
+    if sys.argv[1:2] == ["review"]:
+        review_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["changes"]:
+        changes_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["daemon"]:
+        daemon_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         description="Crawl targeted websites and Twitter for CNY/LNY terminology",
     )
@@ -40,6 +231,14 @@ def main():
         "--entity", type=str, default=None,
         help="Filter to a single entity by name (substring match)",
     )
+    parser.add_argument(
+        "--entity-type", type=str, default=None,
+        help="Filter to targets of one entity_type (e.g. gov)",
+    )
+    parser.add_argument(
+        "--country", type=str, default=None,
+        help="Filter to targets in one country_or_region (e.g. US)",
+    )
     parser.add_argument(
         "--web-only", action="store_true",
         help="Only crawl website URLs, skip Twitter",
@@ -65,10 +264,94 @@ def main():
         help="Path to targets YAML file (default: scripts/crawl/targets.yaml)",
     )
 
+    parser.add_argument(
+        "--discover", action="store_true",
+        help="Discover extra URLs from sitemaps and same-site links for every target "
+             "(targets with 'discover:' in targets.yaml always do)",
+    )
+    parser.add_argument(
+        "--discover-budget", type=int, default=5,
+        help="Max discovered URLs to fetch per target (default: 5)",
+    )
+    parser.add_argument(
+        "--due-only", action="store_true",
+        help="Only fetch URLs whose adaptive recrawl interval has elapsed "
+             "(fetched fresh, bypassing the disk cache)",
+    )
+    parser.add_argument(
+        "--time-budget", type=float, default=None, metavar="MINUTES",
+        help="Fetch URLs in order of expected yield per second (from recrawl history) "
+             "and stop cleanly after this many minutes, saving the work left",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Only process the work a previous --time-budget run left unfinished",
+    )
+    parser.add_argument(
+        "--shard", type=str, default=None, metavar="I/N",
+        help="Crawl only the domains owned by shard I of N (0-based, consistent hashing)",
+    )
+    parser.add_argument(
+        "--enqueue", action="store_true",
+        help="Add every target domain to the work queue and exit",
+    )
+    parser.add_argument(
+        "--reset", action="store_true",
+        help="With --enqueue: empty the queue first (drops old domains and leases)",
+    )
+    parser.add_argument(
+        "--worker", action="store_true",
+        help="Lease domain batches from the work queue until it is empty",
+    )
+    parser.add_argument(
+        "--queue", type=str, default=QUEUE_PATH,
+        help="Path to the SQLite work queue (default: scripts/crawl/output/queue.sqlite)",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=10,
+        help="Domains per worker lease (default: 10)",
+    )
+    parser.add_argument(
+        "--http2", action="store_true",
+        help="Fetch over HTTP/2 with multiplexed connections (requires httpx[http2])",
+    )
+    parser.add_argument(
+        "--warc", action="store_true",
+        help="Archive fetched pages as WARC evidence in evidence/warc/ and "
+             "link auto-added entries to their record",
+    )
+    parser.add_argument(
+        "--no-render", action="store_true",
+        help="Skip the headless-browser pass for targets flagged render: true",
+    )
+    parser.add_argument(
+        "--merge", action="store_true",
+        help="Merge staged shard/worker outputs into data/ and exit",
+    )
+    parser.add_argument(
+        "--profile", choices=MODES, default=None,
+        help="Profile CPU (cProfile + sampled stacks), memory (tracemalloc) or both, "
+             "per pipeline stage; results go next to crawl_report.json",
+    )
+
     args = parser.parse_args()
 
     if args.web_only and args.twitter_only:
         parser.error("Cannot use both --web-only and --twitter-only")
+    if sum(bool(x) for x in (args.shard, args.worker, args.enqueue, args.merge)) > 1:
+        parser.error("Use only one of --shard, --worker, --enqueue, --merge")
+    if args.time_budget is not None and args.time_budget <= 0:
+        parser.error("--time-budget must be positive")
+    if args.worker and (args.time_budget or args.resume):
+        parser.error("--time-budget and --resume apply to single runs, not --worker")
+    if args.resume and args.shard:
+        parser.error("--resume cannot be combined with --shard")
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
 
     # Configure logging
     level = logging.DEBUG if args.verbose else logging.INFO
@@ -78,9 +361,21 @@ def main():
         datefmt="%H:%M:%S",
     )
 
-    result = run_pipeline(
+    if args.merge:
+        merged = merge_shards(dry_run=args.dry_run)
+        print(f"Merged {merged['parts']} part(s): {merged['auto_added']} auto-added, "
+              f"{merged['review_queue']} for review")
+        return
+    if args.enqueue:
+        added = enqueue_targets(args.targets_file, args.queue, reset=args.reset)
+        print(f"Enqueued {added} domain(s) in {args.queue}")
+        return
+
+    options = dict(
         targets_path=args.targets_file,
         entity_filter=args.entity,
+        entity_type=args.entity_type,
+        country=args.country,
         web_only=args.web_only,
         twitter_only=args.twitter_only,
         dry_run=args.dry_run,
@@ -88,7 +383,33 @@ def main():
         max_targets=args.max_targets,
         auto_threshold=args.auto_threshold,
         review_threshold=args.review_threshold,
+        discover=args.discover,
+        discover_budget=args.discover_budget,
+        due_only=args.due_only,
+        http2=args.http2,
+        warc=args.warc,
+        render=not args.no_render,
+        time_budget=args.time_budget * 60 if args.time_budget else None,
+        resume=args.resume,
     )
+    profiler = Profiler(args.profile, output_dir=OUTPUT_DIR, name="crawl")
+    if args.profile:
+        options["profiler"] = profiler
+    profiler.start()
+    try:
+        if shard:
+            result = run_shard(shard[0], shard[1], **options)
+        elif args.worker:
+            options.pop("targets_path")
+            result = run_worker(args.queue, batch_size=args.batch_size,
+                                targets_path=args.targets_file, **options)
+        else:
+            result = run_pipeline(**options)
+    except (TargetsError, ImportError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        profile_paths = profiler.stop()
 
     if "error" in result:
         print(f"Error: {result['error']}", file=sys.stderr)
@@ -98,14 +419,44 @@ def main():
     print("\n--- Crawl Summary ---")
     print(f"  Targets processed: {result['targets_processed']}")
     print(f"  URLs fetched:      {result['urls_fetched']}")
+    print(f"  URLs discovered:   {result['urls_discovered']}")
+    if result.get("feed_items"):
+        print(f"  New feed items:    {result['feed_items']}")
+    if result.get("urls_rendered"):
+        print(f"  URLs rendered:     {result['urls_rendered']}")
+    if args.due_only:
+        print(f"  Skipped (not due): {result['skipped_not_due']}")
     print(f"  Auto-added:        {result['auto_added']}")
     print(f"  Review queue:      {result['review_queue']}")
     print(f"  Discarded:         {result['discarded']}")
     print(f"  Skipped (dedup):   {result['skipped_dedup']}")
+    if result.get("skipped_rejected"):
+        print(f"  Skipped (rejected): {result['skipped_rejected']}")
+    if result.get("skipped_circuit_open"):
+        print(f"  Skipped (circuit open): {result['skipped_circuit_open']}")
+    if result.get("skipped_prefiltered"):
+        print(f"  Skipped (no term in cache): {result['skipped_prefiltered']}")
+    if result.get("terminology_changes"):
+        print(f"  Terminology changes: {result['terminology_changes']}")
+    print(f"  Near-duplicates:   {result['near_duplicates']}")
+    if "batches" in result:
+        print(f"  Batches:           {result['batches']}")
+    budget = result.get("budget")
+    if budget:
+        print(f"  Work processed:    {budget['processed']} of {budget['planned']}")
+        if budget["resume_path"]:
+            print(f"  Work left:         {budget['remaining']} (continue with --resume)")
+    transport = result.get("transport")
+    if transport and transport["requests"]:
+        print(f"  Connections:       {transport['connections_opened']} opened, "
+              f"{transport['connections_reused']} reused "
+              f"({transport['reuse_ratio']:.0%} of {transport['requests']} requests)")
     if result['errors']:
         print(f"  Errors:            {len(result['errors'])}")
         for err in result['errors']:
             print(f"    - {err}")
+    for path in profile_paths:
+        print(f"  Profile:           {os.path.relpath(path)}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+"""Block-gzip archives of closed year partitions (BGZF-style).
+
+A compacted year is stored as ``data/<year>.jsonl.gz``: its entries,
+sorted by entity, packed into blocks of whole lines of at most 64 KiB,
+each block its own gzip member. The file is therefore still a valid gzip
+stream of JSONL, and any block can be decompressed on its own. The
+sidecar ``data/<year>.blocks.json`` lists every block's file offset,
+compressed and raw size, and the first and last entity in it.
+
+Entries are addressed by virtual offsets as in BGZF:
+``block_offset << 16 | offset_within_block``.
+"""
+from __future__ import annotations
+
+import bisect
+import gzip
+import json
+import os
+import zlib
+from collections import OrderedDict
+from typing import Iterable, Iterator
+
+BLOCK_SIZE = 1 << 16
+BLOCKS_VERSION = 1
+_CACHED_BLOCKS = 8
+
+
+def archive_path(year: int, data_dir: str) -> str:
+    return os.path.join(data_dir, f"{year}.jsonl.gz")
+
+
+def blocks_path(year: int, data_dir: str) -> str:
+    return os.path.join(data_dir, f"{year}.blocks.json")
+
+
+def entity_sort_key(entry: dict) -> tuple[str, str, str]:
+    sources = entry.get("sources") or [{}]
+    return (str(entry.get("entity_name", "")).casefold(),
+            str(entry.get("captured_on", "")), str(sources[0].get("url", "")))
+
+
+def write_archive(entries: Iterable[dict], path: str, sidecar: str) -> dict:
+    """Write ``entries`` (already sorted) as a block-gzip archive.
+
+    Returns the block table that is also written to ``sidecar``.
+    """
+    blocks: list[list] = []  # [offset, size, raw_size, first_entity, last_entity]
+    lines: list[bytes] = []
+    names: list[str] = []
+    raw_size = 0
+    count = 0
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        def flush():
+            data = gzip.compress(b"".join(lines), mtime=0)
+            blocks.append([f.tell(), len(data), raw_size, names[0], names[-1]])
+            f.write(data)
+
+        for entry in entries:
+            line = json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n"
+            # A block never splits a line, so every line starts below 64 KiB
+            if lines and raw_size + len(line) > BLOCK_SIZE:
+                flush()
+                lines, names, raw_size = [], [], 0
+            lines.append(line)
+            names.append(str(entry.get("entity_name", "")))
+            raw_size += len(line)
+            count += 1
+        if lines:
+            flush()
+    table = {"version": BLOCKS_VERSION, "entries": count, "blocks": blocks}
+    with open(sidecar + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+    os.replace(sidecar + ".tmp", sidecar)
+    return table
+
+
+class BlockReader:
+    """Random access to the lines of a block-gzip archive.
+
+    Recently used blocks are kept decompressed, so reading the entries of
+    one block in order costs a single decompression.
+    """
+
+    def __init__(self, path: str, sidecar: str):
+        self._path = path
+        with open(sidecar, "r", encoding="utf-8") as f:
+            table = json.load(f)
+        if table.get("version") != BLOCKS_VERSION:
+            raise ValueError(f"{sidecar}: unsupported block table version")
+        self.entries = table["entries"]
+        self.blocks = table["blocks"]
+        self._offsets = [b[0] for b in self.blocks]
+        self._cache: OrderedDict[int, bytes] = OrderedDict()
+        self._file = None
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _block(self, offset: int) -> bytes:
+        data = self._cache.get(offset)
+        if data is not None:
+            self._cache.move_to_end(offset)
+            return data
+        i = bisect.bisect_left(self._offsets, offset)
+        if i == len(self._offsets) or self._offsets[i] != offset:
+            raise ValueError(f"{self._path}: no block at offset {offset}")
+        if self._file is None:
+            self._file = open(self._path, "rb")
+        self._file.seek(offset)
+        data = zlib.decompress(self._file.read(self.blocks[i][1]), 16 + zlib.MAX_WBITS)
+        self._cache[offset] = data
+        if len(self._cache) > _CACHED_BLOCKS:
+            self._cache.popitem(last=False)
+        return data
+
+    def read_at(self, virtual_offset: int) -> bytes:
+        """The line (without newline) at a virtual offset."""
+        data = self._block(virtual_offset >> 16)
+        start = virtual_offset & 0xFFFF
+        end = data.find(b"\n", start)
+        return data[start:end if end != -1 else len(data)]
+
+    def iter_lines(self, blocks: list[list] | None = None) -> Iterator[tuple[int, bytes]]:
+        """Yield ``(virtual_offset, line)`` for every line of ``blocks`` (default all)."""
+        for block in self.blocks if blocks is None else blocks:
+            data = self._block(block[0])
+            start = 0
+            while start < len(data):
+                end = data.find(b"\n", start)
+                end = len(data) if end == -1 else end
+                yield block[0] << 16 | start, data[start:end]
+                start = end + 1
+
+    def blocks_for_entity(self, entity_name: str) -> list[list]:
+        """Blocks whose entity range can contain ``entity_name`` (compared casefolded)."""
+        key = entity_name.casefold()
+        return [b for b in self.blocks if b[3].casefold() <= key <= b[4].casefold()]
@@ -0,0 +1,140 @@
+"""Per-domain circuit breaker with failure memory across runs.
+
+A domain's circuit opens after ``CIRCUIT_FAILURE_THRESHOLD`` consecutive
+failed requests (connection errors, timeouts, 403/429/5xx after retries).
+While it is open, requests to the domain are skipped without touching the
+network. Once the cool-off passes, one probe request is let through: success
+closes the circuit, failure reopens it with double the cool-off. The
+state is saved, so a domain that was down yesterday is not retried today
+until its cool-off ends.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+
+from .config import (
+    CACHE_DIR, CIRCUIT_BASE_COOLOFF, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_MAX_COOLOFF,
+)
+from .targets import url_domain
+
+logger = logging.getLogger(__name__)
+
+CIRCUITS_PATH = os.path.join(CACHE_DIR, "circuits.json")
+
+# Statuses that mean the site is down or refusing us, not that a page is missing
+FAILURE_STATUS_CODES = {403, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class DomainCircuit:
+    failures: int = 0        # consecutive failures
+    trips: int = 0           # times opened since the last success
+    open_until: str = ""     # ISO timestamp; empty when closed
+    last_failure: str = ""   # ISO timestamp
+    last_error: str = ""
+
+
+class CircuitBreaker:
+    """Persistent per-domain failure counts and open/closed state."""
+
+    def __init__(self, path: str = CIRCUITS_PATH,
+                 threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 base_cooloff: timedelta = CIRCUIT_BASE_COOLOFF,
+                 max_cooloff: timedelta = CIRCUIT_MAX_COOLOFF):
+        self._path = path
+        self._threshold = threshold
+        self._base_cooloff = base_cooloff
+        self._max_cooloff = max_cooloff
+        self._circuits = self._read()
+        self._changed: set[str] = set()  # domains updated (or closed) since the last save
+        self._short_circuited: dict[str, int] = {}  # domain -> requests skipped this run
+
+    def _read(self) -> dict[str, DomainCircuit]:
+        if not os.path.exists(self._path):
+            return {}
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {d: DomainCircuit(**c) for d, c in data.get("domains", {}).items()}
+        except (OSError, json.JSONDecodeError, TypeError) as e:
+            logger.warning("Ignoring unreadable circuit state %s: %s", self._path, e)
+            return {}
+
+    def save(self) -> None:
+        # Re-read so concurrent shards/workers do not drop each other's updates
+        circuits = self._read()
+        for domain in self._changed:
+            if domain in self._circuits:
+                circuits[domain] = self._circuits[domain]
+            else:
+                circuits.pop(domain, None)
+        data = {"version": 1, "domains": {d: asdict(c) for d, c in circuits.items()}}
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            tmp = f"{self._path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self._path)
+        except OSError as e:
+            logger.warning("Circuit state write failed: %s", e)
+            return
+        self._circuits = circuits
+        self._changed.clear()
+
+    def is_open(self, url: str, now: datetime | None = None) -> bool:
+        """True if requests to ``url``'s domain should be skipped for now."""
+        circuit = self._circuits.get(url_domain(url))
+        if circuit is None or not circuit.open_until:
+            return False
+        # Past the cool-off the circuit is half-open: the next request probes
+        return (now or datetime.now()) < datetime.fromisoformat(circuit.open_until)
+
+    def allow(self, url: str, now: datetime | None = None) -> bool:
+        """Like ``not is_open``, but counts the skipped request."""
+        if not self.is_open(url, now):
+            return True
+        domain = url_domain(url)
+        self._short_circuited[domain] = self._short_circuited.get(domain, 0) + 1
+        return False
+
+    def record_success(self, url: str) -> None:
+        domain = url_domain(url)
+        if domain in self._circuits:
+            self._changed.add(domain)
+            if self._circuits[domain].trips:
+                logger.info("Circuit closed for %s", domain)
+            del self._circuits[domain]
+
+    def record_failure(self, url: str, error: str = "",
+                       now: datetime | None = None) -> None:
+        now = now or datetime.now()
+        domain = url_domain(url)
+        circuit = self._circuits.setdefault(domain, DomainCircuit())
+        self._changed.add(domain)
+        circuit.failures += 1
+        circuit.last_failure = now.isoformat(timespec="seconds")
+        circuit.last_error = error[:200]
+        # A failed half-open probe reopens at once; otherwise wait for the threshold
+        if circuit.open_until or circuit.failures >= self._threshold:
+            circuit.trips += 1
+            cooloff = min(self._base_cooloff * 2 ** (circuit.trips - 1), self._max_cooloff)
+            circuit.open_until = (now + cooloff).isoformat(timespec="seconds")
+            logger.warning("Circuit open for %s until %s after %d failure(s): %s",
+                           domain, circuit.open_until, circuit.failures, error)
+
+    def open_circuits(self, now: datetime | None = None) -> list[dict]:
+        """Open circuits, soonest to close first, for the crawl report."""
+        now = now or datetime.now()
+        return sorted(
+            ({"domain": domain, **asdict(c), "skipped": self._short_circuited.get(domain, 0)}
+             for domain, c in self._circuits.items()
+             if c.open_until and now < datetime.fromisoformat(c.open_until)),
+            key=lambda c: c["open_until"])
+
+    def stats(self) -> dict:
+        return {"short_circuited": sum(self._short_circuited.values()),
+                "open": self.open_circuits()}
@@ -0,0 +1,17 @@
+"""Which column of the site an entry is shown in.
+
+Shared by the build scripts (aggregate.py, search_index.py); uses only the
+standard library.
+"""
+from __future__ import annotations
+
+
+def column(entry: dict) -> str:
+    """'c', 'l' or 'b' (both), as classifyEntry in site/src/types/entry.ts."""
+    term = entry.get("term_used")
+    terms = term if isinstance(term, list) else [term]
+    chinese = any("chinese" in str(t).lower() for t in terms)
+    lunar = any("lunar" in str(t).lower() for t in terms)
+    if chinese and lunar:
+        return "b"
+    return "l" if lunar else "c"
@@ -1,7 +1,8 @@
-"""Constants, term regex patterns, and default paths."""
+"""Constants, regex patterns, and default paths."""
 
 import os
 import re
+from datetime import date, timedelta
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.dirname(os.path.dirname(SCRIPT_DIR))
@@ -10,19 +11,21 @@ SCHEMA_PATH = os.path.join(DATA_DIR, "schema.json")
 CACHE_DIR = os.path.join(ROOT_DIR, ".cache", "crawl")
 OUTPUT_DIR = os.path.join(SCRIPT_DIR, "output")
 TARGETS_PATH = os.path.join(SCRIPT_DIR, "targets.yaml")
+# Term phrases per language (see crawl/terms.py)
+TERMS_PATH = os.path.join(SCRIPT_DIR, "terms.yaml")
+EXPORT_DIR = os.path.join(ROOT_DIR, "exports")
+EVIDENCE_DIR = os.path.join(ROOT_DIR, "evidence")
+WARC_DIR = os.path.join(EVIDENCE_DIR, "warc")
+TRENDS_CSV = os.path.join(ROOT_DIR, "google_cny_lny.csv")
 
-# Current year for data file
-CURRENT_YEAR = 2026
+# Current year for data file (the partition auto-added entries are written to)
+CURRENT_YEAR = int(os.environ.get("CNYVSLNY_YEAR", "2026"))
 DATA_FILE = os.path.join(DATA_DIR, f"{CURRENT_YEAR}.jsonl")
 
-# Term detection patterns — order matters for priority
-# Allow flexible whitespace, hyphens, and en-dashes between words
-TERM_PATTERNS = [
-    ("chinese_new_year", re.compile(r"Chinese[\s\-\u2010-\u2015]+New[\s\-\u2010-\u2015]+Year", re.IGNORECASE)),
-    ("lunar_new_year", re.compile(r"Lunar[\s\-\u2010-\u2015]+New[\s\-\u2010-\u2015]+Year", re.IGNORECASE)),
-    ("spring_festival", re.compile(r"Spring[\s\-\u2010-\u2015]+Festival", re.IGNORECASE)),
-    ("spring_festival", re.compile(r"春节")),
-]
+# Allowed enum values (mirror data/schema.json)
+VALID_ENTITY_TYPES = {"company", "school", "gov", "media", "nonprofit", "app", "other"}
+VALID_CONTEXTS = {"social_post", "press_release", "product_ui", "email",
+                  "event_page", "website", "other"}
 
 # Map snake_case keys to schema string values (for single-term entries)
 TERM_KEY_TO_STRING = {
@@ -37,9 +40,25 @@ YEAR_RELEVANCE_PATTERNS = [
     re.compile(r"Year\s+of\s+the\s+(Horse|Snake)", re.IGNORECASE),
 ]
 
+# Lunar new year dates — recrawl scheduling tightens in the weeks around them
+LUNAR_NEW_YEAR_DATES = {
+    2025: date(2025, 1, 29),
+    2026: date(2026, 2, 17),
+    2027: date(2027, 2, 6),
+    2028: date(2028, 1, 26),
+    2029: date(2029, 2, 13),
+    2030: date(2030, 2, 3),
+}
+
 # Rate limiting
 DEFAULT_RATE_LIMIT = 1.0  # seconds between requests per domain
 
+# Per-domain circuit breaker: consecutive failures before a domain is
+# skipped, and its cool-off (doubled each time it fails again, up to the max)
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_BASE_COOLOFF = timedelta(hours=6)
+CIRCUIT_MAX_COOLOFF = timedelta(days=7)
+
 # Scoring thresholds
 AUTO_ADD_THRESHOLD = 0.55
 REVIEW_THRESHOLD = 0.40
@@ -48,5 +67,20 @@ REVIEW_THRESHOLD = 0.40
 USER_AGENT = "cnyvslny-crawler/1.0 (+https://github.com/cnyvslny/cnyvslny)"
 REQUEST_TIMEOUT = 15  # seconds
 
+# HTTP transport: connections per host, socket budget across hosts,
+# per-host pool size overrides, and DNS cache lifetime
+HTTP_POOL_SIZE = 4
+HTTP_MAX_SOCKETS = 64
+HTTP_HOST_POOL_SIZES = {}  # e.g. {"www.example.com": 8}
+DNS_CACHE_TTL = 300  # seconds
+
+# Headless rendering for targets flagged ``render: true``
+RENDER_POOL_SIZE = 2  # browser contexts
+RENDER_TIMEOUT = 20  # seconds per page
+RENDER_CONTEXT_MAX_PAGES = 50  # pages before a context is replaced
+
+# WARC evidence files rotate at this size (kept under GitHub's 50 MB warning)
+WARC_MAX_BYTES = 20 * 1024 * 1024
+
 # Contributor name for auto-added entries
 CONTRIBUTOR = "crawler"
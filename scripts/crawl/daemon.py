@@ -0,0 +1,498 @@
+"""Long-running crawl daemon with warm state and a local control API.
+
+A crawl run normally rebuilds everything at start-up: the dedup keys of
+data/ and their entity index, the term matcher, the targets, robots.txt
+files and HTTP connections. The daemon keeps them in memory between runs
+and serves a small JSON API on a loopback port or a Unix socket:
+
+  GET  /status  uptime, warm-state sizes, the current and last crawl
+  POST /check   {"url", "entity"?, "refresh"?, ...}: fetch (disk cache
+                first), extract and score one page; nothing is written
+  POST /crawl   run the pipeline with CLI-style options or an inline
+                "target" (targets.yaml format); scored candidates stream
+                back as NDJSON lines, then the run summary
+
+With ``every``, a due-only crawl of all targets also starts on that
+interval. One crawl runs at a time; checks are served alongside it.
+
+The API only listens locally, which does not stop a web page in a local
+browser from posting to it. So on the loopback port every request needs
+the token the daemon writes to ``TOKEN_PATH`` (owner-readable only) at
+start-up, as ``Authorization: Bearer <token>``; requests with an
+``Origin`` header or a Host other than 127.0.0.1/localhost are refused,
+and POST bodies must be ``application/json``. Access to a Unix socket is
+controlled by its file mode (0600) instead of the token.
+"""
+from __future__ import annotations
+
+import hmac
+import json
+import logging
+import os
+import secrets
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+from urllib.parse import urlparse
+
+from .config import AUTO_ADD_THRESHOLD, CACHE_DIR, REVIEW_THRESHOLD, TARGETS_PATH
+from .datastore import DataStore
+from .entities import DedupKeys
+from .entry import EntryCandidate
+from .existing import load_existing_keys
+from .extractors import get_extractor
+from .fetcher import Fetcher
+from .pipeline import route_for, run_pipeline, score_result
+from .rate_limiter import RateLimiter
+from .targets import Target, TargetURL, load_targets, targets_from_data, url_domain
+from .terms import get_term_matcher
+from .transport import Transport
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8787
+TOKEN_PATH = os.path.join(CACHE_DIR, "daemon.token")
+# Parsed robots.txt files are re-read after this long
+ROBOTS_TTL = timedelta(hours=24)
+_MAX_BODY = 1 << 20
+# /crawl request options and their types; "entity" is run_pipeline's entity_filter
+_CRAWL_OPTIONS = {
+    "entity": str, "entity_type": str, "country": str, "web_only": bool,
+    "twitter_only": bool, "dry_run": bool, "due_only": bool, "discover": bool,
+    "max_targets": int, "time_budget": (int, float), "render": bool, "warc": bool,
+}
+
+
+def write_token(path: str = TOKEN_PATH) -> str:
+    """A fresh API token, saved to ``path`` readable by its owner only."""
+    token = secrets.token_urlsafe(32)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.fchmod(fd, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    os.replace(tmp, path)
+    return token
+
+
+class Busy(Exception):
+    """Raised when a crawl is requested while another one is running."""
+
+
+def candidate_json(candidate: EntryCandidate, route: str) -> dict:
+    return {"route": route, "confidence": candidate.confidence,
+            "factors": candidate.factors, "entry": candidate.to_entry_dict()}
+
+
+def crawl_options(request: dict) -> dict:
+    """run_pipeline keyword arguments for a /crawl request; ValueError if invalid."""
+    unknown = set(request) - set(_CRAWL_OPTIONS) - {"target"}
+    if unknown:
+        raise ValueError(f"unknown option(s): {', '.join(sorted(unknown))}")
+    options = {}
+    for name, kind in _CRAWL_OPTIONS.items():
+        if name not in request:
+            continue
+        value = request[name]
+        if not isinstance(value, kind) or (kind is not bool and isinstance(value, bool)):
+            raise ValueError(f"invalid value for '{name}': {value!r}")
+        options[name] = value
+    if "entity" in options:
+        options["entity_filter"] = options.pop("entity")
+    if options.get("time_budget") is not None and options["time_budget"] <= 0:
+        raise ValueError("'time_budget' must be positive (seconds)")
+    if "target" in request:
+        # TargetsError is a ValueError
+        options["targets"] = targets_from_data({"targets": [request["target"]]}, "target")
+    return options
+
+
+class CrawlDaemon:
+    """Warm crawl state shared by checks and crawls."""
+
+    def __init__(self, targets_path: str | None = None, http2: bool = False,
+                 every: float | None = None,
+                 auto_threshold: float = AUTO_ADD_THRESHOLD,
+                 review_threshold: float = REVIEW_THRESHOLD):
+        self.targets_path = targets_path or TARGETS_PATH
+        self.auto_threshold = auto_threshold
+        self.review_threshold = review_threshold
+        self.transport = Transport(http2=http2)
+        self._every = every  # seconds between scheduled crawls
+        self._robots: dict = {}
+        self._robots_loaded = datetime.now()
+        # Checks and crawls wait on one rate limiter, so a check never hits a
+        # site sooner than the crawl politeness delay allows
+        self._rate_limiter = RateLimiter()
+        self._fetcher = self._check_fetcher()
+        self._extractor = get_extractor("website")
+        self._store = DataStore()
+        self._keys: DedupKeys | None = None
+        self._keys_signature: tuple | None = None
+        self._targets: list[Target] = []
+        self._targets_mtime: int | None = None
+        self._state_lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._started = datetime.now()
+        self._next_run: datetime | None = None
+        self._checks = 0
+        self.current_run: dict | None = None
+        self.last_run: dict | None = None
+
+    def start(self) -> None:
+        """Load the warm state and start the crawl schedule, if any."""
+        self.targets()
+        self.existing_keys()
+        get_term_matcher()
+        if self._every:
+            threading.Thread(target=self._schedule, name="crawl-schedule",
+                             daemon=True).start()
+
+    def close(self) -> None:
+        self._stop.set()
+        self.transport.close()
+
+    # --- Warm state ---
+
+    def _data_signature(self) -> tuple:
+        signature = []
+        for year in self._store.years():
+            st = os.stat(self._store.source_path(year))
+            signature.append((year, st.st_size, st.st_mtime_ns))
+        return tuple(signature)
+
+    def existing_keys(self) -> DedupKeys:
+        """Dedup keys of data/, reloaded when a partition changed on disk."""
+        with self._state_lock:
+            signature = self._data_signature()
+            if self._keys is None or signature != self._keys_signature:
+                self._keys = load_existing_keys(store=self._store)
+                self._keys_signature = signature
+                logger.info("Loaded %d existing entries for dedup", len(self._keys))
+            return self._keys
+
+    def targets(self) -> list[Target]:
+        """All targets, reloaded when the targets file changed."""
+        with self._state_lock:
+            mtime = os.stat(self.targets_path).st_mtime_ns
+            if mtime != self._targets_mtime:
+                self._targets = load_targets(self.targets_path)
+                self._targets_mtime = mtime
+                logger.info("Loaded %d target(s)", len(self._targets))
+            return self._targets
+
+    def _check_fetcher(self) -> Fetcher:
+        # No breaker: a check is an explicit request
+        return Fetcher(transport=self.transport, rate_limiter=self._rate_limiter,
+                       robots_cache=self._robots)
+
+    def robots_cache(self) -> dict:
+        """Shared robots.txt cache, replaced by an empty one once ROBOTS_TTL has passed.
+
+        A crawl keeps the dict it started with, so it never loses the
+        robots.txt files it already checked mid-run.
+        """
+        with self._state_lock:
+            if datetime.now() - self._robots_loaded > ROBOTS_TTL:
+                self._robots = {}
+                self._robots_loaded = datetime.now()
+                with self._check_lock:
+                    self._fetcher = self._check_fetcher()
+            return self._robots
+
+    def status(self) -> dict:
+        return {
+            "started": self._started.isoformat(timespec="seconds"),
+            "uptime_seconds": round((datetime.now() - self._started).total_seconds()),
+            "targets": len(self._targets),
+            "existing_keys": len(self._keys) if self._keys is not None else 0,
+            "robots_cached": len(self._robots),
+            "checks": self._checks,
+            "transport": self.transport.stats(),
+            "next_scheduled_run": (self._next_run.isoformat(timespec="seconds")
+                                   if self._next_run else None),
+            "current_run": self.current_run,
+            "last_run": self.last_run,
+        }
+
+    # --- Checks ---
+
+    def _resolve(self, request: dict, url: str) -> tuple[Target, TargetURL]:
+        """The target and target URL a checked URL belongs to."""
+        entity = request.get("entity")
+        if entity is not None and not isinstance(entity, str):
+            raise ValueError("'entity' must be a string")
+        targets = self.targets()
+        if entity:
+            target = next((t for t in targets
+                           if t.entity_name.casefold() == entity.casefold()), None)
+        else:
+            domain = url_domain(url)
+            target = next((t for t in targets
+                           if any(url_domain(u.url) == domain for u in t.urls + t.feeds)), None)
+            if target is None:
+                raise ValueError("no target lists this URL's domain; give 'entity'")
+        if target is None:
+            target = Target(entity_name=entity,
+                            entity_type=request.get("entity_type", "other"),
+                            country_or_region=request.get("country", ""))
+        listed = next((u for u in target.urls if u.url == url), None)
+        return target, listed or TargetURL(url=url,
+                                           context=request.get("context", "website"),
+                                           platform=request.get("platform", ""))
+
+    def check(self, request: dict) -> dict:
+        """Fetch, extract and score one URL without writing anything.
+
+        Pages in the disk cache are not refetched unless ``refresh`` is set.
+        Raises ValueError for a bad request.
+        """
+        url = request.get("url")
+        if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+            raise ValueError("'url' must be an http(s) URL")
+        target, target_url = self._resolve(request, url)
+        started = time.monotonic()
+        self.robots_cache()
+        with self._check_lock:
+            self._checks += 1
+            html = self._fetcher.fetch(url, refresh=bool(request.get("refresh")))
+            cached = self._fetcher.last_elapsed is None
+            result = (self._extractor.extract(html, url, target.entity_name)
+                      if html is not None else None)
+        response = {"url": url, "entity": target.entity_name, "fetched": html is not None,
+                    "cached": html is not None and cached, "candidate": None,
+                    "duplicate_of": None}
+        if result is not None:
+            candidate = EntryCandidate(
+                entity_name=target.entity_name,
+                entity_type=target.entity_type,
+                country_or_region=target.country_or_region,
+                terms_found=result.terms_found,
+                exact_phrase=result.exact_phrase,
+                context=target_url.context,
+                platform=target_url.platform,
+                source_url=url,
+                notes=f"Auto-crawled from {target_url.platform}",
+            )
+            route = route_for(score_result(candidate, result),
+                              self.auto_threshold, self.review_threshold)
+            response["candidate"] = candidate_json(candidate, route)
+            match = self.existing_keys().match(candidate.dedup_key)
+            response["duplicate_of"] = list(match) if match else None
+        response["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+        return response
+
+    # --- Crawls ---
+
+    def crawl(self, options: dict, emit: Callable[[dict], None] | None = None,
+              trigger: str = "api") -> dict:
+        """Run the pipeline on the warm state; raises Busy if a crawl is running.
+
+        ``emit`` receives every scored candidate as ``candidate_json``.
+        """
+        if not self._run_lock.acquire(blocking=False):
+            raise Busy("a crawl is already running")
+        try:
+            run = self.current_run = {"trigger": trigger, "options": {
+                k: v for k, v in options.items() if k != "targets"},
+                "started": datetime.now().isoformat(timespec="seconds"), "candidates": 0}
+
+            def on_candidate(candidate: EntryCandidate, route: str) -> None:
+                run["candidates"] += 1
+                if emit is not None:
+                    emit(candidate_json(candidate, route))
+
+            keys = self.existing_keys()
+            result = run_pipeline(
+                targets_path=self.targets_path,
+                auto_threshold=self.auto_threshold,
+                review_threshold=self.review_threshold,
+                transport=self.transport,
+                existing_keys=keys,
+                robots_cache=self.robots_cache(),
+                rate_limiter=self._rate_limiter,
+                on_candidate=on_candidate,
+                **options,
+            )
+            if not options.get("dry_run"):
+                # The run added what it wrote to the keys; don't reload for it
+                with self._state_lock:
+                    if self._keys is keys:
+                        self._keys_signature = self._data_signature()
+            run["finished"] = datetime.now().isoformat(timespec="seconds")
+            run["result"] = result
+            self.last_run = run
+            return result
+        finally:
+            self.current_run = None
+            self._run_lock.release()
+
+    def _schedule(self) -> None:
+        while True:
+            self._next_run = datetime.now() + timedelta(seconds=self._every)
+            if self._stop.wait(self._every):
+                return
+            try:
+                logger.info("Scheduled crawl starting")
+                self.crawl({"due_only": True}, trigger="schedule")
+            except Busy:
+                logger.info("Scheduled crawl skipped: a crawl is already running")
+            except Exception:
+                logger.exception("Scheduled crawl failed")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "cnyvslny-crawl"
+
+    @property
+    def crawl_daemon(self) -> CrawlDaemon:
+        return self.server.crawl_daemon
+
+    def address_string(self) -> str:
+        # Unix-socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("%s %s", self.address_string(), format % args)
+
+    def _send_json(self, status: int, obj: dict) -> None:
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _refused(self) -> bool:
+        """Answer and return True if the request may come from a browser page."""
+        if "Origin" in self.headers:
+            self._send_json(403, {"error": "cross-origin requests are not accepted"})
+            return True
+        hosts = self.server.allowed_hosts
+        if hosts is not None and (self.headers.get("Host") or "").lower() not in hosts:
+            self._send_json(403, {"error": "Host must be 127.0.0.1 or localhost"})
+            return True
+        token = self.server.token
+        if token is not None and not hmac.compare_digest(
+                (self.headers.get("Authorization") or "").encode("utf-8"),
+                f"Bearer {token}".encode("utf-8")):
+            self._send_json(401, {"error": f"missing or wrong token (see {TOKEN_PATH})"})
+            return True
+        return False
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > _MAX_BODY:
+            raise ValueError("request body too large")
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("request body must be a JSON object")
+        return body
+
+    def do_GET(self) -> None:
+        if self._refused():
+            return
+        if urlparse(self.path).path == "/status":
+            self._send_json(200, self.crawl_daemon.status())
+        else:
+            self._send_json(404, {"error": f"no such endpoint: GET {self.path}"})
+
+    def do_POST(self) -> None:
+        if self._refused():
+            return
+        path = urlparse(self.path).path
+        if path not in ("/check", "/crawl"):
+            self._send_json(404, {"error": f"no such endpoint: POST {self.path}"})
+            return
+        if self.headers.get_content_type() != "application/json":
+            self._send_json(415, {"error": "Content-Type must be application/json"})
+            return
+        try:
+            request = self._read_json()
+            if path == "/check":
+                self._send_json(200, self.crawl_daemon.check(request))
+                return
+            options = crawl_options(request)
+        except ValueError as e:  # includes JSON decode errors
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            logger.exception("Request failed")
+            self._send_json(500, {"error": str(e)})
+            return
+        self._stream_crawl(options)
+
+    def _stream_crawl(self, options: dict) -> None:
+        """Run a crawl, writing NDJSON events as it goes; the connection then closes."""
+        connected = True
+
+        def emit(event: dict) -> None:
+            nonlocal connected
+            if not connected:
+                return
+            try:
+                self.wfile.write(json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # The crawl still finishes; only the stream is lost
+                connected = False
+
+        if self.crawl_daemon.current_run is not None:
+            self._send_json(409, {"error": "a crawl is already running"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            result = self.crawl_daemon.crawl(
+                options, lambda c: emit({"event": "candidate", **c}))
+        except Busy as e:
+            emit({"event": "error", "error": str(e)})
+        except Exception as e:
+            logger.exception("Crawl failed")
+            emit({"event": "error", "error": str(e)})
+        else:
+            emit({"event": "error", **result} if "error" in result
+                 else {"event": "summary", **result})
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(daemon: CrawlDaemon, port: int = DEFAULT_PORT,
+          socket_path: str | None = None) -> None:
+    """Serve the control API on 127.0.0.1:``port`` or a Unix socket until interrupted."""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = _UnixHTTPServer(socket_path, _Handler)
+        os.chmod(socket_path, 0o600)
+        server.allowed_hosts = server.token = None
+        where = socket_path
+    else:
+        server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        port = server.server_address[1]
+        server.allowed_hosts = {f"127.0.0.1:{port}", f"localhost:{port}"}
+        server.token = write_token()
+        where = f"http://127.0.0.1:{port} (token in {TOKEN_PATH})"
+    server.crawl_daemon = daemon
+    daemon.start()
+    logger.info("Crawl daemon listening on %s", where)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+        if server.token is not None and os.path.exists(TOKEN_PATH):
+            os.remove(TOKEN_PATH)
@@ -0,0 +1,347 @@
+"""Year-partitioned access to data/<year>.jsonl with a byte-offset index.
+
+Each ``data/<year>.jsonl`` file is treated as one partition. A sidecar index
+in ``data/.index/<year>.json`` maps the values of the indexed fields to the
+byte offsets of the lines that contain them, so queries seek straight to the
+matching entries instead of decoding every file.
+
+A closed year can be compacted into a block-gzip archive
+(``data/<year>.jsonl.gz``, see blockgz.py). Archived partitions are read
+transparently; their index holds virtual offsets, so a query decompresses
+only the blocks holding its matches.
+"""
+from __future__ import annotations
+
+import glob
+import json
+import logging
+import os
+import re
+from typing import Iterable, Iterator
+
+from .blockgz import BlockReader, archive_path, blocks_path, entity_sort_key, write_archive
+from .config import CURRENT_YEAR, DATA_DIR, TERM_KEY_TO_STRING
+
+logger = logging.getLogger(__name__)
+
+INDEXED_FIELDS = ("entity_name", "term_used", "country_or_region", "entity_type")
+INDEX_VERSION = 1
+
+_PARTITION_RE = re.compile(r"^(\d{4})\.jsonl(?:\.gz)?$")
+
+
+def partition_path(year: int, data_dir: str = DATA_DIR) -> str:
+    """Return the JSONL path for a year partition."""
+    return os.path.join(data_dir, f"{year}.jsonl")
+
+
+def list_partitions(data_dir: str = DATA_DIR) -> list[int]:
+    """Return the years that have a plain or archived partition, ascending."""
+    years = set()
+    for filepath in glob.glob(os.path.join(data_dir, "*.jsonl*")):
+        match = _PARTITION_RE.match(os.path.basename(filepath))
+        if match:
+            years.add(int(match.group(1)))
+    return sorted(years)
+
+
+def index_values(entry: dict, field: str) -> list[str]:
+    """Return the index keys an entry contributes for one field.
+
+    ``term_used`` arrays are normalised to the schema's string form so that
+    ``term_used="Lunar New Year"`` also matches ``["lunar_new_year", ...]``.
+    """
+    value = entry.get(field)
+    if field == "term_used":
+        items = value if isinstance(value, list) else [value]
+        return [TERM_KEY_TO_STRING.get(item, item) for item in items
+                if isinstance(item, str)]
+    if isinstance(value, str):
+        return [value]
+    return []
+
+
+def _file_signature(path: str) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class DataStore:
+    """Query API over the year partitions in ``data_dir``."""
+
+    def __init__(self, data_dir: str = DATA_DIR, index_dir: str | None = None):
+        self._data_dir = data_dir
+        self._index_dir = index_dir or os.path.join(data_dir, ".index")
+        self._indexes: dict[int, dict] = {}
+        self._readers: dict[int, BlockReader] = {}
+
+    @property
+    def data_dir(self) -> str:
+        return self._data_dir
+
+    def years(self) -> list[int]:
+        return list_partitions(self._data_dir)
+
+    def partition_path(self, year: int) -> str:
+        return partition_path(year, self._data_dir)
+
+    def is_archived(self, year: int) -> bool:
+        return os.path.exists(archive_path(year, self._data_dir))
+
+    def source_path(self, year: int) -> str:
+        """The file a partition is read from: its archive if compacted."""
+        if self.is_archived(year):
+            return archive_path(year, self._data_dir)
+        return self.partition_path(year)
+
+    def _reader(self, year: int) -> BlockReader:
+        reader = self._readers.get(year)
+        if reader is None:
+            reader = self._readers[year] = BlockReader(
+                archive_path(year, self._data_dir), blocks_path(year, self._data_dir))
+        return reader
+
+    def _drop_reader(self, year: int) -> None:
+        reader = self._readers.pop(year, None)
+        if reader is not None:
+            reader.close()
+
+    def close(self) -> None:
+        for year in list(self._readers):
+            self._drop_reader(year)
+
+    def _index_path(self, year: int) -> str:
+        return os.path.join(self._index_dir, f"{year}.json")
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    def _build_index(self, year: int) -> dict:
+        """Scan a partition once and record line offsets per indexed value."""
+        path = self.source_path(year)
+        keys: dict[str, dict[str, list[int]]] = {f: {} for f in INDEXED_FIELDS}
+        offsets: list[int] = []
+        if self.is_archived(year):
+            self._drop_reader(year)  # the block table may have changed too
+            for virtual_offset, raw in self._reader(year).iter_lines():
+                self._index_line(raw, virtual_offset, keys, offsets)
+        else:
+            with open(path, "rb") as f:
+                offset = 0
+                for raw in f:
+                    line_offset = offset
+                    offset += len(raw)
+                    self._index_line(raw, line_offset, keys, offsets)
+        index = {
+            "version": INDEX_VERSION,
+            "source": _file_signature(path),
+            "offsets": offsets,
+            "keys": keys,
+        }
+        self._save_index(year, index)
+        return index
+
+    @staticmethod
+    def _index_line(raw: bytes, offset: int, keys: dict, offsets: list[int]) -> None:
+        line = raw.strip()
+        if not line:
+            return
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            return
+        offsets.append(offset)
+        for field in INDEXED_FIELDS:
+            for value in index_values(entry, field):
+                keys[field].setdefault(value, []).append(offset)
+
+    def _save_index(self, year: int, index: dict) -> None:
+        try:
+            os.makedirs(self._index_dir, exist_ok=True)
+            tmp = self._index_path(year) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, self._index_path(year))
+        except OSError as e:
+            logger.warning("Index write failed for %d: %s", year, e)
+
+    def _is_fresh(self, year: int, index: dict) -> bool:
+        return (index.get("version") == INDEX_VERSION
+                and index.get("source") == _file_signature(self.source_path(year)))
+
+    def index(self, year: int) -> dict:
+        """Return the index for a partition, rebuilding it if stale or missing."""
+        cached = self._indexes.get(year)
+        if cached is not None and self._is_fresh(year, cached):
+            return cached
+
+        index = None
+        path = self._index_path(year)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                index = None
+        if index is None or not self._is_fresh(year, index):
+            logger.debug("Rebuilding data index for %d", year)
+            index = self._build_index(year)
+        self._indexes[year] = index
+        return index
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _read_at(self, year: int, offsets: Iterable[int]) -> Iterator[dict]:
+        if self.is_archived(year):
+            reader = self._reader(year)
+            for offset in offsets:
+                try:
+                    yield json.loads(reader.read_at(offset))
+                except json.JSONDecodeError:
+                    continue
+            return
+        with open(self.partition_path(year), "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                line = f.readline().strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def _select_years(self, years: int | Iterable[int] | None) -> list[int]:
+        available = self.years()
+        if years is None:
+            return available
+        if isinstance(years, int):
+            years = [years]
+        wanted = set(years)
+        return [y for y in available if y in wanted]
+
+    def iter_entries(self, years: int | Iterable[int] | None = None) -> Iterator[dict]:
+        """Yield every entry in the selected partitions, in file order."""
+        for year in self._select_years(years):
+            yield from self._read_at(year, self.index(year)["offsets"])
+
+    def query(self, years: int | Iterable[int] | None = None, **filters: str) -> Iterator[dict]:
+        """Yield entries whose indexed fields equal all given filter values.
+
+        Example: ``store.query(entity_type="gov", term_used="Lunar New Year")``.
+        """
+        unknown = set(filters) - set(INDEXED_FIELDS)
+        if unknown:
+            raise ValueError(f"Not an indexed field: {', '.join(sorted(unknown))}")
+        if not filters:
+            yield from self.iter_entries(years)
+            return
+
+        for year in self._select_years(years):
+            keys = self.index(year)["keys"]
+            matched: set[int] | None = None
+            for field, value in filters.items():
+                hits = set(keys[field].get(value, ()))
+                matched = hits if matched is None else matched & hits
+                if not matched:
+                    break
+            if matched:
+                yield from self._read_at(year, sorted(matched))
+
+    def distinct(self, field: str, years: int | Iterable[int] | None = None) -> dict[str, int]:
+        """Return ``{value: entry_count}`` for an indexed field."""
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"Not an indexed field: {field}")
+        counts: dict[str, int] = {}
+        for year in self._select_years(years):
+            for value, offsets in self.index(year)["keys"][field].items():
+                counts[value] = counts.get(value, 0) + len(offsets)
+        return counts
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def append(self, entries: list[dict], year: int = CURRENT_YEAR) -> int:
+        """Append entry dicts to a partition and extend its index in place.
+
+        Returns the number of entries written. Archived years are read-only.
+        """
+        if not entries:
+            return 0
+        if self.is_archived(year):
+            raise ValueError(f"{year} is archived; its partition is read-only")
+        path = self.partition_path(year)
+        index = None
+        if os.path.exists(path):
+            index = self.index(year)
+
+        with open(path, "ab+") as f:
+            start = f.tell()
+            if start:
+                f.seek(start - 1)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+                    start += 1
+            lines = [json.dumps(e, ensure_ascii=False).encode("utf-8") + b"\n"
+                     for e in entries]
+            f.writelines(lines)
+
+        if index is None:
+            self._indexes[year] = self._build_index(year)
+            return len(entries)
+
+        offset = start
+        for raw in lines:
+            self._index_line(raw, offset, index["keys"], index["offsets"])
+            offset += len(raw)
+        index["source"] = _file_signature(path)
+        self._save_index(year, index)
+        return len(entries)
+
+    def compact(self, year: int) -> dict:
+        """Rewrite a closed year as a block-gzip archive sorted by entity.
+
+        The plain partition is removed once the archive has been read back
+        and holds the same entries. Every non-blank line must parse: reads
+        skip malformed lines, so one would otherwise be dropped for good.
+        Returns sizes and block counts.
+        """
+        if self.is_archived(year):
+            raise ValueError(f"{year} is already archived")
+        path = self.partition_path(year)
+        if not os.path.exists(path):
+            raise ValueError(f"No partition for {year}")
+        entries = []
+        with open(path, "rb") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{path}:{number}: malformed line, not compacting: {e}") from e
+        entries.sort(key=entity_sort_key)
+        target, sidecar = archive_path(year, self._data_dir), blocks_path(year, self._data_dir)
+        table = write_archive(entries, target, sidecar)
+
+        reader = BlockReader(target, sidecar)
+        try:
+            archived = [json.loads(raw) for _, raw in reader.iter_lines()]
+        finally:
+            reader.close()
+        if archived != entries:
+            os.remove(target)
+            os.remove(sidecar)
+            raise ValueError(f"Archive of {year} does not read back identically")
+
+        plain_size = os.path.getsize(path)
+        os.remove(path)
+        self._indexes.pop(year, None)
+        self._drop_reader(year)
+        self.index(year)
+        return {"year": year, "entries": len(entries), "blocks": len(table["blocks"]),
+                "plain_bytes": plain_size, "archive_bytes": os.path.getsize(target)}
@@ -0,0 +1,239 @@
+"""Sitemap- and link-driven URL discovery with a priority frontier."""
+from __future__ import annotations
+
+import heapq
+import logging
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from datetime import date
+from urllib.parse import unquote, urldefrag, urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+from .config import YEAR_RELEVANCE_PATTERNS
+from .fetcher import Fetcher
+from .targets import Target, TargetURL
+from .terms import get_term_matcher
+
+logger = logging.getLogger(__name__)
+
+# Path keywords that often mark holiday campaign pages but are not full terms
+_PATH_HINTS = re.compile(r"\b(cny|lny|lunar|chinese-?new-?year|spring-?festival|"
+                         r"new-?year|year-of-the)\b", re.IGNORECASE)
+_SKIP_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".pdf",
+                    ".zip", ".mp4", ".mp3", ".css", ".js", ".ico", ".woff", ".woff2")
+
+DEFAULT_MAX_URLS = 5
+DEFAULT_MAX_DEPTH = 1
+DEFAULT_MAX_SITEMAPS = 5
+
+
+def score_url(url: str, anchor: str = "") -> float:
+    """Estimate how likely a URL is to mention a holiday term.
+
+    Looks at the decoded path/query and the link's anchor text only; no fetch.
+    """
+    parsed = urlparse(url)
+    path_text = re.sub(r"[-_/+.]+", " ", unquote(parsed.path + " " + parsed.query))
+    matcher = get_term_matcher()
+    score = 0.0
+    if matcher.search(anchor):
+        score += 2.0
+    if matcher.search(path_text):
+        score += 1.5
+    elif _PATH_HINTS.search(unquote(parsed.path)):
+        score += 1.0
+    if any(pat.search(path_text) or pat.search(anchor) for pat in YEAR_RELEVANCE_PATTERNS):
+        score += 0.5
+    return score
+
+
+def parse_sitemap(xml_text: str) -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+    """Parse a sitemap or sitemap index.
+
+    Returns ``(page_urls, child_sitemaps)``, each a list of ``(loc, lastmod)``.
+    """
+    try:
+        root = ET.fromstring(xml_text.encode("utf-8") if isinstance(xml_text, str) else xml_text)
+    except ET.ParseError as e:
+        logger.debug("Unparseable sitemap: %s", e)
+        return [], []
+
+    pages: list[tuple[str, str]] = []
+    children: list[tuple[str, str]] = []
+    is_index = root.tag.endswith("sitemapindex")
+    for node in root:
+        loc = lastmod = ""
+        for child in node:
+            if child.tag.endswith("loc") and child.text:
+                loc = child.text.strip()
+            elif child.tag.endswith("lastmod") and child.text:
+                lastmod = child.text.strip()
+        if not loc:
+            continue
+        (children if is_index else pages).append((loc, lastmod))
+    return pages, children
+
+
+def _lastmod_date(lastmod: str) -> date | None:
+    try:
+        return date.fromisoformat(lastmod[:10])
+    except ValueError:
+        return None
+
+
+def _same_site(url: str, netloc: str) -> bool:
+    host = urlparse(url).netloc.lower()
+    return host.removeprefix("www.") == netloc.removeprefix("www.")
+
+
+@dataclass(order=True)
+class _FrontierItem:
+    priority: float
+    seq: int
+    url: str = field(compare=False)
+    depth: int = field(compare=False)
+
+
+class Frontier:
+    """Max-priority queue of URLs, deduplicated by URL."""
+
+    def __init__(self):
+        self._heap: list[_FrontierItem] = []
+        self._seen: set[str] = set()
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, url: str, score: float, depth: int = 0) -> bool:
+        url = urldefrag(url)[0]
+        if url in self._seen:
+            return False
+        self._seen.add(url)
+        self._seq += 1
+        heapq.heappush(self._heap, _FrontierItem(-score, self._seq, url, depth))
+        return True
+
+    def pop(self) -> tuple[str, float, int]:
+        item = heapq.heappop(self._heap)
+        return item.url, -item.priority, item.depth
+
+
+class Discoverer:
+    """Find likely CNY/LNY pages for a target from sitemaps and site links.
+
+    Args:
+        fetcher: Shared Fetcher (robots.txt, rate limits and cache apply)
+        max_urls: Fetch budget per target for discovered pages
+        max_depth: How many link hops to follow from seed pages (0 = none)
+        since: Ignore sitemap entries whose lastmod is older than this
+        min_score: Discovered URLs must score above this to be queued
+        refresh: Re-fetch pages whose links are followed instead of replaying
+            cached copies (sitemaps are always re-fetched, once per run)
+    """
+
+    def __init__(self, fetcher: Fetcher, max_urls: int = DEFAULT_MAX_URLS,
+                 max_depth: int = DEFAULT_MAX_DEPTH, since: date | None = None,
+                 min_score: float = 0.0, max_sitemaps: int = DEFAULT_MAX_SITEMAPS,
+                 refresh: bool = False):
+        self._fetcher = fetcher
+        self._max_urls = max_urls
+        self._max_depth = max_depth
+        self._since = since
+        self._min_score = min_score
+        self._max_sitemaps = max_sitemaps
+        self._refresh = refresh
+
+    def _sitemap_urls(self, seed: str, frontier: Frontier, netloc: str,
+                      max_depth: int) -> None:
+        queue = [(url, "") for url in self._fetcher.sitemaps_for(seed)]
+        fetched = 0
+        while queue and fetched < self._max_sitemaps:
+            sitemap_url, _ = queue.pop(0)
+            if sitemap_url.endswith(".gz"):
+                logger.debug("  Skipping compressed sitemap: %s", sitemap_url)
+                continue
+            # A cached sitemap would only ever list last season's pages
+            xml_text = self._fetcher.fetch(sitemap_url, refresh=True)
+            fetched += 1
+            if not xml_text:
+                continue
+            pages, children = parse_sitemap(xml_text)
+            for loc, lastmod in children:
+                modified = _lastmod_date(lastmod)
+                if self._since and modified and modified < self._since:
+                    continue
+                queue.append((loc, lastmod))
+            # Probe holiday-looking, then most recently modified, child sitemaps first
+            queue.sort(key=lambda item: item[1], reverse=True)
+            queue.sort(key=lambda item: 0 if _PATH_HINTS.search(item[0]) else 1)
+            for loc, lastmod in pages:
+                if not _same_site(loc, netloc):
+                    continue
+                modified = _lastmod_date(lastmod)
+                if self._since and modified and modified < self._since:
+                    continue
+                score = score_url(loc)
+                if score > self._min_score:
+                    # Pages with a (recent enough) lastmod win ties
+                    if modified:
+                        score += 0.1
+                    # Sitemap pages are leaves: their links are not followed
+                    frontier.push(loc, score, depth=max_depth)
+
+    def _links(self, html: str, base_url: str, netloc: str) -> list[tuple[str, str]]:
+        soup = BeautifulSoup(html, "lxml")
+        links = []
+        for a in soup.find_all("a", href=True):
+            url = urldefrag(urljoin(base_url, a["href"]))[0]
+            if not url.startswith(("http://", "https://")):
+                continue
+            if not _same_site(url, netloc) or url.lower().endswith(_SKIP_EXTENSIONS):
+                continue
+            links.append((url, a.get_text(" ", strip=True)))
+        return links
+
+    def discover(self, target: Target, options: dict | None = None) -> list[TargetURL]:
+        """Return new TargetURLs for ``target``, best first, within budget.
+
+        ``options`` is the target's ``discover`` mapping from targets.yaml and
+        may override ``sitemap``, ``follow_links``, ``max_depth`` and ``max_urls``.
+        """
+        if not target.urls:
+            return []
+        options = options or {}
+        use_sitemap = options.get("sitemap", True)
+        follow_links = options.get("follow_links", True)
+        max_depth = int(options.get("max_depth", self._max_depth))
+        budget = int(options.get("max_urls", self._max_urls))
+
+        known = {u.url for u in target.urls}
+        seed = target.urls[0]
+        netloc = urlparse(seed.url).netloc.lower()
+        platform = seed.platform or netloc.removeprefix("www.")
+
+        frontier = Frontier()
+        for url in known:
+            frontier.push(url, float("inf"), depth=0)
+        if use_sitemap:
+            self._sitemap_urls(seed.url, frontier, netloc, max_depth)
+
+        found: list[TargetURL] = []
+        while frontier and budget > 0:
+            url, score, depth = frontier.pop()
+            if url not in known:
+                found.append(TargetURL(url=url, context="website", platform=platform))
+                budget -= 1
+                logger.debug("  Discovered (%.1f): %s", score, url)
+            if not follow_links or depth >= max_depth:
+                continue
+            html = self._fetcher.fetch(url, refresh=self._refresh)
+            if not html:
+                continue
+            for link, anchor in self._links(html, url, netloc):
+                link_score = score_url(link, anchor)
+                if link_score > self._min_score:
+                    frontier.push(link, link_score, depth=depth + 1)
+        return found
@@ -0,0 +1,182 @@
+"""Entity-name resolution: normalised names plus a trigram index for variants.
+
+"Apple", "Apple Inc." and "apple" normalise to the same key. Names that
+still differ (typos, "&" vs "and" in a longer name) are found through a
+character-trigram index: only names sharing trigrams with the query are
+compared, so a lookup never scans every known entity.
+
+Uses only the standard library, so scripts/validate.py can import it.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, Iterator
+
+# Trailing words that do not distinguish one organisation from another
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited",
+    "llc", "llp", "lp", "plc", "gmbh", "ag", "sa", "nv", "bv", "pty", "pte",
+    "kk", "srl", "spa",
+}
+# Dice coefficient of trigram sets above which two names are one entity.
+# High enough that "Stanford University" and "Stanford University Events"
+# stay apart.
+FUZZY_THRESHOLD = 0.88
+# Trigrams shared by more names than this are skipped as too common to help
+_MAX_POSTING = 500
+
+_APOSTROPHES = re.compile(r"['’`]")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+@lru_cache(maxsize=4096)
+def normalize_name(name: str) -> str:
+    """Case-, accent- and punctuation-insensitive form of an entity name.
+
+    Drops a leading "the" and trailing legal suffixes ("Inc.", "Ltd", ...);
+    "&" reads as "and".
+    """
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = _APOSTROPHES.sub("", text.replace("&", " and "))
+    # "U.S." -> "us": dots between single letters are abbreviations
+    text = re.sub(r"\b(\w)\.(?=\w\b)", r"\1", text)
+    words = _NON_WORD.sub(" ", text).split()
+    if len(words) > 1 and words[0] == "the":
+        words = words[1:]
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def trigrams(normalized: str) -> set[str]:
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class EntityIndex:
+    """Known entity names, resolvable by exact normalised key or fuzzily.
+
+    Each entity is identified by the normalised name it was first added
+    under; later variants resolve to that key. Lookups update caches, so
+    every method holds a lock: the crawl daemon checks pages against the
+    index while a crawl adds to it.
+    """
+
+    def __init__(self, names: Iterable[str] = (), threshold: float = FUZZY_THRESHOLD):
+        self._threshold = threshold
+        self._keys: dict[str, str] = {}  # normalised variant -> entity key
+        self._grams: dict[str, set[str]] = {}  # entity key -> its trigrams
+        self._postings: dict[str, set[str]] = {}  # trigram -> entity keys
+        self._variants: dict[str, set[str]] = {}  # entity key -> names added
+        self._misses: dict[str, int] = {}  # unresolved name -> index size when tried
+        self._lock = threading.RLock()
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self._grams)
+
+    def _fuzzy(self, normalized: str) -> str | None:
+        grams = trigrams(normalized)
+        shared: dict[str, int] = {}
+        for gram in grams:
+            posting = self._postings.get(gram, ())
+            if len(posting) > _MAX_POSTING:
+                continue
+            for key in posting:
+                shared[key] = shared.get(key, 0) + 1
+        best, best_score = None, self._threshold
+        for key, count in shared.items():
+            score = 2 * count / (len(grams) + len(self._grams[key]))
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def resolve(self, name: str) -> str | None:
+        """Key of the known entity ``name`` refers to, or None."""
+        normalized = normalize_name(name)
+        with self._lock:
+            key = self._keys.get(normalized)
+            if key is None and normalized and self._misses.get(normalized) != len(self._grams):
+                key = self._fuzzy(normalized)
+                if key is not None:
+                    self._keys[normalized] = key
+                else:
+                    self._misses[normalized] = len(self._grams)
+            return key
+
+    def add(self, name: str) -> str:
+        """Register ``name`` and return its entity key."""
+        with self._lock:
+            key = self.resolve(name)
+            if key is None:
+                key = normalize_name(name)
+                self._keys[key] = key
+                grams = self._grams[key] = trigrams(key)
+                for gram in grams:
+                    self._postings.setdefault(gram, set()).add(key)
+            self._variants.setdefault(key, set()).add(name)
+            return key
+
+    def variants(self, name: str) -> set[str]:
+        """Names added for the entity ``name`` resolves to, including ``name``."""
+        with self._lock:
+            key = self.resolve(name)
+            return {name, *self._variants.get(key, ())} if key else {name}
+
+
+class DedupKeys:
+    """Set of ``(entity_name, url)`` keys that matches entity-name variants.
+
+    Drop-in for the plain set of dedup keys: ``("Apple Inc.", url)`` is in
+    it once ``("Apple", url)`` was added.
+    """
+
+    def __init__(self, keys: Iterable[tuple[str, str]] = (),
+                 entities: EntityIndex | None = None):
+        self.entities = entities if entities is not None else EntityIndex()
+        self._keys: dict[tuple[str, str], tuple[str, str]] = {}  # resolved -> as added
+        for key in keys:
+            self.add(key)
+
+    def _resolve(self, key: tuple[str, str]) -> tuple[str, str] | None:
+        entity = self.entities.resolve(key[0])
+        return (entity, key[1]) if entity is not None else None
+
+    def add(self, key: tuple[str, str]) -> None:
+        resolved = (self.entities.add(key[0]), key[1])
+        self._keys.setdefault(resolved, key)
+
+    def match(self, key: tuple[str, str]) -> tuple[str, str] | None:
+        """The key already present that ``key`` duplicates, if any."""
+        resolved = self._resolve(key)
+        return self._keys.get(resolved) if resolved else None
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return self.match(key) is not None
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        return iter(self._keys.values())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def copy(self) -> DedupKeys:
+        copied = DedupKeys(entities=self.entities)
+        copied._keys = dict(self._keys)
+        return copied
+
+
+_index: EntityIndex | None = None
+
+
+def get_entity_index() -> EntityIndex:
+    """Shared EntityIndex of every entity name seen in this process."""
+    global _index
+    if _index is None:
+        _index = EntityIndex()
+    return _index
@@ -20,9 +20,13 @@ class EntryCandidate:
     source_url: str
     confidence: float = 0.0
     notes: str = ""
+    extra_sources: list[str] = field(default_factory=list)  # near-duplicate mirrors
+    evidence: str = ""  # WARC record pointer for source_url, relative to evidence/
+    factors: dict[str, float] = field(default_factory=dict)  # score breakdown
 
     @property
     def dedup_key(self) -> tuple[str, str]:
+        """Key looked up in ``DedupKeys``, which resolves entity-name variants."""
         return (self.entity_name, self.source_url)
 
     def term_used(self) -> str | list[str]:
@@ -42,10 +46,12 @@ class EntryCandidate:
             "exact_phrase": self.exact_phrase,
             "context": self.context,
             "platform": self.platform,
-            "sources": [{"url": self.source_url}],
+            "sources": [{"url": url} for url in [self.source_url, *self.extra_sources]],
             "captured_on": date.today().isoformat(),
             "contributor": CONTRIBUTOR,
         }
+        if self.evidence:
+            entry["sources"][0]["evidence"] = self.evidence
         if self.notes:
             entry["notes"] = self.notes
         return entry
@@ -0,0 +1,247 @@
+"""Columnar (Arrow IPC / Parquet) export of the dataset for analytics.
+
+Each year partition becomes an ``entries`` table plus a flattened
+``sources`` table; the Google Trends CSV becomes its own table. A manifest
+records the content hash of every input so re-runs only rewrite the
+partitions whose source file changed.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import logging
+import os
+from datetime import date
+
+from .config import EXPORT_DIR, TERM_KEY_TO_STRING, TRENDS_CSV
+from .datastore import DataStore
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("arrow", "parquet")
+MANIFEST_NAME = "manifest.json"
+# Schema term strings that name more than one term
+_COMBINED_TERMS = {
+    "Lunar New Year (Chinese New Year)": {"lunar_new_year", "chinese_new_year"},
+}
+
+# Lazy import pyarrow so the crawler can run without it installed
+_pa = None
+
+
+def _get_pyarrow():
+    global _pa
+    if _pa is None:
+        try:
+            import pyarrow
+            _pa = pyarrow
+        except ImportError:
+            raise ImportError(
+                "pyarrow is required for columnar export. "
+                "Install it with: pip install pyarrow"
+            )
+    return _pa
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _term_columns(term) -> tuple[str, set[str]]:
+    """Return (display term, set of snake_case keys) for a term_used value."""
+    if isinstance(term, list):
+        keys = set(term)
+        return " / ".join(TERM_KEY_TO_STRING.get(t, t) for t in term), keys
+    keys = _COMBINED_TERMS.get(term) or {k for k, v in TERM_KEY_TO_STRING.items() if v == term}
+    return term or "other", set(keys) or {"other"}
+
+
+def _dictionary(values: list):
+    pa = _get_pyarrow()
+    return pa.array(values, type=pa.string()).dictionary_encode()
+
+
+def _entries_tables(year: int, entries: list[dict]):
+    """Build the (entries, sources) Arrow tables for one partition."""
+    pa = _get_pyarrow()
+    cols: dict[str, list] = {
+        "row_id": [], "entity_name": [], "entity_type": [], "country_or_region": [],
+        "term_used": [], "has_chinese_new_year": [], "has_lunar_new_year": [],
+        "has_spring_festival": [], "exact_phrase": [], "context": [], "platform": [],
+        "captured_on": [], "contributor": [], "notes": [], "first_source_url": [],
+        "source_count": [],
+    }
+    src_cols: dict[str, list] = {"row_id": [], "position": [], "url": [], "evidence": []}
+
+    for row_id, entry in enumerate(entries):
+        term, keys = _term_columns(entry.get("term_used"))
+        sources = entry.get("sources") or []
+        try:
+            captured = date.fromisoformat(entry.get("captured_on", ""))
+        except ValueError:
+            captured = None
+        cols["row_id"].append(row_id)
+        cols["entity_name"].append(entry.get("entity_name"))
+        cols["entity_type"].append(entry.get("entity_type"))
+        cols["country_or_region"].append(entry.get("country_or_region"))
+        cols["term_used"].append(term)
+        cols["has_chinese_new_year"].append("chinese_new_year" in keys)
+        cols["has_lunar_new_year"].append("lunar_new_year" in keys)
+        cols["has_spring_festival"].append("spring_festival" in keys)
+        cols["exact_phrase"].append(entry.get("exact_phrase"))
+        cols["context"].append(entry.get("context"))
+        cols["platform"].append(entry.get("platform"))
+        cols["captured_on"].append(captured)
+        cols["contributor"].append(entry.get("contributor"))
+        cols["notes"].append(entry.get("notes"))
+        cols["first_source_url"].append(sources[0].get("url") if sources else None)
+        cols["source_count"].append(len(sources))
+        for position, src in enumerate(sources):
+            src_cols["row_id"].append(row_id)
+            src_cols["position"].append(position)
+            src_cols["url"].append(src.get("url"))
+            src_cols["evidence"].append(src.get("evidence"))
+
+    n = len(entries)
+    entries_table = pa.table({
+        "year": pa.array([year] * n, type=pa.int16()),
+        "row_id": pa.array(cols["row_id"], type=pa.int32()),
+        "entity_name": pa.array(cols["entity_name"], type=pa.string()),
+        "entity_type": _dictionary(cols["entity_type"]),
+        "country_or_region": _dictionary(cols["country_or_region"]),
+        "term_used": _dictionary(cols["term_used"]),
+        "has_chinese_new_year": pa.array(cols["has_chinese_new_year"], type=pa.bool_()),
+        "has_lunar_new_year": pa.array(cols["has_lunar_new_year"], type=pa.bool_()),
+        "has_spring_festival": pa.array(cols["has_spring_festival"], type=pa.bool_()),
+        "exact_phrase": pa.array(cols["exact_phrase"], type=pa.string()),
+        "context": _dictionary(cols["context"]),
+        "platform": _dictionary(cols["platform"]),
+        "captured_on": pa.array(cols["captured_on"], type=pa.date32()),
+        "contributor": _dictionary(cols["contributor"]),
+        "notes": pa.array(cols["notes"], type=pa.string()),
+        "first_source_url": pa.array(cols["first_source_url"], type=pa.string()),
+        "source_count": pa.array(cols["source_count"], type=pa.int16()),
+    })
+    m = len(src_cols["row_id"])
+    sources_table = pa.table({
+        "year": pa.array([year] * m, type=pa.int16()),
+        "row_id": pa.array(src_cols["row_id"], type=pa.int32()),
+        "position": pa.array(src_cols["position"], type=pa.int16()),
+        "url": pa.array(src_cols["url"], type=pa.string()),
+        "evidence": pa.array(src_cols["evidence"], type=pa.string()),
+    })
+    return entries_table, sources_table
+
+
+def _trends_table(path: str):
+    """Build the Google Trends table (monthly interest per term)."""
+    pa = _get_pyarrow()
+    months, lny, cny = [], [], []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # header
+        for row in reader:
+            if len(row) < 3:
+                continue
+            months.append(date.fromisoformat(row[0]))
+            lny.append(int(row[1]))
+            cny.append(int(row[2]))
+    return pa.table({
+        "month": pa.array(months, type=pa.date32()),
+        "lunar_new_year": pa.array(lny, type=pa.int16()),
+        "chinese_new_year": pa.array(cny, type=pa.int16()),
+    })
+
+
+def _write_table(table, path: str, fmt: str) -> None:
+    tmp = path + ".tmp"
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp)
+    else:
+        # Uncompressed Arrow IPC file so readers can memory-map it
+        import pyarrow.feather as feather
+        feather.write_feather(table, tmp, compression="uncompressed")
+    os.replace(tmp, path)
+
+
+def _load_manifest(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def export_dataset(
+    export_dir: str = EXPORT_DIR,
+    fmt: str = "arrow",
+    store: DataStore | None = None,
+    trends_csv: str = TRENDS_CSV,
+    force: bool = False,
+) -> dict:
+    """Export changed partitions and the trends table.
+
+    Returns ``{"written": [...], "unchanged": [...], "removed": [...]}``.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    _get_pyarrow()
+    store = store or DataStore()
+    out_dir = os.path.join(export_dir, fmt)
+    os.makedirs(os.path.join(out_dir, "entries"), exist_ok=True)
+    os.makedirs(os.path.join(out_dir, "sources"), exist_ok=True)
+    ext = "parquet" if fmt == "parquet" else "arrow"
+
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    manifest = _load_manifest(manifest_path)
+    new_manifest: dict[str, str] = {}
+    result = {"written": [], "unchanged": [], "removed": []}
+
+    for year in store.years():
+        key = f"entries/{year}"
+        digest = _file_sha256(store.source_path(year))
+        new_manifest[key] = digest
+        entries_path = os.path.join(out_dir, "entries", f"year={year}.{ext}")
+        sources_path = os.path.join(out_dir, "sources", f"year={year}.{ext}")
+        if (not force and manifest.get(key) == digest
+                and os.path.exists(entries_path) and os.path.exists(sources_path)):
+            result["unchanged"].append(key)
+            continue
+        entries_table, sources_table = _entries_tables(year, list(store.iter_entries(year)))
+        _write_table(entries_table, entries_path, fmt)
+        _write_table(sources_table, sources_path, fmt)
+        result["written"].append(key)
+        logger.info("Exported %d entries for %d", entries_table.num_rows, year)
+
+    if os.path.exists(trends_csv):
+        key = "google_trends"
+        digest = _file_sha256(trends_csv)
+        new_manifest[key] = digest
+        trends_path = os.path.join(out_dir, f"google_trends.{ext}")
+        if not force and manifest.get(key) == digest and os.path.exists(trends_path):
+            result["unchanged"].append(key)
+        else:
+            _write_table(_trends_table(trends_csv), trends_path, fmt)
+            result["written"].append(key)
+
+    # Drop exports for partitions that no longer exist
+    for key in set(manifest) - set(new_manifest):
+        if key.startswith("entries/"):
+            year = key.split("/", 1)[1]
+            for table in ("entries", "sources"):
+                stale = os.path.join(out_dir, table, f"year={year}.{ext}")
+                if os.path.exists(stale):
+                    os.remove(stale)
+        result["removed"].append(key)
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(new_manifest, f, indent=2, sort_keys=True)
+    return result
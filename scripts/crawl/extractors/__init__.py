@@ -2,10 +2,13 @@
 
 from .website import WebsiteExtractor
 from .twitter import TwitterExtractor
+from .feed import FeedExtractor
 
 
 def get_extractor(source_type: str):
     """Return the appropriate extractor for the given source type."""
     if source_type == "twitter":
         return TwitterExtractor()
+    if source_type == "feed":
+        return FeedExtractor()
     return WebsiteExtractor()
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -14,18 +14,26 @@ class ExtractionResult:
     page_text: str                # full extracted text
     term_count: int               # total term occurrences
     year_relevant: bool           # whether content is from current CNY season
+    # (start, end) offsets into page_text of the best-ranked term snippets
+    alternates: list[tuple[int, int]] = field(default_factory=list)
+
+    def alternate_phrases(self) -> list[str]:
+        """Text of the ranked alternate snippets."""
+        return [self.page_text[start:end] for start, end in self.alternates]
 
 
 class BaseExtractor(ABC):
     """Abstract base class for term extractors."""
 
     @abstractmethod
-    def extract(self, content: str, url: str) -> ExtractionResult | None:
+    def extract(self, content: str, url: str,
+                entity_name: str | None = None) -> ExtractionResult | None:
         """Extract CNY/LNY terms from content.
 
         Args:
             content: Raw content (HTML for websites, tweet text for Twitter)
             url: Source URL
+            entity_name: Target entity, used to rank candidate phrases
 
         Returns:
             ExtractionResult or None if no relevant terms found
@@ -0,0 +1,194 @@
+"""RSS/Atom newsroom feeds, polled incrementally.
+
+Each feed is fetched with a conditional GET (ETag / Last-Modified), so an
+unchanged feed costs one 304 response, and only items whose GUID was not
+seen on an earlier run are returned. Item pages then go through the usual
+fetch, extract and score path; when an item's page has no terms, the
+item's own content from the feed is tried instead.
+"""
+from __future__ import annotations
+
+import html
+import json
+import logging
+import os
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime
+from urllib.parse import urljoin
+
+from ..config import CACHE_DIR
+from .base import BaseExtractor, ExtractionResult
+from .website import WebsiteExtractor
+
+logger = logging.getLogger(__name__)
+
+FEED_STATE_PATH = os.path.join(CACHE_DIR, "feeds.json")
+# GUIDs remembered per feed; feeds list far fewer items than this
+_MAX_SEEN = 1000
+# Child elements read from an RSS <item> or Atom <entry>, by local name
+_ITEM_FIELDS = {"guid", "id", "title", "encoded", "content", "description", "summary",
+                "pubDate", "published", "updated", "date"}
+
+
+@dataclass
+class FeedItem:
+    feed_url: str
+    guid: str
+    link: str
+    title: str = ""
+    content: str = ""    # HTML or text of the item body/summary
+    published: str = ""  # as given in the feed
+
+    def html(self) -> str:
+        """The item as a minimal HTML page, for the website extractor."""
+        return (f"<html><head><title>{html.escape(self.title)}</title></head>"
+                f"<body><h1>{html.escape(self.title)}</h1>{self.content}</body></html>")
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_feed(xml_text: str, feed_url: str) -> list[FeedItem]:
+    """Items of an RSS 2.0, RSS 1.0 or Atom document, in feed order.
+
+    Relative links are resolved against ``feed_url``. Items without a link
+    are skipped, as there is no page to cite.
+    """
+    try:
+        root = ET.fromstring(xml_text.encode("utf-8") if isinstance(xml_text, str) else xml_text)
+    except ET.ParseError as e:
+        logger.warning("Unparseable feed %s: %s", feed_url, e)
+        return []
+
+    items = []
+    for node in root.iter():
+        if _local(node.tag) not in ("item", "entry"):
+            continue
+        fields: dict[str, str] = {}
+        link = ""
+        for child in node:
+            name = _local(child.tag)
+            if name == "link":
+                # Atom: <link rel="alternate" href="..."/>; RSS: <link>url</link>
+                href = child.get("href")
+                if href is None:
+                    link = link or (child.text or "").strip()
+                elif child.get("rel", "alternate") == "alternate" and not link:
+                    link = href.strip()
+            elif name in _ITEM_FIELDS and name not in fields:
+                fields[name] = "".join(child.itertext()).strip()
+        guid = fields.get("guid") or fields.get("id") or link
+        if not link and guid.startswith(("http://", "https://")):
+            link = guid
+        if not link:
+            continue
+        items.append(FeedItem(
+            feed_url=feed_url,
+            guid=guid,
+            link=urljoin(feed_url, link),
+            title=fields.get("title", ""),
+            content=next((fields[k] for k in ("encoded", "content", "description", "summary")
+                          if fields.get(k)), ""),
+            published=next((fields[k] for k in ("pubDate", "published", "updated", "date")
+                            if fields.get(k)), ""),
+        ))
+    return items
+
+
+class FeedExtractor(BaseExtractor):
+    """Poll newsroom feeds for new items and extract terms from them.
+
+    Per-feed validators and seen GUIDs persist in ``state_path`` across runs.
+    """
+
+    def __init__(self, state_path: str = FEED_STATE_PATH):
+        self._path = state_path
+        # feed url -> {"etag", "last_modified", "checked", "seen": [guid, ...]}
+        self._feeds = self._read()
+        self._changed: set[str] = set()  # feeds polled or updated since the last save
+        self._items: dict[str, FeedItem] = {}  # item link -> new item polled this run
+        self._website = WebsiteExtractor()
+        self._polled = 0
+        self._not_modified = 0
+        self._new_items = 0
+
+    def _read(self) -> dict[str, dict]:
+        if not os.path.exists(self._path):
+            return {}
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                return json.load(f).get("feeds", {})
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Ignoring unreadable feed state %s: %s", self._path, e)
+            return {}
+
+    def save(self) -> None:
+        # Re-read so concurrent shards/workers do not drop each other's feeds
+        feeds = self._read()
+        feeds.update((url, self._feeds[url]) for url in self._changed)
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            tmp = f"{self._path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "feeds": feeds}, f, ensure_ascii=False)
+            os.replace(tmp, self._path)
+        except OSError as e:
+            logger.warning("Feed state write failed: %s", e)
+            return
+        self._feeds = feeds
+        self._changed.clear()
+
+    def poll(self, feed_url: str, fetcher) -> list[FeedItem] | None:
+        """New items of a feed since the last poll; None if it could not be fetched.
+
+        ``fetcher`` is the run's ``Fetcher``. Returned items count as seen.
+        """
+        state = self._feeds.setdefault(feed_url, {"etag": "", "last_modified": "", "seen": []})
+        self._changed.add(feed_url)
+        fetched = fetcher.fetch_conditional(feed_url, state["etag"], state["last_modified"])
+        if fetched is None:
+            return None
+        content, validators = fetched
+        self._polled += 1
+        state.update(validators)
+        state["checked"] = datetime.now().isoformat(timespec="seconds")
+        if content is None:
+            self._not_modified += 1
+            return []
+
+        seen = set(state["seen"])
+        items = []
+        for item in parse_feed(content, feed_url):
+            if item.guid not in seen:
+                seen.add(item.guid)
+                items.append(item)
+                self._items[item.link] = item
+        state["seen"] = (state["seen"] + [item.guid for item in items])[-_MAX_SEEN:]
+        self._new_items += len(items)
+        return items
+
+    def forget(self, link: str) -> None:
+        """Return the item at ``link`` again on the next poll (its page failed)."""
+        item = self._items.pop(link, None)
+        if item is None:
+            return
+        state = self._feeds[item.feed_url]
+        self._changed.add(item.feed_url)
+        state["seen"] = [guid for guid in state["seen"] if guid != item.guid]
+        # A 304 would hide the item, so the next poll is unconditional
+        state["etag"] = state["last_modified"] = ""
+
+    def extract(self, content: str, url: str,
+                entity_name: str | None = None) -> ExtractionResult | None:
+        """Terms in a feed item's page, else in the item's own feed content."""
+        result = self._website.extract(content, url, entity_name)
+        item = self._items.get(url)
+        if result is None and item is not None and item.content:
+            result = self._website.extract(item.html(), url, entity_name)
+        return result
+
+    def stats(self) -> dict:
+        return {"polled": self._polled, "not_modified": self._not_modified,
+                "new_items": self._new_items}
@@ -0,0 +1,138 @@
+"""Fast pre-parse of a page's <head> metadata and JSON-LD blocks.
+
+Uses the stdlib streaming HTMLParser, fed in chunks and stopped at
+``</head>`` (or the first body tag), so the body is never tokenised.
+JSON-LD blocks, which may sit anywhere in the page, are located with a
+single regex scan rather than a parse, and ``body_text`` gives a rough
+regex-stripped body text for when the head turns out to be decisive.
+"""
+from __future__ import annotations
+
+import html
+import json
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+
+_CHUNK = 8192
+
+# <meta name=...> / <meta property=...> keys worth reading
+TITLE_META = ("og:title", "twitter:title")
+DESCRIPTION_META = ("description", "og:description", "twitter:description")
+_META_KEYS = {*TITLE_META, *DESCRIPTION_META, "og:site_name"}
+
+_JSON_LD = re.compile(
+    r"<script[^>]*type\s*=\s*[\"']?application/ld\+json[^>]*>(.*?)</script\s*>",
+    re.IGNORECASE | re.DOTALL,
+)
+# Elements dropped with their content by body_text (cf. WebsiteExtractor.STRIP_TAGS)
+_DROP_ELEMENTS = re.compile(
+    r"<(script|style|noscript|svg|iframe|template|nav|header|footer|aside|form)\b.*?</\1\s*>"
+    r"|<!--.*?-->",
+    re.IGNORECASE | re.DOTALL,
+)
+_TAG = re.compile(r"<[^>]*>")
+_HEAD_END = re.compile(r"</head\s*>", re.IGNORECASE)
+# Tags that can only appear once the body has started
+_BODY_TAGS = {"body", "div", "p", "main", "article", "section", "h1", "h2", "span", "a"}
+
+
+@dataclass
+class HeadInfo:
+    title: str = ""
+    meta: dict[str, str] = field(default_factory=dict)
+    # (headline or name, description) of JSON-LD Event/Article objects
+    structured: list[tuple[str, str]] = field(default_factory=list)
+
+    def titles(self) -> list[str]:
+        """Title-like fields, distinct and non-empty, most authoritative first."""
+        values = [self.title, *(self.meta.get(k, "") for k in TITLE_META),
+                  *(name for name, _ in self.structured)]
+        return list(dict.fromkeys(v for v in values if v))
+
+    def descriptions(self) -> list[str]:
+        values = [*(self.meta.get(k, "") for k in DESCRIPTION_META),
+                  *(desc for _, desc in self.structured)]
+        return list(dict.fromkeys(v for v in values if v))
+
+
+class _HeadDone(Exception):
+    pass
+
+
+class _HeadParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.info = HeadInfo()
+        self._in_title = False
+        self.title_parts: list[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _BODY_TAGS:
+            raise _HeadDone
+        if tag == "title":
+            self._in_title = True
+        elif tag == "meta":
+            attrs = dict(attrs)
+            key = (attrs.get("property") or attrs.get("name") or "").lower()
+            content = (attrs.get("content") or "").strip()
+            if key in _META_KEYS and content:
+                self.info.meta.setdefault(key, content)
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag == "head":
+            raise _HeadDone
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title_parts.append(data)
+
+
+def _is_event_or_article(types) -> bool:
+    for t in types if isinstance(types, list) else [types]:
+        if isinstance(t, str) and (t.endswith(("Event", "Article")) or t in ("Festival", "BlogPosting")):
+            return True
+    return False
+
+
+def _walk_json_ld(node, out: list[tuple[str, str]]) -> None:
+    if isinstance(node, list):
+        for item in node:
+            _walk_json_ld(item, out)
+    elif isinstance(node, dict):
+        if _is_event_or_article(node.get("@type")):
+            name = node.get("headline") or node.get("name") or ""
+            desc = node.get("description") or ""
+            if isinstance(name, str) and isinstance(desc, str) and (name or desc):
+                out.append((html.unescape(name).strip(), html.unescape(desc).strip()))
+        if "@graph" in node:
+            _walk_json_ld(node["@graph"], out)
+
+
+def body_text(content: str) -> str:
+    """Visible-ish body text by regex stripping, without building a DOM."""
+    head_end = _HEAD_END.search(content)
+    if head_end:
+        content = content[head_end.end():]
+    return " ".join(html.unescape(_TAG.sub(" ", _DROP_ELEMENTS.sub(" ", content))).split())
+
+
+def parse_head(content: str) -> HeadInfo:
+    """Title, meta tags and JSON-LD Event/Article fields of an HTML page."""
+    parser = _HeadParser()
+    try:
+        for start in range(0, len(content), _CHUNK):
+            parser.feed(content[start:start + _CHUNK])
+    except _HeadDone:
+        pass
+    info = parser.info
+    info.title = " ".join("".join(parser.title_parts).split())
+
+    for block in _JSON_LD.findall(content):
+        try:
+            _walk_json_ld(json.loads(block), info.structured)
+        except ValueError:
+            continue
+    return info
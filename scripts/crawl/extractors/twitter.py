@@ -5,7 +5,8 @@ import logging
 import os
 import re
 
-from ..config import TERM_PATTERNS, YEAR_RELEVANCE_PATTERNS
+from ..config import YEAR_RELEVANCE_PATTERNS
+from ..terms import get_term_matcher
 from .base import BaseExtractor, ExtractionResult
 
 logger = logging.getLogger(__name__)
@@ -98,16 +99,11 @@ class TwitterExtractor(BaseExtractor):
 
         return results
 
-    def extract(self, content: str, url: str) -> ExtractionResult | None:
+    def extract(self, content: str, url: str,
+                entity_name: str | None = None) -> ExtractionResult | None:
         """Extract terms from tweet text."""
-        terms_found: dict[str, int] = {}
-        total_count = 0
-
-        for key, pattern in TERM_PATTERNS:
-            matches = pattern.findall(content)
-            if matches:
-                terms_found[key] = terms_found.get(key, 0) + len(matches)
-                total_count += len(matches)
+        terms_found = get_term_matcher().count(content)
+        total_count = sum(terms_found.values())
 
         if not terms_found:
             return None
@@ -1,21 +1,119 @@
-"""HTML term extraction using BeautifulSoup."""
+"""HTML term extraction: a <head>/JSON-LD fast path, else BeautifulSoup."""
 from __future__ import annotations
 
+import bisect
 import re
 
 from bs4 import BeautifulSoup
 
-from ..config import TERM_PATTERNS, YEAR_RELEVANCE_PATTERNS
+from ..config import YEAR_RELEVANCE_PATTERNS
+from ..terms import get_term_matcher, ordered_counts
 from .base import BaseExtractor, ExtractionResult
+from .head import body_text, parse_head
+
+# Sentence boundaries, including CJK full-width punctuation
+_SENTENCE_END = re.compile(r"[.!?\n。！？]")
+# How far from a term to look for the enclosing sentence's boundaries
+_SENTENCE_REACH = 300
+# Term occurrences considered as phrase anchors on very repetitive pages
+_MAX_ANCHORS = 200
+_MAX_ALTERNATES = 3
+
+
+def _sentence_span(text: str, start: int, end: int) -> tuple[tuple[int, int], bool]:
+    """Bounds of the sentence around ``text[start:end]``, searched locally.
+
+    The flag is False when the sentence was too short to use and the
+    bounds are just the term with some context.
+    """
+    lo = max(0, start - _SENTENCE_REACH)
+    left = lo
+    for left_match in _SENTENCE_END.finditer(text, lo, start):
+        left = left_match.end()
+    right_match = _SENTENCE_END.search(text, end, end + _SENTENCE_REACH)
+    right = right_match.start() if right_match else min(len(text), end + _SENTENCE_REACH)
+    # Trim surrounding whitespace without slicing
+    while left < right and text[left].isspace():
+        left += 1
+    while right > left and text[right - 1].isspace():
+        right -= 1
+    if right - left < 10:
+        # Too short to read as a phrase: fall back to the term with context
+        return (max(0, start - 30), min(len(text), end + 70)), False
+    if right - left > 200:
+        return (max(left, start - 50), min(right, end + 100)), True
+    return (left, right), True
+
+
+def _entity_pattern(entity_name: str | None) -> re.Pattern | None:
+    words = (entity_name or "").split()
+    if not words:
+        return None
+    return re.compile(r"\s+".join(map(re.escape, words)), re.IGNORECASE)
+
+
+def _phrase_score(text: str, start: int, end: int, term_count: int,
+                  entity_offsets: list[int]) -> float:
+    """Rank a snippet: term density, then entity and year proximity."""
+    score = term_count / (1 + (end - start) / 100)
+    if entity_offsets:
+        i = bisect.bisect_left(entity_offsets, start)
+        if i < len(entity_offsets) and entity_offsets[i] < end:
+            score += 1.0
+        else:
+            nearest = min(
+                (abs(entity_offsets[j] - (start if j < i else end))
+                 for j in (i - 1, i) if 0 <= j < len(entity_offsets)),
+                default=_SENTENCE_REACH)
+            score += 0.5 * max(0.0, 1 - nearest / _SENTENCE_REACH)
+    if any(pat.search(text, start, end) for pat in YEAR_RELEVANCE_PATTERNS):
+        score += 0.5
+    return score
+
+
+def rank_phrases(text: str, spans: list[tuple[str, int, int]],
+                 entity_name: str | None = None) -> list[tuple[int, int]]:
+    """Sentence spans of ``text`` around the term ``spans``, best first.
+
+    Only the neighbourhood of each term occurrence is scanned for sentence
+    boundaries, and snippets are returned as offsets into ``text``.
+    Whole sentences rank ahead of context-only fallbacks.
+    """
+    entity = _entity_pattern(entity_name)
+    entity_offsets = [m.start() for m in entity.finditer(text)] if entity else []
+    starts = [start for _, start, _ in spans]
+    scored: dict[tuple[int, int], tuple[bool, float]] = {}
+    for _, start, end in spans[:_MAX_ANCHORS]:
+        bounds, is_sentence = _sentence_span(text, start, end)
+        if bounds in scored:
+            continue
+        terms_inside = (bisect.bisect_left(starts, bounds[1])
+                        - bisect.bisect_left(starts, bounds[0]))
+        scored[bounds] = (is_sentence,
+                          _phrase_score(text, *bounds, terms_inside, entity_offsets))
+    return sorted(scored, key=lambda b: (not scored[b][0], -scored[b][1], b[0]))
 
 
 class WebsiteExtractor(BaseExtractor):
-    """Extract CNY/LNY terms from HTML pages."""
+    """Extract CNY/LNY terms from HTML pages.
+
+    With ``fast_path`` (the default), the <head> metadata and JSON-LD are
+    checked first, and the body is only parsed when they are not decisive.
+    """
 
     # Tags to strip before text extraction
     STRIP_TAGS = {"script", "style", "nav", "footer", "header", "noscript", "iframe", "aside", "form", "svg"}
 
-    def extract(self, content: str, url: str) -> ExtractionResult | None:
+    def __init__(self, fast_path: bool = True):
+        self._fast_path = fast_path
+
+    def extract(self, content: str, url: str,
+                entity_name: str | None = None) -> ExtractionResult | None:
+        if self._fast_path:
+            result = self._extract_from_head(content, entity_name)
+            if result is not None:
+                return result
+
         soup = BeautifulSoup(content, "lxml")
 
         # Extract page title
@@ -39,65 +137,88 @@ class WebsiteExtractor(BaseExtractor):
             for pat in YEAR_RELEVANCE_PATTERNS
         )
 
-        # Find term matches
-        terms_found: dict[str, int] = {}
-        total_count = 0
-        for key, pattern in TERM_PATTERNS:
-            matches = pattern.findall(page_text) + pattern.findall(page_title)
-            if matches:
-                terms_found[key] = terms_found.get(key, 0) + len(matches)
-                total_count += len(matches)
+        # Find term matches (only languages whose script appears on the page);
+        # their offsets are reused for phrase selection
+        matcher = get_term_matcher()
+        spans = matcher.spans(page_text)
+        counts = matcher.count(page_title)
+        for key, _, _ in spans:
+            counts[key] = counts.get(key, 0) + 1
+        terms_found = ordered_counts(counts)
+        total_count = sum(terms_found.values())
 
         if not terms_found:
             return None
 
-        # Build exact_phrase: find the best snippet containing a term
-        exact_phrase = self._extract_best_phrase(page_text, page_title)
-
+        phrases = rank_phrases(page_text, spans, entity_name)
         return ExtractionResult(
             terms_found=list(terms_found.keys()),
-            exact_phrase=exact_phrase,
+            exact_phrase=self._best_phrase(page_text, phrases, [page_title], entity_name),
             page_title=page_title,
             page_text=page_text,
             term_count=total_count,
             year_relevant=year_relevant,
+            alternates=phrases[:_MAX_ALTERNATES],
         )
 
-    def _extract_best_phrase(self, text: str, title: str) -> str:
-        """Extract the best phrase containing a CNY/LNY term.
+    def _extract_from_head(self, content: str,
+                           entity_name: str | None = None) -> ExtractionResult | None:
+        """Build a result from <head> metadata, skipping the DOM parse.
 
-        Prefers title matches, then sentence-level matches in body text.
+        Decisive means a title-like field (title, og:title, JSON-LD
+        headline/name) has a term, the metadata is year-relevant, and the
+        body mentions no term kind the metadata lacks, so skipping the
+        full parse cannot change ``terms_found``. The body text used for
+        that check, scoring and near-duplicate fingerprints is regex-stripped.
         """
-        # Check title first
-        for _, pattern in TERM_PATTERNS:
-            match = pattern.search(title)
-            if match:
-                return title.strip()
-
-        # Find sentence containing the term in body
-        # Split on sentence boundaries
-        sentences = re.split(r'[.!?\n]+', text)
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence or len(sentence) < 10:
-                continue
-            for _, pattern in TERM_PATTERNS:
-                if pattern.search(sentence):
-                    # Truncate very long sentences
-                    if len(sentence) > 200:
-                        match = pattern.search(sentence)
-                        if match:
-                            start = max(0, match.start() - 50)
-                            end = min(len(sentence), match.end() + 100)
-                            return sentence[start:end].strip()
-                    return sentence
-
-        # Fallback: return the first term match with context
-        for _, pattern in TERM_PATTERNS:
-            match = pattern.search(text)
-            if match:
-                start = max(0, match.start() - 30)
-                end = min(len(text), match.end() + 70)
-                return text[start:end].strip()
+        matcher = get_term_matcher()
+        head = parse_head(content)
+        titles = head.titles()
+        if not any(matcher.search(t) for t in titles):
+            return None
+        head_text = " ".join([*titles, *head.descriptions(), head.meta.get("og:site_name", "")])
+        if not any(pat.search(head_text) for pat in YEAR_RELEVANCE_PATTERNS):
+            return None
+        terms_found = matcher.count(head_text)
+        page_text = body_text(content)
+        spans = matcher.spans(page_text)
+        if {key for key, _, _ in spans} - set(terms_found):
+            return None
 
+        page_title = titles[0]
+        phrases = rank_phrases(page_text, spans, entity_name)
+        return ExtractionResult(
+            terms_found=list(terms_found.keys()),
+            exact_phrase=self._best_phrase(page_text, phrases,
+                                           [*titles, *head.descriptions()], entity_name),
+            page_title=page_title,
+            page_text=page_text,
+            term_count=len(spans) + sum(matcher.count(page_title).values()),
+            year_relevant=True,
+            alternates=phrases[:_MAX_ALTERNATES],
+        )
+
+    def _best_phrase(self, text: str, phrases: list[tuple[int, int]],
+                     headings: list[str], entity_name: str | None) -> str:
+        """The title-like heading with a term if there is one, else the top body phrase.
+
+        Headings are ranked by entity and year mentions only, so a title
+        naming both wins over a bare one and ties keep the <title>.
+        """
+        matcher = get_term_matcher()
+        entity = _entity_pattern(entity_name)
+        best, best_score = "", -1.0
+        for heading in headings:
+            heading = heading.strip()
+            if not matcher.search(heading):
+                continue
+            offsets = [m.start() for m in entity.finditer(heading)] if entity else []
+            score = _phrase_score(heading, 0, len(heading), 0, offsets)
+            if score > best_score:
+                best, best_score = heading, score
+        if best:
+            return best
+        if phrases:
+            start, end = phrases[0]
+            return text[start:end]
         return ""
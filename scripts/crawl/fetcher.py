@@ -3,15 +3,18 @@ from __future__ import annotations
 
 import hashlib
 import logging
+import mmap
 import os
 import time
+from typing import Callable
 from urllib.parse import urlparse
 from urllib.robotparser import RobotFileParser
 
-import requests
-
+from .circuit import FAILURE_STATUS_CODES, CircuitBreaker
 from .config import CACHE_DIR, REQUEST_TIMEOUT, USER_AGENT
 from .rate_limiter import RateLimiter
+from .transport import Transport
+from .warc import WarcWriter
 
 logger = logging.getLogger(__name__)
 
@@ -22,30 +25,45 @@ _RETRY_DELAYS = [3, 6]  # seconds between retries
 
 
 class Fetcher:
-    """Fetches URLs with caching, rate limiting, and robots.txt compliance."""
+    """Fetches URLs with caching, rate limiting, and robots.txt compliance.
+
+    Network requests go through a pooled keep-alive ``Transport``; pass one
+    in to share connections (and their reuse stats) across Fetchers. With
+    an ``archive``, every page fetched from the network is also written to
+    it as WARC evidence. With a ``breaker``, requests to domains whose
+    circuit is open are skipped, and each request's outcome is recorded.
+    Parsed robots.txt files are kept in ``robots_cache``; pass a dict to
+    share them across Fetchers.
+    """
 
     def __init__(self, rate_limiter: RateLimiter | None = None,
-                 cache_dir: str = CACHE_DIR, use_cache: bool = True):
-        self._session = requests.Session()
-        self._session.headers.update({
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                          "AppleWebKit/537.36 (KHTML, like Gecko) "
-                          "Chrome/131.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Accept-Encoding": "gzip, deflate, br",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-        })
+                 cache_dir: str = CACHE_DIR, use_cache: bool = True,
+                 transport: Transport | None = None, http2: bool = False,
+                 archive: WarcWriter | None = None,
+                 breaker: CircuitBreaker | None = None,
+                 robots_cache: dict[str, RobotFileParser | None] | None = None):
+        self._transport = transport or Transport(http2=http2)
+        self._breaker = breaker
         self._rate_limiter = rate_limiter or RateLimiter()
+        self._archive = archive
         self._cache_dir = cache_dir
         self._use_cache = use_cache
-        self._robots_cache: dict[str, RobotFileParser | None] = {}
+        self._robots_cache = robots_cache if robots_cache is not None else {}
+        # URLs fetched from the network by this instance (fresh for refresh=True)
+        self._fetched: set[str] = set()
+        # Network time of the last request (excluding waits); fetch() resets it
+        # to None for a cache hit
+        self.last_elapsed: float | None = None
+        # Whether fetch() turned down the last URL's cached copy with its prefilter
+        self.last_prefiltered = False
 
         if use_cache:
             os.makedirs(cache_dir, exist_ok=True)
 
+    @property
+    def transport(self) -> Transport:
+        return self._transport
+
     def _cache_path(self, url: str) -> str:
         url_hash = hashlib.sha256(url.encode()).hexdigest()[:16]
         return os.path.join(self._cache_dir, f"{url_hash}.html")
@@ -56,58 +74,62 @@ class Fetcher:
         robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
 
         if robots_url not in self._robots_cache:
+            if self._breaker is not None and self._breaker.is_open(url):
+                # The page request will be short-circuited anyway
+                return True
             try:
-                resp = self._session.get(robots_url, timeout=(5, 10))
+                resp = self._transport.get(robots_url, timeout=(5, 10))
                 if resp.status_code == 200:
                     rp = RobotFileParser()
                     rp.parse(resp.text.splitlines())
                     self._robots_cache[robots_url] = rp
                 else:
                     self._robots_cache[robots_url] = None
-            except Exception:
+            except Exception as e:
                 # If we can't read robots.txt, assume allowed
                 self._robots_cache[robots_url] = None
+                if self._breaker is not None and isinstance(e, self._transport.errors):
+                    self._breaker.record_failure(url, f"robots.txt: {e}")
 
         rp = self._robots_cache[robots_url]
         if rp is None:
             return True
         return rp.can_fetch(USER_AGENT, url)
 
-    def fetch(self, url: str) -> str | None:
-        """Fetch a URL, returning HTML content or None on failure.
-
-        Uses disk cache if available, respects robots.txt and rate limits.
-        """
-        # Check cache first
-        if self._use_cache:
-            cache_path = self._cache_path(url)
-            if os.path.exists(cache_path):
-                logger.debug("Cache hit: %s", url)
-                with open(cache_path, "r", encoding="utf-8", errors="replace") as f:
-                    return f.read()
-
-        # Check robots.txt
-        if not self._check_robots(url):
-            logger.info("Blocked by robots.txt: %s", url)
+    def sitemaps_for(self, url: str) -> list[str]:
+        """Sitemap URLs for a site: those declared in robots.txt, else /sitemap.xml."""
+        parsed = urlparse(url)
+        self._check_robots(url)
+        rp = self._robots_cache.get(f"{parsed.scheme}://{parsed.netloc}/robots.txt")
+        declared = rp.site_maps() if rp is not None else None
+        return list(declared) if declared else [f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"]
+
+    def _get(self, url: str, headers: dict | None = None):
+        """Rate-limited GET with retries on transient errors; None on failure."""
+        if self._breaker is not None and not self._breaker.allow(url):
+            logger.debug("Circuit open, skipping: %s", url)
             return None
-
-        # Rate limit
         self._rate_limiter.wait(url)
 
         # Fetch with retry on transient errors
         resp = None
         for attempt in range(_MAX_RETRIES + 1):
             try:
-                resp = self._session.get(url, timeout=(5, REQUEST_TIMEOUT), allow_redirects=True)
+                started = time.monotonic()
+                resp = self._transport.get(url, timeout=(5, REQUEST_TIMEOUT),
+                                           headers=headers)
+                self.last_elapsed = time.monotonic() - started
                 if resp.status_code in _RETRYABLE_STATUS_CODES and attempt < _MAX_RETRIES:
                     delay = _RETRY_DELAYS[attempt]
                     logger.info("Retryable %d for %s, waiting %ds (attempt %d/%d)",
                                 resp.status_code, url, delay, attempt + 1, _MAX_RETRIES)
                     time.sleep(delay)
                     continue
-                resp.raise_for_status()
+                # httpx raises for every non-2xx status; a 304 answers a conditional GET
+                if resp.status_code != 304:
+                    resp.raise_for_status()
                 break
-            except requests.RequestException as e:
+            except self._transport.errors as e:
                 if resp is not None and resp.status_code in _RETRYABLE_STATUS_CODES and attempt < _MAX_RETRIES:
                     delay = _RETRY_DELAYS[attempt]
                     logger.info("Retrying %s after error, waiting %ds (attempt %d/%d)",
@@ -115,9 +137,57 @@ class Fetcher:
                     time.sleep(delay)
                     continue
                 logger.warning("Fetch failed for %s: %s", url, e)
+                if self._breaker is not None:
+                    # A missing page still shows the site is up
+                    if resp is None or resp.status_code in FAILURE_STATUS_CODES:
+                        self._breaker.record_failure(url, str(e))
+                    else:
+                        self._breaker.record_success(url)
                 return None
+        if self._breaker is not None:
+            self._breaker.record_success(url)
+        return resp
+
+    def fetch(self, url: str, refresh: bool = False,
+              prefilter: Callable[[bytes | mmap.mmap], bool] | None = None) -> str | None:
+        """Fetch a URL, returning HTML content or None on failure.
+
+        Uses disk cache if available, respects robots.txt and rate limits.
+        With ``refresh``, the cache is bypassed unless this Fetcher already
+        fetched the URL from the network. A cached page is first given to
+        ``prefilter`` as raw bytes; if it returns False, the page is not
+        decoded, ``""`` is returned and ``last_prefiltered`` is set.
+        """
+        self.last_elapsed = None
+        self.last_prefiltered = False
+        # Pages never archived are fetched fresh so they get a WARC record
+        if self._archive is not None and self._archive.pointer_for(url) is None:
+            refresh = True
+
+        # Check cache first
+        if self._use_cache and (not refresh or url in self._fetched):
+            cache_path = self._cache_path(url)
+            if os.path.exists(cache_path):
+                logger.debug("Cache hit: %s", url)
+                return self._read_cached(cache_path, url, prefilter)
+
+        # Check robots.txt
+        if not self._check_robots(url):
+            logger.info("Blocked by robots.txt: %s", url)
+            return None
+
+        resp = self._get(url)
+        if resp is None:
+            return None
 
         content = resp.text
+        self._fetched.add(url)
+
+        if self._archive is not None:
+            try:
+                self._archive.write_response(url, resp)
+            except OSError as e:
+                logger.warning("WARC write failed for %s: %s", url, e)
 
         # Write to cache
         if self._use_cache:
@@ -129,3 +199,50 @@ class Fetcher:
                 logger.warning("Cache write failed: %s", e)
 
         return content
+
+    def _read_cached(self, path: str, url: str,
+                     prefilter: Callable[[bytes | mmap.mmap], bool] | None) -> str:
+        """A cached page, mapped rather than read so ``prefilter`` sees it uncopied."""
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            try:
+                if prefilter is not None and not prefilter(data):
+                    logger.debug("Prefiltered: %s", url)
+                    self.last_prefiltered = True
+                    return ""
+                content = str(data, "utf-8", "replace")
+            finally:
+                if size:
+                    data.close()
+        # As text-mode reads did: universal newlines
+        if "\r" in content:
+            content = content.replace("\r\n", "\n").replace("\r", "\n")
+        return content
+
+    def fetch_conditional(self, url: str, etag: str = "",
+                          last_modified: str = "") -> tuple[str | None, dict] | None:
+        """GET ``url`` unless it is unchanged since the given validators.
+
+        Sends ``If-None-Match``/``If-Modified-Since`` and bypasses the disk
+        cache. Returns None on failure, else ``(content, validators)`` where
+        content is None for 304 Not Modified and ``validators`` holds the
+        ``etag`` and ``last_modified`` to send next time.
+        """
+        if not self._check_robots(url):
+            logger.info("Blocked by robots.txt: %s", url)
+            return None
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        resp = self._get(url, headers=headers)
+        if resp is None:
+            return None
+        if resp.status_code == 304:
+            # A 304 may omit validators that are still current
+            return None, {"etag": resp.headers.get("ETag", etag),
+                          "last_modified": resp.headers.get("Last-Modified", last_modified)}
+        return resp.text, {"etag": resp.headers.get("ETag", ""),
+                           "last_modified": resp.headers.get("Last-Modified", "")}
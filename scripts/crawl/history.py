@@ -0,0 +1,162 @@
+"""Per-(entity, URL) page history and terminology-change detection.
+
+For every page a crawl fetches, the store keeps the latest content hash
+and term set. An observation with the same hash is a single primary-key
+lookup and writes nothing; only when the hash differs are the term sets
+compared, and only a differing term set is logged as a change. A run's
+work is therefore proportional to the pages that changed, not to the
+history. The change log is the "terminology changed" feed, read
+incrementally by id (``crawl.py changes --after ID``).
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+from .config import OUTPUT_DIR
+
+HISTORY_DB_PATH = os.path.join(OUTPUT_DIR, "history.sqlite")
+KINDS = ("to_lunar", "to_chinese", "added", "removed", "changed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    entity_name  TEXT NOT NULL,
+    url          TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    terms        TEXT NOT NULL,  -- sorted term keys, comma-separated
+    first_seen   TEXT NOT NULL,
+    last_changed TEXT NOT NULL,
+    PRIMARY KEY (entity_name, url)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS term_changes (
+    id          INTEGER PRIMARY KEY,
+    observed    TEXT NOT NULL,
+    entity_name TEXT NOT NULL,
+    url         TEXT NOT NULL,
+    kind        TEXT NOT NULL,  -- see KINDS
+    old_terms   TEXT NOT NULL,
+    new_terms   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS term_changes_observed ON term_changes (observed);
+CREATE INDEX IF NOT EXISTS term_changes_entity ON term_changes (entity_name COLLATE NOCASE, id);
+"""
+
+
+def change_kind(old_terms: list[str], new_terms: list[str]) -> str:
+    """Classify a term-set change; switches between CNY and LNY come first."""
+    old, new = set(old_terms), set(new_terms)
+    if "chinese_new_year" in old - new and "lunar_new_year" in new - old:
+        return "to_lunar"
+    if "lunar_new_year" in old - new and "chinese_new_year" in new - old:
+        return "to_chinese"
+    if not old:
+        return "added"
+    if not new:
+        return "removed"
+    return "changed"
+
+
+def _split(terms: str) -> list[str]:
+    return terms.split(",") if terms else []
+
+
+@dataclass
+class TermChange:
+    entity_name: str
+    url: str
+    observed: str
+    kind: str
+    old_terms: list[str]
+    new_terms: list[str]
+    id: int | None = None  # feed position; None for changes not written (dry runs)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class HistoryStore:
+    """Latest content hash and terms per (entity, URL), plus the change log.
+
+    With ``read_only``, changes are still detected but nothing is written,
+    so a dry run does not consume them.
+    """
+
+    def __init__(self, path: str = HISTORY_DB_PATH, read_only: bool = False):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._read_only = read_only
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def observe(self, entity_name: str, url: str, content_hash: str, terms: list[str],
+                now: datetime | None = None) -> TermChange | None:
+        """Record a fetch of ``url`` for ``entity_name``; returns its term change, if any.
+
+        The first observation of a page is its baseline, not a change.
+        """
+        row = self._conn.execute(
+            "SELECT content_hash, terms FROM pages WHERE entity_name = ? AND url = ?",
+            (entity_name, url)).fetchone()
+        if row is not None and row[0] == content_hash:
+            return None
+        observed = (now or datetime.now()).isoformat(timespec="seconds")
+        new_terms = ",".join(sorted(set(terms)))
+        change = None
+        if row is not None and row[1] != new_terms:
+            change = TermChange(entity_name, url, observed,
+                                change_kind(_split(row[1]), _split(new_terms)),
+                                _split(row[1]), _split(new_terms))
+        if self._read_only:
+            return change
+
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (entity_name, url) DO UPDATE SET "
+                "content_hash = excluded.content_hash, terms = excluded.terms, "
+                "last_changed = excluded.last_changed",
+                (entity_name, url, content_hash, new_terms, observed, observed))
+            if change is not None:
+                change.id = self._conn.execute(
+                    "INSERT INTO term_changes (observed, entity_name, url, kind, "
+                    "old_terms, new_terms) VALUES (?, ?, ?, ?, ?, ?)",
+                    (observed, entity_name, url, change.kind, row[1], new_terms),
+                ).lastrowid
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return change
+
+    def changes(self, after: int = 0, since: str | None = None, entity: str | None = None,
+                kinds: list[str] | None = None, limit: int | None = None) -> list[TermChange]:
+        """Logged changes in feed order (oldest first).
+
+        ``after`` is the id of the last change already read; ``since`` an
+        ISO date or timestamp; ``entity`` a case-insensitive substring.
+        """
+        where, params = ["id > ?"], [after]
+        if since:
+            where.append("observed >= ?")
+            params.append(since)
+        if entity:
+            where.append("instr(lower(entity_name), ?) > 0")
+            params.append(entity.lower())
+        if kinds:
+            where.append(f"kind IN ({', '.join('?' * len(kinds))})")
+            params.extend(kinds)
+        sql = ("SELECT id, observed, entity_name, url, kind, old_terms, new_terms "
+               "FROM term_changes WHERE " + " AND ".join(where) + " ORDER BY id")
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [TermChange(entity_name=name, url=url, observed=observed, kind=kind,
+                           old_terms=_split(old), new_terms=_split(new), id=change_id)
+                for change_id, observed, name, url, kind, old, new
+                in self._conn.execute(sql, params)]
@@ -0,0 +1,149 @@
+"""SimHash near-duplicate index over extracted page text, persisted across runs."""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+
+from .config import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+NEARDUP_PATH = os.path.join(CACHE_DIR, "neardup.json")
+
+# 8 x 8-bit bands: by pigeonhole, any fingerprint within Hamming distance 7
+# shares at least one band exactly with the query
+_FINGERPRINT_BITS = 64
+_BANDS = 8
+_BAND_BITS = _FINGERPRINT_BITS // _BANDS
+_MAX_DISTANCE = 6
+_SHINGLE_SIZE = 3
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def simhash(text: str, shingle_size: int = _SHINGLE_SIZE) -> int:
+    """Return a 64-bit SimHash of word shingles in ``text``."""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < shingle_size:
+        shingles = [" ".join(tokens)] if tokens else []
+    else:
+        shingles = [" ".join(tokens[i:i + shingle_size])
+                    for i in range(len(tokens) - shingle_size + 1)]
+
+    weights = [0] * _FINGERPRINT_BITS
+    for shingle in shingles:
+        h = int.from_bytes(
+            hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(_FINGERPRINT_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _bands(fingerprint: int) -> list[tuple[int, int]]:
+    mask = (1 << _BAND_BITS) - 1
+    return [(i, (fingerprint >> (i * _BAND_BITS)) & mask) for i in range(_BANDS)]
+
+
+class NearDupIndex:
+    """Banded SimHash lookup keyed by URL.
+
+    Each page is stored as ``url -> (fingerprint, entity_name)``. Lookups
+    only compare against pages sharing at least one 8-bit band, so cost
+    stays proportional to the number of near candidates, not the index size.
+    """
+
+    def __init__(self, path: str = NEARDUP_PATH, max_distance: int = _MAX_DISTANCE):
+        self._path = path
+        self._max_distance = max_distance
+        self._pages: dict[str, tuple[int, str]] = {}
+        self._buckets: dict[tuple[int, int], set[str]] = {}
+        self._changed: set[str] = set()  # URLs added since the last save
+        self._load(self._read())
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def _read(self) -> dict[str, dict]:
+        """The saved pages, as stored: url -> {"simhash", "entity"}."""
+        if not os.path.exists(self._path):
+            return {}
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                return json.load(f).get("pages", {})
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Ignoring unreadable near-dup index %s: %s", self._path, e)
+            return {}
+
+    def _load(self, pages: dict[str, dict]) -> None:
+        for url, page in pages.items():
+            self._insert(url, int(page["simhash"], 16), page.get("entity", ""))
+
+    def save(self) -> None:
+        # Re-read so concurrent shards/workers do not drop each other's pages
+        pages = self._read()
+        for url in self._changed:
+            fp, entity = self._pages[url]
+            pages[url] = {"simhash": f"{fp:016x}", "entity": entity}
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            tmp = f"{self._path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "pages": pages}, f, ensure_ascii=False)
+            os.replace(tmp, self._path)
+        except OSError as e:
+            logger.warning("Near-dup index write failed: %s", e)
+            return
+        self._changed.clear()
+        self._load(pages)
+
+    def _insert(self, url: str, fingerprint: int, entity_name: str) -> None:
+        self._remove(url)
+        self._pages[url] = (fingerprint, entity_name)
+        for band in _bands(fingerprint):
+            self._buckets.setdefault(band, set()).add(url)
+
+    def _remove(self, url: str) -> None:
+        old = self._pages.pop(url, None)
+        if old is None:
+            return
+        for band in _bands(old[0]):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(url)
+
+    def add(self, url: str, fingerprint: int, entity_name: str = "") -> None:
+        """Record (or replace) the fingerprint for a URL."""
+        self._insert(url, fingerprint, entity_name)
+        self._changed.add(url)
+
+    def find(self, fingerprint: int, entity_name: str | None = None,
+             exclude_url: str | None = None) -> list[str]:
+        """Return URLs of near-duplicate pages, closest first.
+
+        If ``entity_name`` is given, only pages recorded for that entity match.
+        """
+        candidates: set[str] = set()
+        for band in _bands(fingerprint):
+            candidates |= self._buckets.get(band, set())
+        matches = []
+        for url in candidates:
+            if url == exclude_url:
+                continue
+            fp, entity = self._pages[url]
+            if entity_name is not None and entity != entity_name:
+                continue
+            distance = hamming(fp, fingerprint)
+            if distance <= self._max_distance:
+                matches.append((distance, url))
+        return [url for _, url in sorted(matches)]
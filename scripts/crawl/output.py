@@ -1,43 +1,102 @@
 """Write auto-add JSONL, review queue, and crawl report."""
 from __future__ import annotations
 
+import glob
 import json
 import os
 from datetime import datetime
 
-from .config import DATA_FILE, OUTPUT_DIR
+from .config import CURRENT_YEAR, OUTPUT_DIR
+from .datastore import DataStore
+from .entities import DedupKeys
 from .entry import EntryCandidate
+from .reviewstore import ReviewStore
 
 
-def ensure_output_dir():
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+AUTO_ADD_NAME = "auto_add.jsonl"
+REVIEW_QUEUE_NAME = "review_queue.jsonl"
+REPORT_NAME = "crawl_report.json"
+PARTS_DIR = os.path.join(OUTPUT_DIR, "parts")
+_MERGED_MARKER = ".merged"
 
 
-def write_auto_add(entries: list[EntryCandidate], data_file: str = DATA_FILE) -> int:
-    """Append high-confidence entries to the data JSONL file. Returns count written."""
+def ensure_output_dir(output_dir: str = OUTPUT_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+
+
+def write_auto_add(entries: list[EntryCandidate], year: int = CURRENT_YEAR,
+                   store: DataStore | None = None) -> int:
+    """Append high-confidence entries to the year partition. Returns count written."""
     if not entries:
         return 0
-    with open(data_file, "a", encoding="utf-8") as f:
+    store = store or DataStore()
+    return store.append([entry.to_entry_dict() for entry in entries], year=year)
+
+
+def write_staged_auto_add(entries: list[EntryCandidate], output_dir: str) -> int:
+    """Append auto-add entries to ``output_dir`` for a later --merge.
+
+    Shards and workers stage their entries instead of writing to data/ so
+    that concurrent processes never append to the same partition.
+    """
+    if not entries:
+        return 0
+    ensure_output_dir(output_dir)
+    with open(os.path.join(output_dir, AUTO_ADD_NAME), "a", encoding="utf-8") as f:
         for entry in entries:
             f.write(entry.to_jsonl() + "\n")
     return len(entries)
 
 
-def write_review_queue(entries: list[EntryCandidate]) -> int:
-    """Write medium-confidence entries to review queue. Returns count written."""
+def review_row(entry: EntryCandidate) -> dict:
+    """Entry dict plus its confidence and factor breakdown, for review."""
+    obj = entry.to_entry_dict()
+    obj["_confidence"] = entry.confidence
+    obj["_factors"] = entry.factors
+    return obj
+
+
+def write_review_queue(entries: list[EntryCandidate], output_dir: str = OUTPUT_DIR,
+                       append: bool = False) -> int:
+    """Stage medium-confidence entries as a review-queue JSONL for --merge.
+
+    Returns count written.
+    """
     if not entries:
         return 0
-    ensure_output_dir()
-    path = os.path.join(OUTPUT_DIR, "review_queue.jsonl")
-    with open(path, "w", encoding="utf-8") as f:
+    ensure_output_dir(output_dir)
+    path = os.path.join(output_dir, REVIEW_QUEUE_NAME)
+    with open(path, "a" if append else "w", encoding="utf-8") as f:
         for entry in entries:
-            # Include confidence score in the review output
-            obj = entry.to_entry_dict()
-            obj["_confidence"] = entry.confidence
-            f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+            f.write(json.dumps(review_row(entry), ensure_ascii=False) + "\n")
+    return len(entries)
+
+
+def store_review_queue(entries: list[EntryCandidate],
+                       review_store: ReviewStore | None = None) -> int:
+    """Upsert medium-confidence entries into the review store. Returns count stored."""
+    if not entries:
+        return 0
+    review_store = review_store or ReviewStore()
+    review_store.upsert([review_row(entry) for entry in entries])
     return len(entries)
 
 
+def export_review_queue(candidates: list[dict], path: str) -> int:
+    """Write review-store candidates as JSONL for reading or hand-editing.
+
+    Each line is the entry dict plus ``_id``, ``_state``, ``_confidence``
+    and ``_factors``. Returns count written.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for c in candidates:
+            obj = {**c["entry"], "_id": c["id"], "_state": c["state"],
+                   "_confidence": c["confidence"], "_factors": c["factors"]}
+            f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    return len(candidates)
+
+
 def write_crawl_report(
     auto_added: list[EntryCandidate],
     review: list[EntryCandidate],
@@ -46,19 +105,38 @@ def write_crawl_report(
     targets_processed: int,
     urls_fetched: int,
     errors: list[str],
+    near_duplicates: int = 0,
+    urls_discovered: int = 0,
+    skipped_not_due: int = 0,
+    urls_rendered: int = 0,
+    skipped_rejected: int = 0,
+    skipped_circuit_open: int = 0,
+    skipped_prefiltered: int = 0,
+    output_dir: str = OUTPUT_DIR,
+    extra: dict | None = None,
 ) -> str:
-    """Write a JSON crawl report. Returns the report file path."""
-    ensure_output_dir()
-    path = os.path.join(OUTPUT_DIR, "crawl_report.json")
+    """Write a JSON crawl report. Returns the report file path.
+
+    ``extra`` keys are added at the top level of the report.
+    """
+    ensure_output_dir(output_dir)
+    path = os.path.join(output_dir, REPORT_NAME)
     report = {
         "timestamp": datetime.now().isoformat(),
         "summary": {
             "targets_processed": targets_processed,
             "urls_fetched": urls_fetched,
+            "urls_discovered": urls_discovered,
+            "urls_rendered": urls_rendered,
+            "skipped_not_due": skipped_not_due,
             "auto_added": len(auto_added),
             "review_queue": len(review),
             "discarded": discarded,
             "skipped_dedup": skipped_dedup,
+            "skipped_rejected": skipped_rejected,
+            "skipped_circuit_open": skipped_circuit_open,
+            "skipped_prefiltered": skipped_prefiltered,
+            "near_duplicates": near_duplicates,
         },
         "auto_added_entries": [
             {"entity_name": e.entity_name, "source_url": e.source_url,
@@ -72,6 +150,111 @@ def write_crawl_report(
         ],
         "errors": errors,
     }
+    if extra:
+        report.update(extra)
     with open(path, "w", encoding="utf-8") as f:
         json.dump(report, f, indent=2, ensure_ascii=False)
     return path
+
+
+def _read_jsonl(path: str) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return rows
+
+
+def _row_key(row: dict) -> tuple[str, str]:
+    sources = row.get("sources", [])
+    return (row.get("entity_name", ""), sources[0]["url"] if sources else "")
+
+
+def merge_parts(existing_keys: DedupKeys, parts_dir: str = PARTS_DIR,
+                output_dir: str = OUTPUT_DIR, year: int = CURRENT_YEAR,
+                store: DataStore | None = None, dry_run: bool = False,
+                review_store: ReviewStore | None = None) -> dict:
+    """Combine staged shard/worker outputs into the dataset and one report.
+
+    Auto-add rows are deduplicated against ``existing_keys`` and each other
+    and appended to the year partition; review rows are deduplicated and
+    upserted into the review store. Merged part directories are marked so
+    a second merge does not apply them again.
+    """
+    parts = sorted(p for p in glob.glob(os.path.join(parts_dir, "*"))
+                   if os.path.isdir(p) and not os.path.exists(os.path.join(p, _MERGED_MARKER)))
+    seen = existing_keys.copy()
+    auto_rows: list[dict] = []
+    review_rows: list[dict] = []
+    summary: dict[str, int] = {}
+    errors: list[str] = []
+    auto_report: list[dict] = []
+    review_report: list[dict] = []
+
+    for part in parts:
+        for row in _read_jsonl(os.path.join(part, AUTO_ADD_NAME)):
+            key = _row_key(row)
+            if key in seen:
+                continue
+            seen.add(key)
+            auto_rows.append(row)
+        report_path = os.path.join(part, REPORT_NAME)
+        if os.path.exists(report_path):
+            with open(report_path, "r", encoding="utf-8") as f:
+                report = json.load(f)
+            for k, v in report.get("summary", {}).items():
+                if isinstance(v, int):
+                    summary[k] = summary.get(k, 0) + v
+            errors.extend(report.get("errors", []))
+            auto_report.extend(report.get("auto_added_entries", []))
+            review_report.extend(report.get("review_entries", []))
+
+    # Review rows lose to auto-adds and to each other
+    for part in parts:
+        for row in _read_jsonl(os.path.join(part, REVIEW_QUEUE_NAME)):
+            key = _row_key(row)
+            if key in seen:
+                continue
+            seen.add(key)
+            review_rows.append(row)
+
+    if not dry_run:
+        if auto_rows:
+            (store or DataStore()).append(auto_rows, year=year)
+        if review_rows:
+            owned = review_store is None
+            review_store = review_store or ReviewStore()
+            try:
+                review_store.upsert(review_rows)
+            finally:
+                if owned:
+                    review_store.close()
+        ensure_output_dir(output_dir)
+        summary["auto_added"] = len(auto_rows)
+        summary["review_queue"] = len(review_rows)
+        added_keys = {_row_key(r) for r in auto_rows}
+        report = {
+            "timestamp": datetime.now().isoformat(),
+            "merged_parts": [os.path.basename(p) for p in parts],
+            "summary": summary,
+            "auto_added_entries": [
+                e for e in auto_report
+                if (e["entity_name"], e["source_url"]) in added_keys
+            ],
+            "review_entries": review_report,
+            "errors": errors,
+        }
+        with open(os.path.join(output_dir, REPORT_NAME), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        for part in parts:
+            open(os.path.join(part, _MERGED_MARKER), "w").close()
+
+    return {"parts": len(parts), "auto_added": len(auto_rows),
+            "review_queue": len(review_rows)}
@@ -5,30 +5,55 @@ import json
 import logging
 import os
 import re
+import socket
+import time
+from datetime import date, datetime
+from typing import Callable
 
+from .circuit import CircuitBreaker
 from .config import (
-    AUTO_ADD_THRESHOLD, DATA_FILE, REVIEW_THRESHOLD, SCHEMA_PATH,
-    TERM_KEY_TO_STRING,
+    AUTO_ADD_THRESHOLD, CACHE_DIR, CURRENT_YEAR, OUTPUT_DIR, REVIEW_THRESHOLD, SCHEMA_PATH,
+    TARGETS_PATH, TERM_KEY_TO_STRING, VALID_CONTEXTS, VALID_ENTITY_TYPES,
 )
+from .datastore import DataStore
+from .discovery import DEFAULT_MAX_URLS, Discoverer
+from .entities import DedupKeys
 from .entry import EntryCandidate
 from .existing import load_existing_keys
 from .extractors import get_extractor
+from .extractors.base import ExtractionResult
 from .extractors.twitter import TwitterExtractor
 from .fetcher import Fetcher
-from .output import write_auto_add, write_crawl_report, write_review_queue
+from .history import HistoryStore, TermChange
+from .neardup import NearDupIndex, simhash
+from .output import (
+    PARTS_DIR, export_review_queue, merge_parts, store_review_queue, write_auto_add,
+    write_crawl_report, write_review_queue, write_staged_auto_add,
+)
+from .profiling import Profiler
 from .rate_limiter import RateLimiter
-from .scoring import score_candidate
-from .targets import Target, load_targets
+from .renderer import RenderPool, RenderUnavailable
+from .reviewstore import ReviewStore
+from .scheduler import Scheduler, content_hash
+from .scoring import score_factors, total_score
+from .sharding import restrict_to_domains, shard_domains
+from .targets import Target, TargetURL, load_domains, load_targets
+from .terms import get_term_matcher
+from .transport import Transport
+from .warc import WarcWriter
+from .workqueue import DEFAULT_LEASE_SECONDS, QUEUE_PATH, WorkQueue
 
 logger = logging.getLogger(__name__)
 
+# Work left over when a time-budgeted run stopped, for ``resume=True``
+BUDGET_RESUME_PATH = os.path.join(CACHE_DIR, "budget_resume.json")
+# Pages whose (entity, URL) is already in data/ can only repeat a known entry
+_KNOWN_PAGE_YIELD = 0.05
+
 # Minimal schema validation (mirrors validate.py checks)
 URL_RE = re.compile(r"^https?://\S+$")
 DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
 
-VALID_ENTITY_TYPES = {"company", "school", "gov", "media", "nonprofit", "app", "other"}
-VALID_CONTEXTS = {"social_post", "press_release", "product_ui", "email",
-                  "event_page", "website", "other"}
 VALID_TERM_STRINGS = {"Chinese New Year", "Lunar New Year", "Spring Festival", "other"}
 VALID_TERM_ARRAY_ITEMS = {"chinese_new_year", "lunar_new_year", "spring_festival", "other"}
 
@@ -80,6 +105,28 @@ def validate_entry_dict(entry: dict) -> list[str]:
     return errors
 
 
+def score_result(candidate: EntryCandidate, result: ExtractionResult) -> float:
+    """Score ``candidate`` from its page's extraction result; sets factors and confidence."""
+    candidate.factors = score_factors(
+        candidate,
+        page_title=result.page_title,
+        page_text=result.page_text,
+        term_count=result.term_count,
+    )
+    candidate.confidence = total_score(candidate.factors)
+    return candidate.confidence
+
+
+def route_for(confidence: float, auto_threshold: float = AUTO_ADD_THRESHOLD,
+              review_threshold: float = REVIEW_THRESHOLD) -> str:
+    """Where a candidate goes: "auto_add", "review" or "discard"."""
+    if confidence >= auto_threshold:
+        return "auto_add"
+    if confidence >= review_threshold:
+        return "review"
+    return "discard"
+
+
 def run_pipeline(
     targets_path: str | None = None,
     entity_filter: str | None = None,
@@ -90,22 +137,79 @@ def run_pipeline(
     max_targets: int | None = None,
     auto_threshold: float = AUTO_ADD_THRESHOLD,
     review_threshold: float = REVIEW_THRESHOLD,
+    discover: bool = False,
+    discover_budget: int = DEFAULT_MAX_URLS,
+    due_only: bool = False,
+    domains: set[str] | None = None,
+    part_dir: str | None = None,
+    entity_type: str | None = None,
+    country: str | None = None,
+    http2: bool = False,
+    transport: Transport | None = None,
+    warc: bool = False,
+    render: bool = True,
+    time_budget: float | None = None,
+    resume: bool = False,
+    targets: list[Target] | None = None,
+    existing_keys: DedupKeys | None = None,
+    robots_cache: dict | None = None,
+    rate_limiter: RateLimiter | None = None,
+    on_candidate: Callable[[EntryCandidate, str], None] | None = None,
+    profiler: Profiler | None = None,
+    heartbeat: Callable[[], None] | None = None,
 ) -> dict:
     """Run the full crawl pipeline.
 
+    ``domains`` restricts the crawl to URLs on those domains (shard/worker
+    mode). With ``part_dir``, auto-add entries, the review queue and the
+    report are staged there for ``merge_parts`` instead of written to data/.
+    Pass a ``transport`` to keep its connections alive across runs. With
+    ``warc`` (ignored on dry runs), fetched pages are archived under
+    evidence/warc/ and entries point at their record. Targets flagged
+    ``render`` get a headless-browser pass for pages whose plain HTML has no
+    terms, unless ``render`` is False. Medium-confidence candidates go to
+    the persistent review store, and URLs rejected there are not fetched.
+    URLs on domains whose circuit breaker is open are skipped.
+    Each fetched page's content hash and terms are recorded in the history
+    store, and pages whose term set changed are reported (and, unless
+    this is a dry run, added to the terminology-change feed).
+    Targets' newsroom ``feeds`` are polled with conditional GETs, and only
+    items not seen on an earlier (non-dry) run are fetched and scored.
+
+    With ``time_budget`` (seconds), pages are fetched in order of expected
+    yield per second (see ``order_by_value``) and the run stops when the
+    budget is spent; the work left is saved to BUDGET_RESUME_PATH (except
+    for dry runs and staged ``part_dir`` runs). ``resume`` processes only
+    that saved work.
+
+    A long-running caller can keep state warm across runs: ``targets`` is
+    crawled instead of the (filtered) targets file, ``existing_keys``
+    replaces reloading data/ for dedup and gains the entries this run
+    writes, and ``robots_cache`` and ``rate_limiter`` are shared with the
+    run's Fetcher.
+    ``on_candidate`` is called with every scored candidate and its route
+    ("auto_add", "review" or "discard") as the run goes. A ``profiler`` is
+    told which stage (load_targets, load_existing_keys, fetch, extract,
+    score, output) the run is in. ``heartbeat`` is called before each
+    target is planned and each page is processed, e.g. to renew leases.
+
     Returns a summary dict with counts.
     """
-    # Load targets
-    path = targets_path or None
-    targets = load_targets(path) if path else load_targets()
-
-    # Filter by entity name if specified
-    if entity_filter:
-        entity_lower = entity_filter.lower()
-        targets = [t for t in targets if entity_lower in t.entity_name.lower()]
-        if not targets:
-            logger.warning("No targets matching '%s'", entity_filter)
-            return {"error": f"No targets matching '{entity_filter}'"}
+    stage = (profiler or Profiler()).stage
+    # Load targets, filtered through the compiled targets index
+    if targets is None:
+        with stage("load_targets"):
+            targets = load_targets(targets_path or TARGETS_PATH, entity=entity_filter,
+                                   entity_type=entity_type, country=country,
+                                   domains=domains)
+    if not targets and (entity_filter or entity_type or country):
+        wanted = ", ".join(f for f in (entity_filter, entity_type, country) if f)
+        logger.warning("No targets matching '%s'", wanted)
+        return {"error": f"No targets matching '{wanted}'"}
+
+    # Drop URLs on domains owned by other shards/workers
+    if domains is not None:
+        targets = restrict_to_domains(targets, domains)
 
     # Limit targets
     if max_targets is not None:
@@ -114,173 +218,625 @@ def run_pipeline(
     logger.info("Processing %d target(s)", len(targets))
 
     # Load existing entries for dedup
-    existing_keys = load_existing_keys()
-    logger.info("Loaded %d existing entries for dedup", len(existing_keys))
+    store = DataStore()
+    with stage("load_existing_keys"):
+        if existing_keys is None:
+            existing_keys = load_existing_keys(store=store)
+            logger.info("Loaded %d existing entries for dedup", len(existing_keys))
+        review_store = ReviewStore(entities=existing_keys.entities)
+        rejected_keys = DedupKeys(review_store.keys("rejected"),
+                                  entities=existing_keys.entities)
+        review_keys = DedupKeys(review_store.keys("pending") | review_store.keys("accepted"),
+                                entities=existing_keys.entities)
 
     # Initialize components
-    rate_limiter = RateLimiter()
-    fetcher = Fetcher(rate_limiter=rate_limiter)
+    rate_limiter = rate_limiter or RateLimiter()
+    archive = WarcWriter() if warc and not dry_run else None
+    breaker = CircuitBreaker()
+    fetcher = Fetcher(rate_limiter=rate_limiter,
+                      transport=transport or Transport(http2=http2),
+                      archive=archive, breaker=breaker, robots_cache=robots_cache)
     website_extractor = get_extractor("website")
     twitter_extractor = TwitterExtractor()
+    feed_extractor = get_extractor("feed")
+    neardup = NearDupIndex()
+    renderer = RenderPool(rate_limiter=rate_limiter) if render else None
+    scheduler = Scheduler()
+    history = HistoryStore(read_only=dry_run)
+    # Sitemap entries last modified before the season started are ignored
+    discoverer = Discoverer(fetcher, max_urls=discover_budget,
+                            since=date(CURRENT_YEAR - 1, 10, 1), refresh=due_only)
 
     # Collect results
     auto_add: list[EntryCandidate] = []
     review: list[EntryCandidate] = []
     discarded = 0
     skipped_dedup = 0
+    near_duplicates = 0
+    urls_discovered = 0
     urls_fetched = 0
+    urls_rendered = 0
+    skipped_not_due = 0
+    skipped_rejected = 0
+    skipped_circuit_open = 0
+    skipped_prefiltered = 0
+    term_changes: list[TermChange] = []
+    # Candidates kept (auto-add or review) this run, by URL, so
+    # near-duplicates can be collapsed into them
+    run_candidates: dict[str, EntryCandidate] = {}
+    # Item pages of newsroom feeds, extracted with the feed extractor
+    feed_links: set[str] = set()
     errors: list[str] = []
 
-    for target in targets:
-        logger.info("Processing: %s", target.entity_name)
+    # Plan the work: each target's pages (listed, discovered and new feed
+    # items), then its Twitter search (``None`` in place of a TargetURL)
+    deadline = time.monotonic() + time_budget if time_budget else None
+    work: list[tuple[Target, TargetURL | None]] = []
+    remaining: list[tuple[Target, TargetURL | None]] = []
+    to_plan = targets
+    if resume:
+        work = load_resume(targets, feed_links)
+        logger.info("Resuming %d work item(s) from %s", len(work), BUDGET_RESUME_PATH)
+        to_plan = []
+    for target in to_plan:
+        if heartbeat is not None:
+            heartbeat()
+        searches_twitter = (not web_only and target.twitter_handle is not None
+                            and twitter_extractor.is_available())
+        if deadline is not None and time.monotonic() >= deadline:
+            # Out of time while planning: leave the target for a resumed run
+            if not twitter_only:
+                remaining.extend((target, u) for u in target.urls)
+            if searches_twitter:
+                remaining.append((target, None))
+            continue
 
-        # --- Website URLs ---
         if not twitter_only:
-            for target_url in target.urls:
-                url = target_url.url
-                logger.debug("  Fetching: %s", url)
-
-                html = fetcher.fetch(url)
-                urls_fetched += 1
-
-                if html is None:
-                    errors.append(f"Failed to fetch: {url}")
-                    continue
-
-                result = website_extractor.extract(html, url)
-                if result is None:
-                    logger.debug("  No terms found: %s", url)
+            target_urls = list(target.urls)
+            if discover or target.discover is not None:
+                with stage("fetch"):
+                    discovered = discoverer.discover(target, target.discover)
+                if discovered:
+                    logger.info("Discovered %d URL(s) for %s", len(discovered),
+                                target.entity_name)
+                urls_discovered += len(discovered)
+                target_urls.extend(discovered)
+            for feed in target.feeds:
+                with stage("fetch"):
+                    items = feed_extractor.poll(feed.url, fetcher)
+                if items is None:
+                    errors.append(f"Failed to fetch feed: {feed.url}")
                     continue
-
-                if not result.year_relevant:
-                    logger.debug("  Not year-relevant: %s", url)
-                    # Still process but note it — recency scoring handles the penalty
-                    pass
-
-                candidate = EntryCandidate(
-                    entity_name=target.entity_name,
-                    entity_type=target.entity_type,
-                    country_or_region=target.country_or_region,
-                    terms_found=result.terms_found,
-                    exact_phrase=result.exact_phrase,
-                    context=target_url.context,
-                    platform=target_url.platform,
-                    source_url=url,
-                    notes=f"Auto-crawled from {target_url.platform}",
-                )
-
-                # Dedup check
-                if candidate.dedup_key in existing_keys:
-                    logger.debug("  Skipping duplicate: %s", url)
-                    skipped_dedup += 1
-                    continue
-
-                # Score
-                confidence = score_candidate(
-                    candidate,
-                    page_title=result.page_title,
-                    page_text=result.page_text,
-                    term_count=result.term_count,
-                )
-                candidate.confidence = confidence
-                logger.info("  Score %.3f for %s (%s)",
-                            confidence, target.entity_name, url)
-
-                # Route
-                if confidence >= auto_threshold:
-                    auto_add.append(candidate)
-                elif confidence >= review_threshold:
-                    review.append(candidate)
-                else:
-                    discarded += 1
-                    logger.debug("  Discarded (score %.3f): %s", confidence, url)
+                if items:
+                    logger.info("%d new item(s) in feed %s", len(items), feed.url)
+                for item in items:
+                    feed_links.add(item.link)
+                    target_urls.append(TargetURL(url=item.link, context=feed.context,
+                                                 platform=feed.platform))
+            work.extend((target, u) for u in target_urls)
+        if searches_twitter:
+            work.append((target, None))
+
+    if deadline is not None:
+        work = order_by_value(work, scheduler, existing_keys, rate_limiter)
+
+    current = None
+    processed = 0
+    for i, (target, target_url) in enumerate(work):
+        if heartbeat is not None:
+            heartbeat()
+        if deadline is not None:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                logger.info("Time budget used up; %d work item(s) left", len(work) - i)
+                remaining.extend(work[i:])
+                break
+            # Leave fetches expected to overrun the budget for a resumed run
+            if target_url is not None and scheduler.expected_cost(
+                    target_url.url, rate_limiter.delay_for(target_url.url)) > left:
+                remaining.append((target, target_url))
+                continue
+        processed += 1
+        if target is not current:
+            logger.info("Processing: %s", target.entity_name)
+            current = target
 
         # --- Twitter ---
-        if not web_only and target.twitter_handle and twitter_extractor.is_available():
+        if target_url is None:
             logger.info("  Searching Twitter: %s", target.twitter_handle)
             try:
-                tweet_results = twitter_extractor.search_user_tweets(target.twitter_handle)
-                for result in tweet_results:
-                    candidate = EntryCandidate(
-                        entity_name=target.entity_name,
-                        entity_type=target.entity_type,
-                        country_or_region=target.country_or_region,
-                        terms_found=result.terms_found,
-                        exact_phrase=result.exact_phrase,
-                        context="social_post",
-                        platform="X",
-                        source_url=f"https://x.com/{target.twitter_handle.lstrip('@')}",
-                        notes="Auto-crawled from Twitter/X",
-                    )
-
-                    if candidate.dedup_key in existing_keys:
-                        skipped_dedup += 1
-                        continue
-
-                    confidence = score_candidate(
-                        candidate,
-                        page_title="",
-                        page_text=result.page_text,
-                        term_count=result.term_count,
-                    )
-                    candidate.confidence = confidence
-
-                    if confidence >= auto_threshold:
-                        auto_add.append(candidate)
-                    elif confidence >= review_threshold:
-                        review.append(candidate)
-                    else:
-                        discarded += 1
+                with stage("fetch"):
+                    tweet_results = twitter_extractor.search_user_tweets(
+                        target.twitter_handle)
+                with stage("score"):
+                    for result in tweet_results:
+                        candidate = EntryCandidate(
+                            entity_name=target.entity_name,
+                            entity_type=target.entity_type,
+                            country_or_region=target.country_or_region,
+                            terms_found=result.terms_found,
+                            exact_phrase=result.exact_phrase,
+                            context="social_post",
+                            platform="X",
+                            source_url=f"https://x.com/{target.twitter_handle.lstrip('@')}",
+                            notes="Auto-crawled from Twitter/X",
+                        )
+
+                        if candidate.dedup_key in existing_keys:
+                            skipped_dedup += 1
+                            continue
+                        if candidate.dedup_key in rejected_keys:
+                            skipped_rejected += 1
+                            continue
+
+                        route = route_for(score_result(candidate, result),
+                                          auto_threshold, review_threshold)
+                        if route == "auto_add":
+                            auto_add.append(candidate)
+                        elif route == "review":
+                            review.append(candidate)
+                        else:
+                            discarded += 1
+                        if on_candidate is not None:
+                            on_candidate(candidate, route)
             except Exception as e:
                 errors.append(f"Twitter error for {target.twitter_handle}: {e}")
-
-    # Validate auto-add entries; demote invalid ones to review
-    validated_auto: list[EntryCandidate] = []
-    for candidate in auto_add:
-        entry_dict = candidate.to_entry_dict()
-        validation_errors = validate_entry_dict(entry_dict)
-        if validation_errors:
-            logger.warning("Validation failed for %s, demoting to review: %s",
-                           candidate.entity_name, validation_errors)
-            candidate.notes += f" [validation errors: {'; '.join(validation_errors)}]"
-            review.append(candidate)
+            continue
+
+        # --- Website URL ---
+        url = target_url.url
+        if (target.entity_name, url) in rejected_keys:
+            logger.debug("  Rejected in review: %s", url)
+            skipped_rejected += 1
+            continue
+        if due_only and not scheduler.is_due(url):
+            logger.debug("  Not due: %s", url)
+            skipped_not_due += 1
+            continue
+        if not breaker.allow(url):
+            logger.debug("  Circuit open: %s", url)
+            skipped_circuit_open += 1
+            if url in feed_links:
+                feed_extractor.forget(url)
+            continue
+        logger.debug("  Fetching: %s", url)
+
+        # Due URLs are refetched rather than replayed from the disk cache.
+        # A cached copy with no term anchor in its raw bytes is not decoded
+        # or parsed at all; pages that may be rendered, and feed items (whose
+        # feed content is tried too), always are.
+        prefilter = None
+        if not target.render and url not in feed_links:
+            byte_prefilter = get_term_matcher().byte_prefilter
+            prefilter = byte_prefilter.may_contain if byte_prefilter else None
+        with stage("fetch"):
+            html = fetcher.fetch(url, refresh=due_only, prefilter=prefilter)
+        urls_fetched += 1
+        if fetcher.last_prefiltered:
+            logger.debug("  No term anchors in cached copy: %s", url)
+            skipped_prefiltered += 1
+            continue
+
+        if html is None:
+            scheduler.record_failure(url)
+            errors.append(f"Failed to fetch: {url}")
+            if url in feed_links:
+                feed_extractor.forget(url)
+            continue
+
+        extractor = feed_extractor if url in feed_links else website_extractor
+        with stage("extract"):
+            result = extractor.extract(html, url, target.entity_name)
+        if result is None and target.render and renderer is not None:
+            # JavaScript-rendered copy: retry on the rendered DOM
+            try:
+                with stage("fetch"):
+                    rendered = renderer.render(url, refresh=due_only)
+            except (ImportError, RenderUnavailable) as e:
+                logger.warning("Rendering disabled: %s", e)
+                errors.append(f"Rendering disabled: {e}")
+                renderer = rendered = None
+            if rendered:
+                urls_rendered += 1
+                with stage("extract"):
+                    result = website_extractor.extract(rendered, url, target.entity_name)
+        terms = result.terms_found if result else []
+        # Only a network fetch is a check; a disk-cache replay must not move
+        # the URL's schedule
+        if fetcher.last_elapsed is not None and scheduler.record(
+                url, html, terms, elapsed=fetcher.last_elapsed):
+            logger.info("  Content changed: %s", url)
+        change = history.observe(target.entity_name, url, content_hash(html), terms)
+        if change is not None:
+            term_changes.append(change)
+            logger.info("  Terminology %s: %s -> %s (%s)", change.kind,
+                        ",".join(change.old_terms) or "none",
+                        ",".join(change.new_terms) or "none", url)
+        if result is None:
+            logger.debug("  No terms found: %s", url)
+            continue
+
+        if not result.year_relevant:
+            logger.debug("  Not year-relevant: %s", url)
+            # Still process but note it — recency scoring handles the penalty
+            pass
+
+        with stage("score"):
+            # Near-duplicate check: mirrored/syndicated copies of a page
+            # already seen for this entity become extra sources of it
+            fingerprint = simhash(result.page_text)
+            dup_urls = neardup.find(fingerprint, entity_name=target.entity_name,
+                                    exclude_url=url)
+            primary = next((run_candidates[u] for u in dup_urls
+                            if u in run_candidates), None)
+            if primary is not None:
+                near_duplicates += 1
+                if url not in primary.extra_sources:
+                    primary.extra_sources.append(url)
+                logger.debug("  Near-duplicate of %s: %s", primary.source_url, url)
+                continue
+            # A primary from an earlier crawl only stands in for the page if
+            # it became an entry or review row; if it was discarded or
+            # rejected, the page is scored on its own
+            earlier = next((u for u in dup_urls
+                            if (target.entity_name, u) in existing_keys
+                            or (target.entity_name, u) in review_keys), None)
+            if earlier is not None:
+                near_duplicates += 1
+                logger.debug("  Near-duplicate of earlier crawl %s: %s", earlier, url)
+                continue
+            # Only primaries are indexed, so a mirror can never shadow the
+            # page it copies on a later run
+            neardup.add(url, fingerprint, target.entity_name)
+
+            candidate = EntryCandidate(
+                entity_name=target.entity_name,
+                entity_type=target.entity_type,
+                country_or_region=target.country_or_region,
+                terms_found=result.terms_found,
+                exact_phrase=result.exact_phrase,
+                context=target_url.context,
+                platform=target_url.platform,
+                source_url=url,
+                notes=f"Auto-crawled from {target_url.platform}",
+                evidence=(archive.pointer_for(url) or "") if archive else "",
+            )
+
+            # Dedup check
+            if candidate.dedup_key in existing_keys:
+                logger.debug("  Skipping duplicate: %s", url)
+                skipped_dedup += 1
+                continue
+
+            # Score
+            confidence = score_result(candidate, result)
+            scheduler.record_score(url, confidence)
+            logger.info("  Score %.3f for %s (%s)",
+                        confidence, target.entity_name, url)
+
+            # Route
+            route = route_for(confidence, auto_threshold, review_threshold)
+            if route != "discard":
+                run_candidates[url] = candidate
+            if route == "auto_add":
+                auto_add.append(candidate)
+            elif route == "review":
+                review.append(candidate)
+            else:
+                discarded += 1
+                logger.debug("  Discarded (score %.3f): %s", confidence, url)
+            if on_candidate is not None:
+                on_candidate(candidate, route)
+
+    with stage("output"):
+        # Validate auto-add entries; demote invalid ones to review
+        validated_auto: list[EntryCandidate] = []
+        for candidate in auto_add:
+            entry_dict = candidate.to_entry_dict()
+            validation_errors = validate_entry_dict(entry_dict)
+            if validation_errors:
+                logger.warning("Validation failed for %s, demoting to review: %s",
+                               candidate.entity_name, validation_errors)
+                candidate.notes += f" [validation errors: {'; '.join(validation_errors)}]"
+                review.append(candidate)
+            else:
+                validated_auto.append(candidate)
+
+        # A dry run leaves the schedule and circuit state as it found them
+        if not dry_run:
+            scheduler.save()
+            breaker.save()
+        history.close()
+        budget = None
+        if deadline is not None or resume:
+            budget = {
+                "seconds": time_budget,
+                "planned": len(work),
+                "processed": processed,
+                "remaining": len(remaining),
+                "resume_path": None,
+            }
+            if not dry_run and not part_dir:
+                if remaining:
+                    save_resume(remaining, feed_links)
+                    budget["resume_path"] = BUDGET_RESUME_PATH
+                elif os.path.exists(BUDGET_RESUME_PATH):
+                    os.remove(BUDGET_RESUME_PATH)
+        # A dry run must not mark feed items seen, or the next run would skip them
+        if not dry_run:
+            feed_extractor.save()
+        if archive is not None:
+            archive.close()
+        if renderer is not None:
+            renderer.close()
+
+        # Write output
+        if dry_run:
+            logger.info("DRY RUN — not writing any files")
+            for c in validated_auto:
+                logger.info("  [auto-add] %.3f %s — %s",
+                            c.confidence, c.entity_name, c.source_url)
+            for c in review:
+                logger.info("  [review]   %.3f %s — %s",
+                            c.confidence, c.entity_name, c.source_url)
         else:
-            validated_auto.append(candidate)
-
-    # Write output
-    if dry_run:
-        logger.info("DRY RUN — not writing any files")
-        for c in validated_auto:
-            logger.info("  [auto-add] %.3f %s — %s",
-                        c.confidence, c.entity_name, c.source_url)
-        for c in review:
-            logger.info("  [review]   %.3f %s — %s",
-                        c.confidence, c.entity_name, c.source_url)
-    else:
-        added = write_auto_add(validated_auto)
-        queued = write_review_queue(review)
-        # Add newly written entries to dedup set
-        for c in validated_auto:
-            existing_keys.add(c.dedup_key)
-        logger.info("Auto-added %d entries, queued %d for review", added, queued)
-
-    report_path = write_crawl_report(
-        auto_added=validated_auto,
-        review=review,
-        discarded=discarded,
-        skipped_dedup=skipped_dedup,
-        targets_processed=len(targets),
-        urls_fetched=urls_fetched,
-        errors=errors,
-    )
-    logger.info("Crawl report: %s", report_path)
+            if part_dir:
+                added = write_staged_auto_add(validated_auto, part_dir)
+                queued = write_review_queue(review, output_dir=part_dir)
+            else:
+                added = write_auto_add(validated_auto, store=store)
+                queued = store_review_queue(review, review_store)
+            neardup.save()
+            # Add newly written entries to dedup set
+            for c in validated_auto:
+                existing_keys.add(c.dedup_key)
+            logger.info("Auto-added %d entries, queued %d for review", added, queued)
+
+        report_path = write_crawl_report(
+            auto_added=validated_auto,
+            review=review,
+            discarded=discarded,
+            skipped_dedup=skipped_dedup,
+            near_duplicates=near_duplicates,
+            urls_discovered=urls_discovered,
+            skipped_not_due=skipped_not_due,
+            urls_rendered=urls_rendered,
+            skipped_rejected=skipped_rejected,
+            skipped_circuit_open=skipped_circuit_open,
+            skipped_prefiltered=skipped_prefiltered,
+            targets_processed=len(targets),
+            urls_fetched=urls_fetched,
+            errors=errors,
+            output_dir=part_dir or OUTPUT_DIR,
+            extra={"transport": fetcher.transport.stats(),
+                   "feeds": feed_extractor.stats(),
+                   "circuits": breaker.stats(),
+                   "terminology_changes": [c.to_dict() for c in term_changes],
+                   **({"budget": budget} if budget else {}),
+                   **({"warc": archive.stats()} if archive else {})},
+        )
+        logger.info("Crawl report: %s", report_path)
+    review_store.close()
+    if transport is None:
+        fetcher.transport.close()
 
     return {
         "targets_processed": len(targets),
         "urls_fetched": urls_fetched,
+        "urls_discovered": urls_discovered,
+        "urls_rendered": urls_rendered,
+        "skipped_not_due": skipped_not_due,
         "auto_added": len(validated_auto),
         "review_queue": len(review),
         "discarded": discarded,
         "skipped_dedup": skipped_dedup,
+        "skipped_rejected": skipped_rejected,
+        "skipped_circuit_open": skipped_circuit_open,
+        "skipped_prefiltered": skipped_prefiltered,
+        "near_duplicates": near_duplicates,
+        "feed_items": feed_extractor.stats()["new_items"],
+        "terminology_changes": len(term_changes),
+        "transport": fetcher.transport.stats(),
+        "budget": budget,
         "errors": errors,
     }
+
+
+def order_by_value(work: list[tuple[Target, TargetURL | None]], scheduler: Scheduler,
+                   existing_keys: DedupKeys,
+                   rate_limiter: RateLimiter) -> list[tuple[Target, TargetURL | None]]:
+    """``work`` sorted by expected yield per second of cost, best first.
+
+    Yield and cost come from the scheduler's per-URL history. Twitter
+    searches have no history and go last; ties keep file order.
+    """
+    now = datetime.now()
+
+    def value(item: tuple[Target, TargetURL | None]) -> float:
+        target, target_url = item
+        if target_url is None:
+            return 0.0
+        url = target_url.url
+        expected = scheduler.expected_yield(url, now)
+        if (target.entity_name, url) in existing_keys:
+            expected *= _KNOWN_PAGE_YIELD
+        return expected / scheduler.expected_cost(url, rate_limiter.delay_for(url))
+
+    return sorted(work, key=value, reverse=True)
+
+
+def save_resume(work: list[tuple[Target, TargetURL | None]], feed_links: set[str],
+                path: str = BUDGET_RESUME_PATH) -> None:
+    """Write unfinished work of a time-budgeted run for ``load_resume``."""
+    rows = [
+        {"entity_name": target.entity_name}
+        if target_url is None else
+        {"entity_name": target.entity_name, "url": target_url.url,
+         "context": target_url.context, "platform": target_url.platform,
+         "feed_item": target_url.url in feed_links}
+        for target, target_url in work
+    ]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "saved": datetime.now().isoformat(timespec="seconds"),
+                   "work": rows}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def load_resume(targets: list[Target], feed_links: set[str],
+                path: str = BUDGET_RESUME_PATH) -> list[tuple[Target, TargetURL | None]]:
+    """Saved unfinished work for the given targets; feed item URLs go into ``feed_links``."""
+    if not os.path.exists(path):
+        logger.warning("Nothing to resume: %s not found", path)
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        rows = json.load(f).get("work", [])
+    by_name = {target.entity_name: target for target in targets}
+    work: list[tuple[Target, TargetURL | None]] = []
+    for row in rows:
+        target = by_name.get(row["entity_name"])
+        if target is None:
+            continue
+        if "url" not in row:
+            work.append((target, None))
+            continue
+        work.append((target, TargetURL(url=row["url"], context=row["context"],
+                                       platform=row["platform"])))
+        if row.get("feed_item"):
+            feed_links.add(row["url"])
+    return work
+
+
+def _part_dir(name: str) -> str:
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+    return os.path.join(PARTS_DIR, f"{name}-{stamp}")
+
+
+def run_shard(index: int, count: int, targets_path: str | None = None, **kwargs) -> dict:
+    """Crawl only the domains that shard ``index`` of ``count`` owns."""
+    domains = shard_domains(load_domains(targets_path or TARGETS_PATH), index, count)
+    logger.info("Shard %d/%d owns %d domain(s)", index, count, len(domains))
+    return run_pipeline(targets_path=targets_path, domains=domains,
+                        part_dir=_part_dir(f"shard-{index}-of-{count}"), **kwargs)
+
+
+def enqueue_targets(targets_path: str | None = None, queue_path: str = QUEUE_PATH,
+                    reset: bool = False) -> int:
+    """Fill the work queue with every target domain. Returns domains (re)queued."""
+    domains = load_domains(targets_path or TARGETS_PATH)
+    queue = WorkQueue(queue_path)
+    try:
+        return queue.enqueue(domains, reset=reset)
+    finally:
+        queue.close()
+
+
+def _lease_renewer(queue: WorkQueue, worker_id: str, batch: list[str]) -> Callable[[], None]:
+    """Heartbeat renewing ``batch``'s lease once a third of it has passed."""
+    renewed = time.monotonic()
+
+    def heartbeat() -> None:
+        nonlocal renewed
+        if time.monotonic() - renewed < DEFAULT_LEASE_SECONDS / 3:
+            return
+        renewed = time.monotonic()
+        lost = queue.renew(worker_id, batch)
+        if lost:
+            logger.warning("Worker %s lost the lease on %s", worker_id, ", ".join(lost))
+
+    return heartbeat
+
+
+def run_worker(queue_path: str = QUEUE_PATH, batch_size: int = 10,
+               worker_id: str | None = None, **kwargs) -> dict:
+    """Lease domain batches from the work queue until it is drained."""
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = WorkQueue(queue_path)
+    # One transport for all batches, so connections stay warm between them
+    transport = Transport(http2=kwargs.pop("http2", False))
+    totals: dict = {key: 0 for key in (
+        "batches", "targets_processed", "urls_fetched", "urls_discovered", "urls_rendered",
+        "skipped_not_due", "auto_added", "review_queue", "discarded",
+        "skipped_dedup", "skipped_rejected", "skipped_circuit_open",
+        "skipped_prefiltered", "near_duplicates", "feed_items", "terminology_changes",
+    )}
+    totals["errors"] = []
+    try:
+        while True:
+            batch = queue.lease(worker_id, batch_size=batch_size)
+            if not batch:
+                break
+            logger.info("Worker %s leased %d domain(s)", worker_id, len(batch))
+            result = run_pipeline(
+                domains=set(batch),
+                part_dir=_part_dir(f"worker-{worker_id}-{totals['batches']}"),
+                transport=transport,
+                heartbeat=_lease_renewer(queue, worker_id, batch),
+                **kwargs,
+            )
+            if queue.complete(worker_id, batch) < len(batch):
+                logger.warning("Worker %s lost the lease on part of its batch; "
+                               "another worker may have crawled it too", worker_id)
+            totals["batches"] += 1
+            if "error" in result:
+                # No target in this batch passes the filters: no work, not a failure
+                logger.info("Worker %s: %s in batch", worker_id, result["error"])
+                continue
+            for key, value in result.items():
+                if isinstance(value, int) and key in totals:
+                    totals[key] += value
+            totals["errors"].extend(result.get("errors", []))
+            if result.get("transport"):
+                totals["transport"] = result["transport"]
+    finally:
+        queue.close()
+        transport.close()
+    return totals
+
+
+def merge_shards(dry_run: bool = False) -> dict:
+    """Merge staged shard/worker outputs into data/ and a combined report."""
+    return merge_parts(load_existing_keys(), dry_run=dry_run)
+
+
+def accept_review(ids: list[int] | None = None, entity: str | None = None,
+                  term: str | None = None, min_confidence: float | None = None,
+                  year: int = CURRENT_YEAR, dry_run: bool = False,
+                  review_store: ReviewStore | None = None) -> dict:
+    """Accept pending review candidates and append them to the year partition.
+
+    Candidates are selected by ``ids`` and/or filters. Entries already in
+    data/ are marked accepted without being written again. All new entries
+    go to the partition in one append.
+    """
+    owned = review_store is None
+    review_store = review_store or ReviewStore()
+    try:
+        selected = review_store.query(state="pending", ids=ids, entity=entity, term=term,
+                                      min_confidence=min_confidence)
+        store = DataStore()
+        existing_keys = load_existing_keys(store=store)
+        new_entries = []
+        for candidate in selected:
+            key = (candidate["entity_name"], candidate["source_url"])
+            if key not in existing_keys:
+                existing_keys.add(key)
+                new_entries.append(candidate["entry"])
+        if not dry_run:
+            if new_entries:
+                store.append(new_entries, year=year)
+            review_store.set_state([c["id"] for c in selected], "accepted")
+    finally:
+        if owned:
+            review_store.close()
+    return {"accepted": len(selected), "appended": len(new_entries)}
+
+
+def export_review(path: str, state: str | None = "pending", **filters) -> int:
+    """Write review-store candidates to a JSONL file. Returns count written."""
+    review_store = ReviewStore()
+    try:
+        return export_review_queue(review_store.query(state=state, **filters), path)
+    finally:
+        review_store.close()
@@ -0,0 +1,215 @@
+"""Opt-in CPU and memory profiling of a run, broken down by stage.
+
+Code marks its stages with ``with profiler.stage("fetch"):``; a stage may
+be entered many times (once per URL) and its figures add up. Every
+profiled stage gets its call count, wall and CPU time. Then:
+
+- ``cpu``: cProfile over the whole run (``<name>_profile.pstats`` and
+  the top functions in the summary), plus a sampling profiler that walks
+  the main thread's stack every few milliseconds and writes collapsed
+  stacks rooted at the current stage (``<name>_profile.collapsed``, for
+  flamegraph.pl or speedscope).
+- ``mem``: tracemalloc; per stage the net change and peak of traced
+  memory, the top allocation sites around the stage's first run, and
+  the top sites over the whole run.
+
+Everything is summarised in ``<name>_profile.json``. Uses only the
+standard library, so scripts/validate.py can import it.
+"""
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Iterator
+
+from .config import OUTPUT_DIR
+
+MODES = ("cpu", "mem", "both")
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+_TRACE_FRAMES = 1  # allocation sites are reported by line
+_TOP = 25
+_NO_STAGE = "other"
+_OVERHEAD_STAGE = "profiler"  # samples taken while analysing tracemalloc snapshots
+
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _top_allocations(after: tracemalloc.Snapshot, before: tracemalloc.Snapshot,
+                     limit: int = _TOP) -> list[dict]:
+    # Leave out the profilers' own allocations
+    ignore = {tracemalloc.__file__, cProfile.__file__, __file__}
+    stats = [s for s in after.compare_to(before, "lineno")
+             if s.size_diff > 0 and s.traceback[0].filename not in ignore][:limit]
+    return [{"site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+             "size_diff": s.size_diff, "count_diff": s.count_diff} for s in stats]
+
+
+class _Sampler(threading.Thread):
+    """Collapsed stacks of one thread, sampled at a fixed interval."""
+
+    def __init__(self, profiler: Profiler, thread_id: int):
+        super().__init__(name="profile-sampler", daemon=True)
+        self._profiler = profiler
+        self._thread_id = thread_id
+        self._halt = threading.Event()
+        self.stacks: dict[str, int] = {}
+
+    def run(self) -> None:
+        while not self._halt.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            labels.append(self._profiler.current_stage)
+            stack = ";".join(reversed(labels))
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def stop(self) -> None:
+        self._halt.set()
+        self.join()
+
+
+class Profiler:
+    """Profile of one run; with ``mode`` None, stages cost next to nothing."""
+
+    def __init__(self, mode: str | None = None, output_dir: str = OUTPUT_DIR,
+                 name: str = "crawl"):
+        if mode is not None and mode not in MODES:
+            raise ValueError(f"profile mode must be one of {', '.join(MODES)}")
+        self.mode = mode
+        self.cpu = mode in ("cpu", "both")
+        self.mem = mode in ("mem", "both")
+        self._output_dir = output_dir
+        self._name = name
+        self._stack: list[str] = []
+        self._stages: dict[str, dict] = {}
+        self._cprofile: cProfile.Profile | None = None
+        self._sampler: _Sampler | None = None
+        self._snapshot: tracemalloc.Snapshot | None = None
+        self._peak = 0  # traced peak before the latest reset_peak()
+        self._started = 0.0
+
+    @property
+    def current_stage(self) -> str:
+        return self._stack[-1] if self._stack else _NO_STAGE
+
+    @contextmanager
+    def _overhead(self) -> Iterator[None]:
+        """Keep snapshot work out of cProfile and out of the stages' samples."""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        self._stack.append(_OVERHEAD_STAGE)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            if self._cprofile is not None:
+                self._cprofile.enable()
+
+    def start(self) -> None:
+        if self.mode is None:
+            return
+        self._started = time.perf_counter()
+        if self.mem:
+            tracemalloc.start(_TRACE_FRAMES)
+            self._snapshot = tracemalloc.take_snapshot()
+        if self.cpu:
+            self._sampler = _Sampler(self, threading.get_ident())
+            self._sampler.start()
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def stage(self, name: str):
+        """Context manager attributing the enclosed work to stage ``name``."""
+        if self.mode is None:
+            return nullcontext()
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        stats = self._stages.setdefault(name, {
+            "calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+        first = stats["calls"] == 0
+        stats["calls"] += 1
+        before = None
+        if self.mem:
+            if first:
+                with self._overhead():
+                    before = tracemalloc.take_snapshot()
+            current_before, peak = tracemalloc.get_traced_memory()
+            self._peak = max(self._peak, peak)
+            tracemalloc.reset_peak()
+        self._stack.append(name)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            stats["wall_seconds"] += time.perf_counter() - wall
+            stats["cpu_seconds"] += time.process_time() - cpu
+            self._stack.pop()
+            if self.mem:
+                current, peak = tracemalloc.get_traced_memory()
+                stats["mem_net_bytes"] = stats.get("mem_net_bytes", 0) + current - current_before
+                stats["mem_peak_bytes"] = max(stats.get("mem_peak_bytes", 0),
+                                              peak - current_before)
+                if before is not None:
+                    with self._overhead():
+                        stats["top_allocations_first_call"] = _top_allocations(
+                            tracemalloc.take_snapshot(), before, limit=10)
+
+    def stop(self) -> list[str]:
+        """Stop profiling and write the result files; returns their paths."""
+        if self.mode is None:
+            return []
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._sampler.stop()
+        os.makedirs(self._output_dir, exist_ok=True)
+        base = os.path.join(self._output_dir, f"{self._name}_profile")
+        summary = {
+            "mode": self.mode,
+            "finished": datetime.now().isoformat(timespec="seconds"),
+            "wall_seconds": round(time.perf_counter() - self._started, 3),
+            "stages": self._stages,
+        }
+        paths = []
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(base + ".pstats")
+            paths.append(base + ".pstats")
+            stats = pstats.Stats(self._cprofile)
+            top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+            summary["top_functions"] = [
+                {"function": f"{os.path.basename(filename)}:{line}({func})",
+                 "calls": calls, "tottime": round(tottime, 4), "cumtime": round(cumtime, 4)}
+                for (filename, line, func), (_, calls, tottime, cumtime, _) in top[:_TOP]
+            ]
+            samples: dict[str, int] = {}
+            with open(base + ".collapsed", "w", encoding="utf-8") as f:
+                for stack, count in sorted(self._sampler.stacks.items()):
+                    f.write(f"{stack} {count}\n")
+                    stage = stack.split(";", 1)[0]
+                    samples[stage] = samples.get(stage, 0) + count
+            paths.append(base + ".collapsed")
+            summary["samples"] = {"interval_seconds": SAMPLE_INTERVAL, "by_stage": samples}
+        if self.mem:
+            summary["top_allocations"] = _top_allocations(tracemalloc.take_snapshot(),
+                                                          self._snapshot)
+            summary["traced_peak_bytes"] = max(self._peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        paths.insert(0, base + ".json")
+        return paths
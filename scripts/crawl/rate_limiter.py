@@ -1,23 +1,32 @@
 """Per-domain token bucket rate limiter."""
 from __future__ import annotations
 
+import threading
 import time
 from urllib.parse import urlparse
 
 
 class RateLimiter:
-    """Enforces a minimum delay between requests to the same domain."""
+    """Enforces a minimum delay between requests to the same domain.
+
+    Safe to share between threads: each request reserves its slot.
+    """
 
     def __init__(self, default_delay: float = 1.0):
         self._default_delay = default_delay
         self._last_request: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def delay_for(self, url: str) -> float:
+        """Minimum seconds between requests to the URL's domain."""
+        return self._default_delay
 
     def wait(self, url: str) -> None:
         """Block until it's safe to request the given URL's domain."""
         domain = urlparse(url).netloc
-        now = time.monotonic()
-        last = self._last_request.get(domain, 0.0)
-        wait_time = self._default_delay - (now - last)
-        if wait_time > 0:
-            time.sleep(wait_time)
-        self._last_request[domain] = time.monotonic()
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._last_request.get(domain, 0.0) + self._default_delay)
+            self._last_request[domain] = slot
+        if slot > now:
+            time.sleep(slot - now)
@@ -0,0 +1,167 @@
+"""Render JavaScript-heavy pages with a pool of headless Chromium contexts.
+
+Used only for targets flagged ``render: true`` in targets.yaml, and only
+when the plain HTML of a page has no terms. The browser starts on the
+first render; its contexts are reused across pages and recycled after a
+number of pages to bound memory.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from collections import deque
+
+from .config import CACHE_DIR, RENDER_CONTEXT_MAX_PAGES, RENDER_POOL_SIZE, RENDER_TIMEOUT
+from .rate_limiter import RateLimiter
+from .transport import DEFAULT_HEADERS
+
+logger = logging.getLogger(__name__)
+
+# Subresources never needed for text extraction
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+
+# Lazy import playwright so the crawler can run without it installed
+_playwright = None
+
+
+def _get_playwright():
+    global _playwright
+    if _playwright is None:
+        try:
+            from playwright import sync_api
+            _playwright = sync_api
+        except ImportError:
+            raise ImportError(
+                "playwright is required for rendered-page extraction. "
+                "Install it with: pip install playwright && playwright install chromium"
+            )
+    return _playwright
+
+
+class RenderUnavailable(RuntimeError):
+    """The headless browser could not be started (e.g. Chromium missing)."""
+
+
+def _block_heavy(route) -> None:
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
+
+
+class RenderPool:
+    """Reusable headless browser contexts for rendering pages to HTML.
+
+    Args:
+        size: Number of browser contexts kept open
+        timeout: Seconds allowed per page (navigation and settling)
+        max_pages: Pages rendered in a context before it is replaced
+        rate_limiter: Shared per-domain rate limiter
+        cache_dir: Rendered DOMs are cached here next to fetched pages
+    """
+
+    def __init__(self, size: int = RENDER_POOL_SIZE, timeout: float = RENDER_TIMEOUT,
+                 max_pages: int = RENDER_CONTEXT_MAX_PAGES,
+                 rate_limiter: RateLimiter | None = None,
+                 cache_dir: str = CACHE_DIR, use_cache: bool = True):
+        self._size = size
+        self._timeout_ms = int(timeout * 1000)
+        self._max_pages = max_pages
+        self._rate_limiter = rate_limiter or RateLimiter()
+        self._cache_dir = cache_dir
+        self._use_cache = use_cache
+        self._pw = None
+        self._browser = None
+        self._contexts: deque[list] = deque()  # [context, pages rendered]
+        self.rendered = 0
+
+    def _cache_path(self, url: str) -> str:
+        url_hash = hashlib.sha256(url.encode()).hexdigest()[:16]
+        return os.path.join(self._cache_dir, f"{url_hash}.rendered.html")
+
+    def _new_context(self):
+        context = self._browser.new_context(user_agent=DEFAULT_HEADERS["User-Agent"])
+        context.set_default_timeout(self._timeout_ms)
+        context.route("**/*", _block_heavy)
+        return context
+
+    def _start(self) -> None:
+        sync_api = _get_playwright()
+        try:
+            self._pw = sync_api.sync_playwright().start()
+            self._browser = self._pw.chromium.launch(headless=True)
+            for _ in range(self._size):
+                self._contexts.append([self._new_context(), 0])
+        except sync_api.Error as e:
+            # Do not leave the playwright driver (or a half-started browser)
+            # running behind a failed start
+            self.close()
+            raise RenderUnavailable(
+                f"headless Chromium failed to start ({e}). "
+                "Install it with: playwright install chromium"
+            ) from e
+        logger.info("Started headless browser with %d context(s)", self._size)
+
+    def _checkout(self) -> list:
+        slot = self._contexts.popleft()
+        if slot[1] >= self._max_pages:
+            slot[0].close()
+            slot[:] = [self._new_context(), 0]
+        return slot
+
+    def render(self, url: str, refresh: bool = False) -> str | None:
+        """Return the rendered DOM of ``url`` as HTML, or None on failure.
+
+        Raises ImportError or RenderUnavailable if the browser cannot start.
+        """
+        cache_path = self._cache_path(url)
+        if self._use_cache and not refresh and os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8", errors="replace") as f:
+                return f.read()
+
+        if self._browser is None:
+            self._start()
+        sync_api = _get_playwright()
+        self._rate_limiter.wait(url)
+        slot = self._checkout()
+        page = None
+        try:
+            page = slot[0].new_page()
+            page.goto(url, wait_until="domcontentloaded", timeout=self._timeout_ms)
+            try:
+                # Give client-side rendering a chance to finish, but do not
+                # fail pages that keep long-polling
+                page.wait_for_load_state("networkidle", timeout=self._timeout_ms // 2)
+            except sync_api.TimeoutError:
+                pass
+            html = page.content()
+        except sync_api.Error as e:
+            logger.warning("Render failed for %s: %s", url, e)
+            return None
+        finally:
+            if page is not None:
+                page.close()
+            slot[1] += 1
+            self._contexts.append(slot)
+
+        self.rendered += 1
+        if self._use_cache:
+            try:
+                os.makedirs(self._cache_dir, exist_ok=True)
+                with open(cache_path, "w", encoding="utf-8") as f:
+                    f.write(html)
+            except OSError as e:
+                logger.warning("Render cache write failed: %s", e)
+        return html
+
+    def close(self) -> None:
+        for context, _ in self._contexts:
+            context.close()
+        self._contexts.clear()
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
+        if self._pw is not None:
+            self._pw.stop()
+            self._pw = None
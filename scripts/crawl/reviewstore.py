@@ -0,0 +1,206 @@
+"""Persistent review queue (SQLite) of medium-confidence candidates.
+
+Candidates are upserted by their dedup key (resolved entity key, first
+source URL), so a crawl adds to the queue instead of replacing it, and
+"Acme" and "Acme Inc." candidates for one page are one row. A candidate
+keeps its review state across runs: pending rows are refreshed with the
+latest score, accepted and rejected rows are left alone, and the pipeline
+does not fetch rejected URLs again.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from .config import OUTPUT_DIR, TERM_KEY_TO_STRING
+from .entities import EntityIndex, get_entity_index
+
+REVIEW_DB_PATH = os.path.join(OUTPUT_DIR, "review.sqlite")
+STATES = ("pending", "accepted", "rejected")
+# 1: rows keyed by entity key instead of entity name
+SCHEMA_VERSION = 1
+_STRING_TO_KEY = {string: key for key, string in TERM_KEY_TO_STRING.items()}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    id          INTEGER PRIMARY KEY,
+    entity_key  TEXT NOT NULL,  -- EntityIndex key of entity_name
+    entity_name TEXT NOT NULL,  -- as the crawl named the entity
+    source_url  TEXT NOT NULL,
+    state       TEXT NOT NULL DEFAULT 'pending',  -- pending | accepted | rejected
+    confidence  REAL NOT NULL,
+    factors     TEXT NOT NULL,  -- JSON {factor: score}
+    entry       TEXT NOT NULL,  -- JSON entry dict
+    first_seen  TEXT NOT NULL,
+    last_seen   TEXT NOT NULL,
+    times_seen  INTEGER NOT NULL DEFAULT 1,
+    reviewed_at TEXT,
+    UNIQUE (entity_key, source_url)
+);
+CREATE TABLE IF NOT EXISTS candidate_terms (
+    candidate_id INTEGER NOT NULL REFERENCES candidates (id) ON DELETE CASCADE,
+    term         TEXT NOT NULL,  -- term key, e.g. lunar_new_year
+    PRIMARY KEY (candidate_id, term)
+);
+CREATE INDEX IF NOT EXISTS candidates_state ON candidates (state, confidence DESC);
+CREATE INDEX IF NOT EXISTS candidates_entity ON candidates (entity_name COLLATE NOCASE, state);
+CREATE INDEX IF NOT EXISTS candidate_terms_term ON candidate_terms (term, candidate_id);
+"""
+
+
+def _row_terms(entry: dict) -> list[str]:
+    """Term keys of an entry (term_used is a string or a list of keys)."""
+    terms = entry.get("term_used", [])
+    terms = [terms] if isinstance(terms, str) else terms
+    return [_STRING_TO_KEY.get(t, t) for t in terms]
+
+
+class ReviewStore:
+    """Review-queue candidates and their review state.
+
+    Entity names resolve to keys through ``entities`` (the shared index by
+    default), which first learns the names already in the store.
+    """
+
+    def __init__(self, path: str = REVIEW_DB_PATH, entities: EntityIndex | None = None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._entities = entities if entities is not None else get_entity_index()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        for (name,) in self._conn.execute("SELECT DISTINCT entity_name FROM candidates"):
+            self._entities.add(name)
+
+    def _migrate(self) -> None:
+        """Key the rows of a store made before entity keys by their entity key."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            columns = {r[1] for r in self._conn.execute("PRAGMA table_info(candidates)")}
+            if "entity_key" not in columns:
+                self._conn.execute("ALTER TABLE candidates ADD COLUMN "
+                                   "entity_key TEXT NOT NULL DEFAULT ''")
+                seen = set()
+                # Of rows for variants of one entity and URL, keep a reviewed one
+                for row_id, name, url in self._conn.execute(
+                        "SELECT id, entity_name, source_url FROM candidates "
+                        "ORDER BY state = 'pending', id").fetchall():
+                    key = (self._entities.add(name), url)
+                    if key in seen:
+                        self._conn.execute("DELETE FROM candidates WHERE id = ?", (row_id,))
+                        continue
+                    seen.add(key)
+                    self._conn.execute("UPDATE candidates SET entity_key = ? WHERE id = ?",
+                                       (key[0], row_id))
+                self._conn.execute("CREATE UNIQUE INDEX candidates_key "
+                                   "ON candidates (entity_key, source_url)")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.execute("COMMIT")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def upsert(self, rows: list[dict]) -> int:
+        """Add or refresh staged review rows. Returns rows new to the store.
+
+        Rows are entry dicts with ``_confidence`` and ``_factors`` keys (as
+        written by ``write_review_queue``). Score, factors, entry and entity
+        name of an existing row are only replaced while it is still pending.
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        before = self._conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for row in rows:
+                entry = {k: v for k, v in row.items() if not k.startswith("_")}
+                sources = entry.get("sources", [])
+                name = entry.get("entity_name", "")
+                key = (self._entities.add(name), name, sources[0]["url"] if sources else "")
+                stored = self._conn.execute(
+                    "INSERT INTO candidates (entity_key, entity_name, source_url, confidence, "
+                    "factors, entry, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (entity_key, source_url) DO UPDATE SET "
+                    "last_seen = excluded.last_seen, times_seen = times_seen + 1, "
+                    "entity_name = CASE WHEN state = 'pending' THEN excluded.entity_name "
+                    "ELSE entity_name END, "
+                    "confidence = CASE WHEN state = 'pending' THEN excluded.confidence "
+                    "ELSE confidence END, "
+                    "factors = CASE WHEN state = 'pending' THEN excluded.factors "
+                    "ELSE factors END, "
+                    "entry = CASE WHEN state = 'pending' THEN excluded.entry ELSE entry END "
+                    "RETURNING id, state",
+                    (*key, row.get("_confidence", 0.0),
+                     json.dumps(row.get("_factors", {})),
+                     json.dumps(entry, ensure_ascii=False), now, now),
+                ).fetchone()
+                if stored["state"] == "pending":
+                    self._conn.execute("DELETE FROM candidate_terms WHERE candidate_id = ?",
+                                       (stored["id"],))
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO candidate_terms VALUES (?, ?)",
+                        [(stored["id"], t) for t in _row_terms(entry)])
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return self._conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0] - before
+
+    def query(self, state: str | None = "pending", entity: str | None = None,
+              term: str | None = None, min_confidence: float | None = None,
+              ids: list[int] | None = None, limit: int | None = None) -> list[dict]:
+        """Candidates matching all given filters, highest confidence first.
+
+        ``entity`` is a case-insensitive substring; ``term`` is a term key
+        (lunar_new_year) or term_used string ("Lunar New Year").
+        """
+        where, params = [], []
+        if state:
+            where.append("c.state = ?")
+            params.append(state)
+        if entity:
+            where.append("c.entity_name LIKE ?")
+            params.append(f"%{entity}%")
+        if term:
+            where.append("c.id IN (SELECT candidate_id FROM candidate_terms WHERE term = ?)")
+            params.append(_STRING_TO_KEY.get(term, term))
+        if min_confidence is not None:
+            where.append("c.confidence >= ?")
+            params.append(min_confidence)
+        if ids:
+            where.append(f"c.id IN ({','.join('?' * len(ids))})")
+            params.extend(ids)
+        sql = "SELECT * FROM candidates c"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY c.confidence DESC, c.id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [
+            {**dict(row), "factors": json.loads(row["factors"]), "entry": json.loads(row["entry"])}
+            for row in self._conn.execute(sql, params)
+        ]
+
+    def set_state(self, ids: list[int], state: str) -> int:
+        """Move candidates to ``state``. Returns rows changed."""
+        if state not in STATES:
+            raise ValueError(f"Unknown review state '{state}'")
+        now = datetime.now().isoformat(timespec="seconds")
+        self._conn.execute("BEGIN IMMEDIATE")
+        cur = self._conn.executemany(
+            "UPDATE candidates SET state = ?, reviewed_at = ? WHERE id = ? AND state != ?",
+            [(state, now, i, state) for i in ids])
+        self._conn.execute("COMMIT")
+        return cur.rowcount
+
+    def keys(self, state: str) -> set[tuple[str, str]]:
+        """(entity_name, source_url) of every candidate in ``state``."""
+        return {(r[0], r[1]) for r in self._conn.execute(
+            "SELECT entity_name, source_url FROM candidates WHERE state = ?", (state,))}
+
+    def counts(self) -> dict[str, int]:
+        return {state: n for state, n in self._conn.execute(
+            "SELECT state, COUNT(*) FROM candidates GROUP BY state")}
@@ -0,0 +1,217 @@
+"""Change-aware recrawl scheduling with per-URL freshness tracking.
+
+Each fetched URL gets a record of when it was last fetched, the hash of its
+content, when that content last changed, and which terms it contained. The
+next due time adapts to how often the page actually changes, and is pulled
+in around the lunar new year when campaign pages go live.
+
+The same history estimates what a fetch is worth (past term hits, score,
+change frequency) and what it costs (fetch time, page size), so a
+time-budgeted crawl can fetch the most valuable URLs first.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+
+from .config import CACHE_DIR, LUNAR_NEW_YEAR_DATES
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_PATH = os.path.join(CACHE_DIR, "schedule.json")
+
+MIN_INTERVAL = timedelta(hours=12)
+MAX_INTERVAL = timedelta(days=30)
+INITIAL_INTERVAL = timedelta(days=1)
+# Pages with terms are rechecked at least weekly; during the season, daily
+TERM_PAGE_MAX_INTERVAL = timedelta(days=7)
+SEASON_MAX_INTERVAL = timedelta(days=1)
+SEASON_BEFORE = timedelta(days=28)
+SEASON_AFTER = timedelta(days=14)
+BACKOFF = 1.5
+_MAX_HISTORY = 20
+# Expected yield of a URL with no history, and cost assumptions for it
+UNSEEN_YIELD = 0.5
+DEFAULT_FETCH_SECONDS = 2.0
+PARSE_BYTES_PER_SECOND = 2_000_000
+# Weight of the latest fetch in the moving average of fetch time
+_FETCH_TIME_WEIGHT = 0.3
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8", errors="replace")).hexdigest()
+
+
+def in_season(when: datetime) -> bool:
+    """True if ``when`` falls in the weeks around a known lunar new year."""
+    day = when.date()
+    for year in (day.year, day.year + 1):
+        lny = LUNAR_NEW_YEAR_DATES.get(year)
+        if lny and lny - SEASON_BEFORE <= day <= lny + SEASON_AFTER:
+            return True
+    return False
+
+
+@dataclass
+class URLState:
+    last_fetched: str = ""          # ISO timestamp
+    content_hash: str = ""
+    last_changed: str = ""          # ISO timestamp
+    changes: list[str] = field(default_factory=list)  # recent change timestamps
+    checks: int = 0
+    failures: int = 0
+    interval_hours: float = INITIAL_INTERVAL.total_seconds() / 3600
+    next_due: str = ""              # ISO timestamp
+    terms: list[str] = field(default_factory=list)
+    score: float = 0.0              # latest confidence of a candidate from the page
+    fetch_seconds: float = 0.0      # moving average of network fetch time
+    size: int = 0                   # characters in the latest content
+
+
+class Scheduler:
+    """Persistent per-URL freshness state and due-time computation."""
+
+    def __init__(self, path: str = SCHEDULE_PATH):
+        self._path = path
+        self._states = self._read()
+        self._changed: set[str] = set()  # URLs recorded since the last save
+
+    def _read(self) -> dict[str, URLState]:
+        if not os.path.exists(self._path):
+            return {}
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {url: URLState(**s) for url, s in data.get("urls", {}).items()}
+        except (OSError, json.JSONDecodeError, TypeError) as e:
+            logger.warning("Ignoring unreadable schedule %s: %s", self._path, e)
+            return {}
+
+    def save(self) -> None:
+        # Re-read so concurrent shards/workers do not drop each other's updates
+        states = self._read()
+        states.update((url, self._states[url]) for url in self._changed)
+        data = {"version": 1, "urls": {url: asdict(s) for url, s in states.items()}}
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            tmp = f"{self._path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self._path)
+        except OSError as e:
+            logger.warning("Schedule write failed: %s", e)
+            return
+        self._states = states
+        self._changed.clear()
+
+    def get(self, url: str) -> URLState | None:
+        return self._states.get(url)
+
+    def is_due(self, url: str, now: datetime | None = None) -> bool:
+        """True if the URL has never been fetched or its next due time passed."""
+        state = self._states.get(url)
+        if state is None or not state.next_due:
+            return True
+        now = now or datetime.now()
+        if now >= datetime.fromisoformat(state.next_due):
+            return True
+        # Season boost applies even to pages scheduled before the season began
+        if in_season(now) and state.last_fetched:
+            return now - datetime.fromisoformat(state.last_fetched) >= SEASON_MAX_INTERVAL
+        return False
+
+    def _next_interval(self, state: URLState, changed: bool, now: datetime) -> timedelta:
+        interval = timedelta(hours=state.interval_hours)
+        if state.checks <= 1:
+            interval = INITIAL_INTERVAL
+        elif changed:
+            interval = interval / BACKOFF
+        else:
+            interval = interval * BACKOFF
+        interval = max(MIN_INTERVAL, min(MAX_INTERVAL, interval))
+        if state.terms:
+            interval = min(interval, TERM_PAGE_MAX_INTERVAL)
+        if in_season(now):
+            interval = min(interval, SEASON_MAX_INTERVAL)
+        return interval
+
+    def record(self, url: str, content: str, terms: list[str],
+               now: datetime | None = None, elapsed: float | None = None) -> bool:
+        """Record a successful fetch. Returns True if the content changed.
+
+        ``elapsed`` is the network fetch time (None for a cache hit).
+        """
+        now = now or datetime.now()
+        state = self._states.setdefault(url, URLState())
+        self._changed.add(url)
+        if elapsed is not None:
+            state.fetch_seconds = round(elapsed if not state.fetch_seconds else
+                                        (1 - _FETCH_TIME_WEIGHT) * state.fetch_seconds
+                                        + _FETCH_TIME_WEIGHT * elapsed, 3)
+        state.size = len(content)
+        if not terms:
+            state.score = 0.0
+        digest = content_hash(content)
+        changed = bool(state.content_hash) and digest != state.content_hash
+        if changed or not state.content_hash:
+            state.last_changed = now.isoformat(timespec="seconds")
+        if changed:
+            state.changes = (state.changes + [state.last_changed])[-_MAX_HISTORY:]
+        state.content_hash = digest
+        state.last_fetched = now.isoformat(timespec="seconds")
+        state.checks += 1
+        state.failures = 0
+        state.terms = sorted(set(terms))
+        interval = self._next_interval(state, changed, now)
+        state.interval_hours = round(interval.total_seconds() / 3600, 2)
+        state.next_due = (now + interval).isoformat(timespec="seconds")
+        return changed
+
+    def record_score(self, url: str, score: float) -> None:
+        """Record the confidence of the candidate extracted from ``url``."""
+        self._states.setdefault(url, URLState()).score = score
+        self._changed.add(url)
+
+    def expected_yield(self, url: str, now: datetime | None = None) -> float:
+        """Estimated value of fetching ``url`` now, from 0 to 1.
+
+        Pages that had terms, scored well and change often are worth more;
+        pages not yet due and pages that keep failing are worth less.
+        """
+        state = self._states.get(url)
+        if state is None:
+            return UNSEEN_YIELD
+        if not state.checks:
+            value = UNSEEN_YIELD
+        else:
+            value = 0.2 + 0.4 * bool(state.terms) + 0.4 * state.score
+            value *= 0.25 + 0.75 * min(1.0, len(state.changes) / state.checks)
+            if not self.is_due(url, now):
+                value *= 0.2
+        return value * 0.5 ** state.failures
+
+    def expected_cost(self, url: str, domain_delay: float = 0.0) -> float:
+        """Estimated seconds to fetch and parse ``url``, including the domain's rate delay."""
+        state = self._states.get(url)
+        seconds = state.fetch_seconds if state and state.fetch_seconds else DEFAULT_FETCH_SECONDS
+        size = state.size if state else 0
+        return seconds + domain_delay + size / PARSE_BYTES_PER_SECOND
+
+    def record_failure(self, url: str, now: datetime | None = None) -> None:
+        """Record a failed fetch; retry after the current interval, at most a day."""
+        now = now or datetime.now()
+        state = self._states.setdefault(url, URLState())
+        self._changed.add(url)
+        state.failures += 1
+        retry = min(timedelta(hours=state.interval_hours), timedelta(days=1))
+        state.next_due = (now + retry).isoformat(timespec="seconds")
+
+    def due_summary(self, now: datetime | None = None) -> dict[str, int]:
+        now = now or datetime.now()
+        due = sum(1 for url in self._states if self.is_due(url, now))
+        return {"tracked": len(self._states), "due": due}
+
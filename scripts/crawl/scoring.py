@@ -1,14 +1,61 @@
 """5-factor confidence scoring for entry candidates."""
 
 import re
+from functools import lru_cache
 from urllib.parse import urlparse
 
+from .entities import EntityIndex, get_entity_index, normalize_name
 from .entry import EntryCandidate
+from .terms import get_term_matcher
+
+_WORDS = re.compile(r"[^\W_]+")
+
+
+@lru_cache(maxsize=1024)
+def _mention_patterns(variants: frozenset[str]) -> tuple[re.Pattern, re.Pattern | None]:
+    """Patterns for a full mention of any name variant, and for any of its words.
+
+    Variants match with any punctuation between their words ("U.S." for
+    "U S"), and also without legal suffixes ("Apple" for "Apple Inc.").
+    """
+    forms = {tuple(_WORDS.findall(v)) for v in variants}
+    forms |= {tuple(normalize_name(v).split()) for v in variants}
+    alternatives = []
+    for words in sorted(forms, key=len, reverse=True):
+        if not words:
+            continue
+        body = r"[\W_]+".join(map(re.escape, words))
+        # Word boundaries only where the name has Latin edges; CJK names
+        # sit inside running text
+        if words[0][0].isascii():
+            body = r"(?<![A-Za-z0-9])" + body
+        if words[-1][-1].isascii():
+            body += r"(?![A-Za-z0-9])"
+        alternatives.append(body)
+    words = {w for v in variants for w in normalize_name(v).split() if len(w) > 3}
+    partial = re.compile("|".join(map(re.escape, sorted(words))), re.IGNORECASE) if words else None
+    return re.compile("|".join(alternatives) or r"(?!)", re.IGNORECASE), partial
 
 
 def score_candidate(candidate: EntryCandidate, page_title: str = "",
-                    page_text: str = "", term_count: int = 1) -> float:
-    """Score a candidate on 5 factors (max 1.0).
+                    page_text: str = "", term_count: int = 1,
+                    entities: EntityIndex | None = None) -> float:
+    """Score a candidate on 5 factors (max 1.0)."""
+    return total_score(score_factors(candidate, page_title, page_text, term_count, entities))
+
+
+def total_score(factors: dict[str, float]) -> float:
+    """Confidence from a factor breakdown."""
+    return round(min(sum(factors.values()), 1.0), 3)
+
+
+def score_factors(candidate: EntryCandidate, page_title: str = "",
+                  page_text: str = "", term_count: int = 1,
+                  entities: EntityIndex | None = None) -> dict[str, float]:
+    """Per-factor scores of a candidate.
+
+    The entity match accepts any variant of the entity's name known to
+    ``entities`` (the shared index by default).
 
     Factors:
         - Term clarity (0-0.30): term in title? multiple occurrences?
@@ -17,7 +64,7 @@ def score_candidate(candidate: EntryCandidate, page_title: str = "",
         - Entity match (0-0.15): entity name found on page?
         - Context richness (0-0.15): exact_phrase length/quality?
     """
-    score = 0.0
+    factors: dict[str, float] = {}
 
     # 1. Term clarity (max 0.30)
     term_clarity = 0.0
@@ -25,12 +72,10 @@ def score_candidate(candidate: EntryCandidate, page_title: str = "",
         term_clarity += 0.10
     if term_count >= 3:
         term_clarity += 0.10
-    # Check if term appears in page title
-    for term in ("Chinese New Year", "Lunar New Year", "Spring Festival", "春节"):
-        if term.lower() in page_title.lower():
-            term_clarity += 0.10
-            break
-    score += min(term_clarity, 0.30)
+    # Check if term appears in page title (any language in the term table)
+    if get_term_matcher().search(page_title):
+        term_clarity += 0.10
+    factors["term_clarity"] = round(min(term_clarity, 0.30), 3)
 
     # 2. Source quality (max 0.25)
     source_quality = 0.0
@@ -49,7 +94,7 @@ def score_candidate(candidate: EntryCandidate, page_title: str = "",
     reputable = (".gov", ".edu", ".org", ".ac.uk")
     if any(source_domain.endswith(r) for r in reputable):
         source_quality += 0.05
-    score += min(source_quality, 0.25)
+    factors["source_quality"] = round(min(source_quality, 0.25), 3)
 
     # 3. Recency (max 0.15)
     recency = 0.0
@@ -61,19 +106,17 @@ def score_candidate(candidate: EntryCandidate, page_title: str = "",
     # Check captured_on or page content for current season
     if re.search(r"2026", page_text):
         recency += 0.05
-    score += min(recency, 0.15)
+    factors["recency"] = round(min(recency, 0.15), 3)
 
     # 4. Entity match (max 0.15)
     entity_match = 0.0
-    entity_lower = candidate.entity_name.lower()
-    if entity_lower in page_text.lower():
+    variants = (entities or get_entity_index()).variants(candidate.entity_name)
+    full, partial = _mention_patterns(frozenset(variants))
+    if full.search(page_text):
         entity_match += 0.15
-    elif len(entity_lower) > 3 and any(
-        word in page_text.lower() for word in entity_lower.split()
-        if len(word) > 3
-    ):
+    elif len(candidate.entity_name) > 3 and partial and partial.search(page_text):
         entity_match += 0.08
-    score += min(entity_match, 0.15)
+    factors["entity_match"] = round(min(entity_match, 0.15), 3)
 
     # 5. Context richness (max 0.15)
     context_richness = 0.0
@@ -84,6 +127,6 @@ def score_candidate(candidate: EntryCandidate, page_title: str = "",
         context_richness += 0.05
     if phrase_len >= 50:
         context_richness += 0.05
-    score += min(context_richness, 0.15)
+    factors["context_richness"] = round(min(context_richness, 0.15), 3)
 
-    return round(min(score, 1.0), 3)
+    return factors
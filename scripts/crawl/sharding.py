@@ -0,0 +1,78 @@
+"""Split crawl work across shards/workers by domain.
+
+The unit of work is a domain: every URL on a domain goes to the same shard
+or worker, so per-domain rate limiting still holds when several processes
+or hosts crawl at once. Twitter searches count as the ``x.com`` domain.
+"""
+from __future__ import annotations
+
+import bisect
+import hashlib
+
+from .targets import TWITTER_DOMAIN, Target, url_domain
+
+_VNODES = 64
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """Parse ``"i/N"`` (0-based) into ``(i, N)``."""
+    try:
+        index, count = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected i/N (e.g. 0/4)")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{spec}': need 0 <= i < N")
+    return index, count
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.sha1(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping domains to shards.
+
+    Changing the shard count only moves about 1/N of the domains, so caches
+    and scheduler state on each host stay mostly warm.
+    """
+
+    def __init__(self, shards: int, vnodes: int = _VNODES):
+        self._points: list[int] = []
+        self._owners: list[int] = []
+        ring = sorted((_hash(f"shard-{s}-{v}"), s)
+                      for s in range(shards) for v in range(vnodes))
+        for point, shard in ring:
+            self._points.append(point)
+            self._owners.append(shard)
+
+    def shard_for(self, domain: str) -> int:
+        i = bisect.bisect(self._points, _hash(domain)) % len(self._points)
+        return self._owners[i]
+
+
+def shard_domains(domains: set[str], index: int, count: int) -> set[str]:
+    """The subset of ``domains`` owned by shard ``index`` of ``count``."""
+    ring = HashRing(count)
+    return {d for d in domains if ring.shard_for(d) == index}
+
+
+def restrict_to_domains(targets: list[Target], domains: set[str]) -> list[Target]:
+    """Return copies of targets keeping only URLs, feeds (and Twitter) on ``domains``."""
+    restricted = []
+    for target in targets:
+        urls = [u for u in target.urls if url_domain(u.url) in domains]
+        feeds = [u for u in target.feeds if url_domain(u.url) in domains]
+        handle = target.twitter_handle if TWITTER_DOMAIN in domains else None
+        if not urls and not feeds and not handle:
+            continue
+        restricted.append(Target(
+            entity_name=target.entity_name,
+            entity_type=target.entity_type,
+            country_or_region=target.country_or_region,
+            urls=urls,
+            twitter_handle=handle,
+            feeds=feeds,
+            discover=target.discover if urls and urls[0] is target.urls[0] else None,
+            render=target.render,
+        ))
+    return restricted
@@ -1,11 +1,62 @@
-"""Load and validate targets.yaml into dataclasses."""
+"""Load and validate targets.yaml into dataclasses.
+
+Parsing a large YAML file on every run is slow, so the validated targets
+are compiled into a SQLite file under the crawl cache, named by the YAML's
+content hash. Later runs with an unchanged file query the compiled form,
+using its indexes to load only the targets a filtered run or shard needs.
+"""
 from __future__ import annotations
 
+import hashlib
+import json
+import logging
+import os
+import sqlite3
 from dataclasses import dataclass, field
+from urllib.parse import urlparse
 
 import yaml
 
-from .config import TARGETS_PATH
+from .config import CACHE_DIR, TARGETS_PATH, VALID_CONTEXTS, VALID_ENTITY_TYPES
+
+logger = logging.getLogger(__name__)
+
+# Use libyaml's C loader when available
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_COMPILED_VERSION = 3
+_DISCOVER_KEYS = {"sitemap", "follow_links", "max_depth", "max_urls"}
+TWITTER_DOMAIN = "x.com"
+
+_SCHEMA = """
+CREATE TABLE targets (
+    id                INTEGER PRIMARY KEY,
+    entity_name       TEXT NOT NULL,
+    entity_name_lower TEXT NOT NULL,
+    entity_type       TEXT NOT NULL,
+    country_or_region TEXT NOT NULL,
+    twitter_handle    TEXT,
+    discover          TEXT,
+    render            INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE urls (
+    target_id INTEGER NOT NULL REFERENCES targets (id),
+    position  INTEGER NOT NULL,
+    url       TEXT NOT NULL,
+    domain    TEXT NOT NULL,
+    context   TEXT NOT NULL,
+    platform  TEXT NOT NULL,
+    kind      TEXT NOT NULL DEFAULT 'page'  -- page | feed
+);
+CREATE INDEX targets_entity_name ON targets (entity_name_lower);
+CREATE INDEX targets_entity_type ON targets (entity_type);
+CREATE INDEX targets_country ON targets (country_or_region);
+CREATE INDEX urls_target ON urls (target_id, position);
+CREATE INDEX urls_domain ON urls (domain);
+"""
+
+
+class TargetsError(ValueError):
+    """Raised when targets.yaml does not match the expected structure."""
 
 
 @dataclass
@@ -22,12 +73,82 @@ class Target:
     country_or_region: str
     urls: list[TargetURL] = field(default_factory=list)
     twitter_handle: str | None = None
+    feeds: list[TargetURL] = field(default_factory=list)  # RSS/Atom newsroom feeds
+    discover: dict | None = None  # {"sitemap": bool, "follow_links": bool, "max_depth": int, "max_urls": int}
+    render: bool = False  # render with a headless browser when plain HTML has no terms
+
+
+def _discover_options(value) -> dict | None:
+    """Normalise a target's ``discover`` setting (true/false or a mapping)."""
+    if not value:
+        return None
+    if value is True:
+        return {}
+    return dict(value)
+
+
+def url_domain(url: str) -> str:
+    """Normalised domain for a URL (lowercase, no leading ``www.``)."""
+    return urlparse(url).netloc.lower().removeprefix("www.")
+
+
+def validate_targets_data(data) -> list[str]:
+    """Validate parsed targets YAML. Returns a list of error messages."""
+    if not isinstance(data, dict) or not isinstance(data.get("targets"), list):
+        return ["top level must be a mapping with a 'targets' list"]
+
+    errors = []
+    for i, t in enumerate(data["targets"]):
+        prefix = f"targets[{i}]"
+        if not isinstance(t, dict):
+            errors.append(f"{prefix}: must be a mapping")
+            continue
+        prefix = f"{prefix} ({t.get('entity_name', '?')})"
+        for key in ("entity_name", "entity_type", "country_or_region"):
+            if not isinstance(t.get(key), str) or not t.get(key):
+                errors.append(f"{prefix}: missing or empty '{key}'")
+        if t.get("entity_type") not in VALID_ENTITY_TYPES:
+            errors.append(f"{prefix}: invalid entity_type: {t.get('entity_type')}")
+        handle = t.get("twitter_handle")
+        if handle is not None and not isinstance(handle, str):
+            errors.append(f"{prefix}: twitter_handle must be a string")
+        if not isinstance(t.get("render", False), bool):
+            errors.append(f"{prefix}: render must be true/false")
+        discover = t.get("discover")
+        if discover is not None and not isinstance(discover, bool):
+            if not isinstance(discover, dict):
+                errors.append(f"{prefix}: discover must be true/false or a mapping")
+            elif set(discover) - _DISCOVER_KEYS:
+                errors.append(f"{prefix}: unknown discover keys {set(discover) - _DISCOVER_KEYS}")
+        for key in ("urls", "feeds"):
+            urls = t.get(key, [])
+            if not isinstance(urls, list):
+                errors.append(f"{prefix}: {key} must be a list")
+                continue
+            for j, u in enumerate(urls):
+                up = f"{prefix}: {key}[{j}]"
+                if not isinstance(u, dict):
+                    errors.append(f"{up}: must be a mapping")
+                    continue
+                url = u.get("url")
+                if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+                    errors.append(f"{up}: invalid url: {url!r}")
+                if u.get("context", "website") not in VALID_CONTEXTS:
+                    errors.append(f"{up}: invalid context: {u.get('context')}")
+    return errors
 
 
-def load_targets(path: str = TARGETS_PATH) -> list[Target]:
-    """Load targets from a YAML file."""
+def _parse_yaml(path: str) -> list[Target]:
     with open(path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+        data = yaml.load(f, Loader=_YAML_LOADER)
+    return targets_from_data(data, f"targets file {path}")
+
+
+def targets_from_data(data, source: str = "targets") -> list[Target]:
+    """Targets from parsed targets.yaml data; raises TargetsError if invalid."""
+    errors = validate_targets_data(data)
+    if errors:
+        raise TargetsError(f"Invalid {source}:\n  " + "\n  ".join(errors))
 
     targets = []
     for t in data.get("targets", []):
@@ -38,11 +159,139 @@ def load_targets(path: str = TARGETS_PATH) -> list[Target]:
                 context=u.get("context", "website"),
                 platform=u.get("platform", ""),
             ))
+        # Newsroom feeds carry press releases unless stated otherwise
+        feeds = [
+            TargetURL(url=u["url"], context=u.get("context", "press_release"),
+                      platform=u.get("platform", ""))
+            for u in t.get("feeds", [])
+        ]
         targets.append(Target(
             entity_name=t["entity_name"],
             entity_type=t["entity_type"],
             country_or_region=t["country_or_region"],
             urls=urls,
             twitter_handle=t.get("twitter_handle"),
+            feeds=feeds,
+            discover=_discover_options(t.get("discover")),
+            render=t.get("render", False),
         ))
     return targets
+
+
+def _compile(targets: list[Target], compiled_path: str) -> None:
+    os.makedirs(os.path.dirname(compiled_path), exist_ok=True)
+    tmp = f"{compiled_path}.{os.getpid()}.tmp"
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript(_SCHEMA)
+        conn.execute(f"PRAGMA user_version = {_COMPILED_VERSION}")
+        for target_id, t in enumerate(targets):
+            conn.execute(
+                "INSERT INTO targets VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (target_id, t.entity_name, t.entity_name.lower(), t.entity_type,
+                 t.country_or_region, t.twitter_handle,
+                 json.dumps(t.discover) if t.discover is not None else None,
+                 int(t.render)),
+            )
+            conn.executemany(
+                "INSERT INTO urls VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(target_id, pos, u.url, url_domain(u.url), u.context, u.platform, kind)
+                 for kind, urls in (("page", t.urls), ("feed", t.feeds))
+                 for pos, u in enumerate(urls)],
+            )
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, compiled_path)
+
+
+def compiled_targets_path(path: str = TARGETS_PATH) -> str:
+    """Compile ``path`` if needed and return the compiled SQLite path."""
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    compiled_path = os.path.join(CACHE_DIR, f"targets-{digest}.sqlite")
+    if os.path.exists(compiled_path):
+        conn = sqlite3.connect(compiled_path)
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+        if version == _COMPILED_VERSION:
+            return compiled_path
+    logger.debug("Compiling targets %s -> %s", path, compiled_path)
+    _compile(_parse_yaml(path), compiled_path)
+    return compiled_path
+
+
+def load_targets(
+    path: str = TARGETS_PATH,
+    entity: str | None = None,
+    entity_type: str | None = None,
+    country: str | None = None,
+    domains: set[str] | None = None,
+) -> list[Target]:
+    """Load targets from a YAML file, optionally filtered.
+
+    Args:
+        entity: Case-insensitive substring of entity_name
+        entity_type: Exact entity_type
+        country: Exact country_or_region
+        domains: Keep targets with a URL on one of these domains (or, when
+            TWITTER_DOMAIN is included, a twitter_handle)
+    """
+    conn = sqlite3.connect(compiled_targets_path(path))
+    try:
+        where, params = [], []
+        if entity:
+            where.append("instr(t.entity_name_lower, ?) > 0")
+            params.append(entity.lower())
+        if entity_type:
+            where.append("t.entity_type = ?")
+            params.append(entity_type)
+        if country:
+            where.append("t.country_or_region = ?")
+            params.append(country)
+        if domains is not None:
+            marks = ", ".join("?" * len(domains))
+            clause = f"t.id IN (SELECT target_id FROM urls WHERE domain IN ({marks}))"
+            if TWITTER_DOMAIN in domains:
+                clause = f"({clause} OR t.twitter_handle IS NOT NULL)"
+            where.append(clause)
+            params.extend(sorted(domains))
+        sql = "SELECT * FROM targets t"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        rows = conn.execute(sql + " ORDER BY t.id", params).fetchall()
+
+        targets = []
+        for target_id, name, _, etype, region, handle, discover, render in rows:
+            urls: dict[str, list[TargetURL]] = {"page": [], "feed": []}
+            for url, context, platform, kind in conn.execute(
+                    "SELECT url, context, platform, kind FROM urls "
+                    "WHERE target_id = ? ORDER BY position", (target_id,)):
+                urls[kind].append(TargetURL(url=url, context=context, platform=platform))
+            targets.append(Target(
+                entity_name=name,
+                entity_type=etype,
+                country_or_region=region,
+                urls=urls["page"],
+                twitter_handle=handle,
+                feeds=urls["feed"],
+                discover=json.loads(discover) if discover is not None else None,
+                render=bool(render),
+            ))
+        return targets
+    finally:
+        conn.close()
+
+
+def load_domains(path: str = TARGETS_PATH) -> set[str]:
+    """All domains in a targets file (plus TWITTER_DOMAIN if any target has Twitter)."""
+    conn = sqlite3.connect(compiled_targets_path(path))
+    try:
+        domains = {row[0] for row in conn.execute("SELECT DISTINCT domain FROM urls")}
+        if conn.execute("SELECT 1 FROM targets WHERE twitter_handle IS NOT NULL LIMIT 1").fetchone():
+            domains.add(TWITTER_DOMAIN)
+        return domains
+    finally:
+        conn.close()
@@ -0,0 +1,431 @@
+"""Multilingual term matching driven by terms.yaml.
+
+The patterns of all languages written in the same script are compiled
+into one regex with a named group per term key, so a page costs one pass
+per script present rather than one per pattern. A cheap script probe
+decides which passes run: an all-ASCII page only runs the Latin one.
+
+``TermMatcher.byte_prefilter`` goes one step earlier: a test over raw
+(undecoded) HTML that rejects pages which cannot contain any term.
+"""
+from __future__ import annotations
+
+import array
+import itertools
+import mmap
+import re
+import sys
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import Iterable, Iterator
+
+import yaml
+
+from .config import TERM_KEY_TO_STRING, TERMS_PATH
+
+# Character classes that show a page contains a given writing system
+_SCRIPT_CLASSES = {
+    "latin": r"A-Za-z",
+    "han": r"\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff",
+    "hangul": r"\u1100-\u11ff\u3130-\u318f\uac00-\ud7af",
+    "kana": r"\u3040-\u30ff",
+    # Letters only Vietnamese uses among Latin-script languages
+    "vietnamese": "ăđơưĂĐƠƯạảấầẩẫậắằẳẵặẹẻẽếềểễệỉịọỏốồổỗộớờởỡợụủứừửữựỳỵỷỹ"
+                  "ẠẢẤẦẨẪẬẮẰẲẴẶẸẺẼẾỀỂỄỆỈỊỌỎỐỒỔỖỘỚỜỞỠỢỤỦỨỪỬỮỰỲỴỶỸ",
+}
+_SCRIPT_PROBES = {script: re.compile(f"[{chars}]") for script, chars in _SCRIPT_CLASSES.items()}
+
+
+def _first_char(pattern: str) -> str | None:
+    """The literal character every match of ``pattern`` starts with, if clear."""
+    body = pattern.removeprefix(r"\b")
+    if body[:1].isalnum() and body[1:2] not in ("?", "*", "{"):
+        return body[0]
+    return None
+
+
+def _compile(groups: dict[str, list[str]], ignore_case: bool) -> re.Pattern:
+    """One alternation over all term groups.
+
+    When every pattern starts with a literal, a lookahead on those first
+    characters lets the regex engine skip other positions cheaply, which
+    keeps one combined pass as fast as a single-term pattern.
+    """
+    alternation = "|".join(
+        f"(?P<{key}>{'|'.join(f'(?:{p})' for p in patterns)})"
+        for key, patterns in groups.items())
+    firsts = [_first_char(p) for patterns in groups.values() for p in patterns]
+    if all(firsts):
+        chars = set(firsts)
+        if ignore_case:
+            chars |= {c.swapcase() for c in chars}
+        alternation = f"(?=[{''.join(sorted(chars))}])(?:{alternation})"
+    return re.compile(alternation, re.IGNORECASE if ignore_case else 0)
+
+
+def literal_anchors(pattern: str) -> list[str] | None:
+    """Literal strings, one of which is in every match of ``pattern``.
+
+    The longest run of plain characters at the top level of the pattern
+    (of each branch, for a top-level alternation). None if a branch has
+    no such run, or the pattern uses syntax not followed here (inline
+    flags, backreferences, ...): the caller then goes without.
+    """
+    branches = _top_level_items(pattern)
+    if branches is None:
+        return None
+    anchors = []
+    for items in branches:
+        best, run = "", []
+        for item in [*items, None]:
+            if item is not None:
+                run.append(item)
+                continue
+            if len(run) > len(best):
+                best = "".join(run)
+            run = []
+        if not best:
+            return None
+        anchors.append(best)
+    return anchors
+
+
+# Escapes giving a character by its code, and their number of hex digits
+_HEX_ESCAPES = {"x": 2, "u": 4, "U": 8}
+# Escapes matching a class of characters or nothing at all (assertions)
+_CLASS_ESCAPES = set("bBAZsSdDwW")
+_QUANTIFIER = re.compile(r"(?:[?*+]|\{\d*(?:,\d*)?\})[?+]?")
+_HEX_DIGITS = re.compile(r"[0-9a-fA-F]+")
+
+
+def _top_level_items(pattern: str) -> list[list[str | None]] | None:
+    """The top-level branches of ``pattern``, read item by item.
+
+    Each item is the literal character every match has at that point, or
+    None for anything else (a class, group, assertion or optional item).
+    None if the pattern holds syntax this reader does not follow.
+    """
+    branches: list[list[str | None]] = [[]]
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        item = None
+        if char == "|":
+            branches.append([])
+            i += 1
+            continue
+        if char == "\\":
+            escaped = pattern[i + 1:i + 2]
+            if escaped in _HEX_ESCAPES:
+                digits = pattern[i + 2:i + 2 + _HEX_ESCAPES[escaped]]
+                if len(digits) != _HEX_ESCAPES[escaped] or not _HEX_DIGITS.fullmatch(digits):
+                    return None
+                item = chr(int(digits, 16))
+                i += 2 + len(digits)
+            elif escaped and not escaped.isalnum():
+                item = escaped
+                i += 2
+            elif escaped in _CLASS_ESCAPES:
+                i += 2
+            else:
+                return None
+        elif char == "[":
+            i = _class_end(pattern, i)
+        elif char == "(":
+            flags = re.match(r"\(\?[aiLmsux-]+([:)])", pattern[i:])
+            if flags and flags.group(1) == ")":
+                # Inline flags change how the rest of the pattern matches
+                return None
+            i = _group_end(pattern, i)
+        elif char in "?*+{)":
+            return None
+        elif char in ".^$":
+            i += 1
+        else:
+            item = char
+            i += 1
+        if i is None:
+            return None
+        quantifier = _QUANTIFIER.match(pattern, i)
+        if quantifier:
+            # Only "+" still requires the item, once
+            branches[-1].append(item if quantifier.group().startswith("+") else None)
+            item = None
+            i = quantifier.end()
+        branches[-1].append(item)
+    return branches
+
+
+def _class_end(pattern: str, i: int) -> int | None:
+    """Index just past the character class starting at ``pattern[i]``."""
+    i += 1
+    if pattern[i:i + 1] == "^":
+        i += 1
+    if pattern[i:i + 1] == "]":
+        i += 1
+    while i < len(pattern):
+        if pattern[i] == "\\":
+            i += 2
+        elif pattern[i] == "]":
+            return i + 1
+        else:
+            i += 1
+    return None
+
+
+def _group_end(pattern: str, i: int) -> int | None:
+    """Index just past the group starting at ``pattern[i]``."""
+    depth = 0
+    while i is not None and i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            i = _class_end(pattern, i)
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return None
+
+
+@lru_cache(maxsize=1)
+def _cased_planes() -> str:
+    """Every character of Unicode planes 0 and 1 (no other plane has case)."""
+    codes = array.array("I", range(0xD800))
+    codes.extend(range(0xE000, 0x20000))
+    return codes.tobytes().decode(f"utf-32-{sys.byteorder[0]}e")
+
+
+def _ignore_case_forms(chars: Iterable[str]) -> dict[str, set[str]]:
+    """Every character re's IGNORECASE matches with each of ``chars``.
+
+    Asks the regex engine itself, in one pass over the cased planes, so
+    the forms follow whichever Unicode case rules re applies ("ſ" for
+    "s", "K" for "k", ...).
+    """
+    forms = {char: {char} for char in chars}
+    if not forms:
+        return forms
+    probe = re.compile("[" + "".join(map(re.escape, forms)) + "]", re.IGNORECASE)
+    for found in set(probe.findall(_cased_planes())):
+        for char in forms:
+            if re.fullmatch(re.escape(char), found, re.IGNORECASE):
+                forms[char].add(found)
+    return forms
+
+
+def _byte_forms(char: str) -> list[bytes]:
+    """Bytes regexes for ``char`` as it may appear in raw HTML.
+
+    Its UTF-8 encoding; non-ASCII characters also as a JSON \\u escape
+    (JSON-LD) or an HTML character reference.
+    """
+    forms = [re.escape(char.encode("utf-8"))]
+    code = ord(char)
+    if code > 0x7F:
+        if code <= 0xFFFF:
+            forms.append(rb"\\u(?i:%04x)" % code)
+        forms.append(rb"&#0*%d;" % code)
+        forms.append(rb"&#[xX](?i:0*%x);" % code)
+    return forms
+
+
+class BytePrefilter:
+    """Test on raw (undecoded) UTF-8 HTML for whether it can hold a term.
+
+    Built from literal anchors, so it passes some pages without a term but
+    never rejects one with a term. Anchors are plain substring searches:
+    over the page as is, or for case-insensitive anchors over an
+    ASCII-lowercased copy. Only a page holding a character escape (JSON
+    ``\\u``, HTML ``&#``) or an unusual case form such as "ſ" also gets a
+    regex pass over the anchors' other forms. ASCII letters written as
+    escapes are not looked for.
+    """
+
+    def __init__(self, anchors: Iterable[tuple[str, bool]]):
+        anchors = list(anchors)
+        folds = _ignore_case_forms({c for anchor, ignore_case in anchors if ignore_case
+                                    for c in anchor})
+
+        def case_forms(char: str, ignore_case: bool) -> set[str]:
+            return folds[char] if ignore_case else {char}
+
+        self._exact: set[bytes] = set()     # searched in the page as is
+        self._folded: set[bytes] = set()    # searched in the ASCII-lowercased page
+        self._triggers: set[bytes] = set()  # bytes that call for the regex pass
+        alternatives: set[bytes] = set()
+        first_bytes: set[bytes] = set()
+        for anchor, ignore_case in anchors:
+            plain, triggers = [], set()
+            for char in anchor:
+                forms = case_forms(char, ignore_case)
+                if not char.isascii():
+                    triggers |= {b"\\u", b"&#"}
+                    plain.append(sorted(forms))
+                elif ignore_case:
+                    # bytes.lower() folds ASCII only; other forms go to the regex pass
+                    triggers |= {f.encode("utf-8") for f in forms if not f.isascii()}
+                    plain.append([char.lower()])
+                else:
+                    plain.append([char])
+            found = {"".join(chars).encode("utf-8") for chars in itertools.product(*plain)}
+            (self._folded if ignore_case else self._exact).update(found)
+            if triggers:
+                self._triggers |= triggers
+                alternatives.add(b"".join(
+                    b"(?:" + b"|".join(f for c in sorted(case_forms(char, ignore_case))
+                                       for f in _byte_forms(c)) + b")"
+                    for char in anchor))
+                for c in case_forms(anchor[0], ignore_case):
+                    first_bytes.add(c.encode("utf-8")[:1])
+                    if not c.isascii():
+                        first_bytes |= {b"\\", b"&"}
+        self._regex = None
+        if alternatives:
+            # The lookahead lets the engine skip positions that start no form
+            lookahead = b"".join(re.escape(b) for b in sorted(first_bytes))
+            self._regex = re.compile(
+                b"(?=[" + lookahead + b"])(?:" + b"|".join(sorted(alternatives)) + b")")
+
+    def may_contain(self, data: bytes | mmap.mmap) -> bool:
+        """False only if no term can occur in ``data``."""
+        if any(data.find(anchor) != -1 for anchor in self._exact):
+            return True
+        if self._folded:
+            lowered = data[:].lower()
+            if any(lowered.find(anchor) != -1 for anchor in self._folded):
+                return True
+        if self._regex is not None and any(data.find(t) != -1 for t in self._triggers):
+            return self._regex.search(data) is not None
+        return False
+
+
+@dataclass
+class ScriptMatcher:
+    script: str
+    languages: list[str]
+    pattern: re.Pattern  # alternation with one named group per term key
+
+
+@lru_cache(maxsize=None)
+def _union_probe(scripts: frozenset[str]) -> re.Pattern:
+    return re.compile("[" + "".join(_SCRIPT_CLASSES[s] for s in sorted(scripts)) + "]")
+
+
+def detect_scripts(text: str) -> set[str]:
+    """Writing systems present in ``text`` (see ``_SCRIPT_CLASSES``).
+
+    Searches for any script not yet seen and resumes after each hit, so the
+    text is scanned at most once however many scripts are probed.
+    """
+    remaining = {"latin"} if text.isascii() else set(_SCRIPT_CLASSES)
+    found: set[str] = set()
+    pos = 0
+    while remaining:
+        match = _union_probe(frozenset(remaining)).search(text, pos)
+        if match is None:
+            break
+        char = match.group()
+        hits = {s for s in remaining if _SCRIPT_PROBES[s].match(char)}
+        found |= hits
+        remaining -= hits
+        pos = match.end()
+    return found
+
+
+class TermMatcher:
+    """Compiled term matchers loaded from a term table."""
+
+    def __init__(self, path: str = TERMS_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+        # (script, ignore_case) -> languages and their merged term patterns
+        passes: dict[tuple[str, bool], tuple[list[str], dict[str, list[str]]]] = {}
+        self._patterns: list[tuple[str, bool]] = []  # (pattern, ignore_case)
+        for language, spec in data["languages"].items():
+            script = spec["script"]
+            if script not in _SCRIPT_CLASSES:
+                raise ValueError(f"{path}: unknown script '{script}' for {language}")
+            languages, groups = passes.setdefault(
+                (script, bool(spec.get("ignore_case"))), ([], {}))
+            languages.append(language)
+            for key, patterns in spec["terms"].items():
+                if key not in TERM_KEY_TO_STRING:
+                    raise ValueError(f"{path}: unknown term key '{key}' for {language}")
+                groups.setdefault(key, []).extend(patterns)
+                self._patterns.extend((p, bool(spec.get("ignore_case"))) for p in patterns)
+        self.matchers = [
+            ScriptMatcher(script, languages, _compile(groups, ignore_case))
+            for (script, ignore_case), (languages, groups) in passes.items()
+        ]
+
+    @cached_property
+    def byte_prefilter(self) -> BytePrefilter | None:
+        """Prefilter built from every pattern's literal anchors.
+
+        None when some pattern has no literal anchor to look for.
+        """
+        anchors = set()
+        for pattern, ignore_case in self._patterns:
+            found = literal_anchors(pattern)
+            if found is None:
+                return None
+            anchors.update((anchor, ignore_case) for anchor in found)
+        return BytePrefilter(sorted(anchors))
+
+    def matchers_for(self, *texts: str) -> list[ScriptMatcher]:
+        """Matchers for the scripts that appear in ``texts``."""
+        scripts: set[str] = set()
+        for text in texts:
+            scripts |= detect_scripts(text)
+        return [m for m in self.matchers if m.script in scripts]
+
+    def finditer(self, text: str) -> Iterator[tuple[str, re.Match]]:
+        """Yield ``(term_key, match)`` for every term occurrence in ``text``."""
+        for matcher in self.matchers_for(text):
+            for match in matcher.pattern.finditer(text):
+                yield match.lastgroup, match
+
+    def spans(self, text: str) -> list[tuple[str, int, int]]:
+        """``(term_key, start, end)`` of every term occurrence, in text order."""
+        return sorted(((key, m.start(), m.end()) for key, m in self.finditer(text)),
+                      key=lambda span: span[1])
+
+    def search(self, text: str) -> tuple[str, re.Match] | None:
+        """The earliest term occurrence in ``text``, if any."""
+        best = None
+        for matcher in self.matchers_for(text):
+            match = matcher.pattern.search(text)
+            if match and (best is None or match.start() < best[1].start()):
+                best = (match.lastgroup, match)
+        return best
+
+    def count(self, *texts: str) -> dict[str, int]:
+        """Occurrences per term key across ``texts``, in schema key order."""
+        counts: dict[str, int] = {}
+        for text in texts:
+            for key, _ in self.finditer(text):
+                counts[key] = counts.get(key, 0) + 1
+        return ordered_counts(counts)
+
+
+def ordered_counts(counts: dict[str, int]) -> dict[str, int]:
+    """``counts`` with keys in schema order (chinese_new_year first)."""
+    return {key: counts[key] for key in TERM_KEY_TO_STRING if key in counts}
+
+
+_matcher: TermMatcher | None = None
+
+
+def get_term_matcher() -> TermMatcher:
+    """Shared TermMatcher for the default term table."""
+    global _matcher
+    if _matcher is None:
+        _matcher = TermMatcher()
+    return _matcher
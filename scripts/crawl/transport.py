@@ -0,0 +1,280 @@
+"""Pooled HTTP transport for the Fetcher, with a DNS cache and reuse stats.
+
+The default backend is a ``requests`` session with sized urllib3 pools.
+With ``http2=True`` it uses an ``httpx`` client instead (requires
+``httpx[http2]``), so requests to one host share a multiplexed
+connection. Both backends keep connections alive across fetches and count
+how many requests reused a connection vs opened a new one. Each transport
+caches the DNS answers its own requests need.
+"""
+from __future__ import annotations
+
+import logging
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from .config import DNS_CACHE_TTL, HTTP_HOST_POOL_SIZES, HTTP_MAX_SOCKETS, HTTP_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/131.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br",
+    "DNT": "1",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+# Lazy import httpx so the crawler can run without it installed
+_httpx = None
+
+
+def _get_httpx():
+    global _httpx
+    if _httpx is None:
+        try:
+            import httpx
+            _httpx = httpx
+        except ImportError:
+            raise ImportError(
+                "httpx is required for HTTP/2 fetching. "
+                "Install it with: pip install 'httpx[http2]'"
+            )
+    return _httpx
+
+
+class DNSCache:
+    """``socket.getaddrinfo`` answers for the requests of one Transport.
+
+    getaddrinfo does not report record TTLs, so answers are kept for a
+    fixed ``ttl``; expired ones are evicted as new lookups come in.
+    urllib3 and httpcore both resolve through ``socket.getaddrinfo`` in the
+    requesting thread, so a lookup goes through the cache only while
+    ``active()`` in that thread; all others go straight to the resolver.
+    """
+
+    def __init__(self, ttl: float = DNS_CACHE_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[tuple, tuple[float, list]] = {}
+        self._next_purge = 0.0
+        self._lock = threading.Lock()
+
+    def lookup(self, resolve, host, port, *args, **kwargs):
+        key = (host, port, args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and cached[0] > now:
+                self.hits += 1
+                return cached[1]
+        result = resolve(host, port, *args, **kwargs)
+        with self._lock:
+            self.misses += 1
+            if now >= self._next_purge:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                self._next_purge = now + self.ttl
+            self._entries[key] = (now + self.ttl, result)
+        return result
+
+    @contextmanager
+    def active(self) -> Iterator[None]:
+        """Resolve this thread's lookups through the cache for the block."""
+        token = _active_dns_cache.set(self)
+        try:
+            yield
+        finally:
+            _active_dns_cache.reset(token)
+
+
+_active_dns_cache: ContextVar[DNSCache | None] = ContextVar("dns_cache", default=None)
+# socket.getaddrinfo as found; it is wrapped only while a Transport is open
+_resolve = socket.getaddrinfo
+_open_transports = 0
+_install_lock = threading.Lock()
+
+
+def _getaddrinfo(host, port, *args, **kwargs):
+    cache = _active_dns_cache.get()
+    if cache is None:
+        return _resolve(host, port, *args, **kwargs)
+    return cache.lookup(_resolve, host, port, *args, **kwargs)
+
+
+def _transport_opened() -> None:
+    global _open_transports, _resolve
+    with _install_lock:
+        if _open_transports == 0 and socket.getaddrinfo is not _getaddrinfo:
+            _resolve = socket.getaddrinfo
+            socket.getaddrinfo = _getaddrinfo
+        _open_transports += 1
+
+
+def _transport_closed() -> None:
+    global _open_transports
+    with _install_lock:
+        _open_transports -= 1
+        if _open_transports == 0 and socket.getaddrinfo is _getaddrinfo:
+            socket.getaddrinfo = _resolve
+
+
+class _ConnectionStats:
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.http2_requests = 0
+        self._lock = threading.Lock()
+
+    def opened(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def as_dict(self) -> dict:
+        reused = max(0, self.requests - self.connections)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections,
+            "connections_reused": reused,
+            "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+            "http2_requests": self.http2_requests,
+        }
+
+
+def _counting_pools(stats: _ConnectionStats) -> dict:
+    """urllib3 pool classes that count the connections they open."""
+
+    class CountingHTTPPool(HTTPConnectionPool):
+        def _new_conn(self):
+            stats.opened()
+            return super()._new_conn()
+
+    class CountingHTTPSPool(HTTPSConnectionPool):
+        def _new_conn(self):
+            stats.opened()
+            return super()._new_conn()
+
+    return {"http": CountingHTTPPool, "https": CountingHTTPSPool}
+
+
+class _CountingAdapter(HTTPAdapter):
+    def __init__(self, stats: _ConnectionStats, **kwargs):
+        self._pool_classes = _counting_pools(stats)
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool_classes
+
+
+class Transport:
+    """Keep-alive HTTP client shared by all fetches of a Fetcher.
+
+    Args:
+        headers: Request headers (default: DEFAULT_HEADERS)
+        pool_size: Connections per host; a request waits for a free one
+            rather than open more
+        max_sockets: Socket budget across hosts. With requests it sizes how
+            many host pools are kept (each up to ``pool_size``), so a crawl
+            of many hosts can briefly exceed it; httpx enforces it exactly
+        host_pool_sizes: Per-host overrides of ``pool_size``
+        http2: Use httpx with HTTP/2 instead of requests
+    """
+
+    def __init__(self, headers: dict | None = None, pool_size: int = HTTP_POOL_SIZE,
+                 max_sockets: int = HTTP_MAX_SOCKETS,
+                 host_pool_sizes: dict[str, int] | None = None, http2: bool = False):
+        self.http2 = http2
+        self._dns = DNSCache()
+        self._closed = False
+        self._stats = _ConnectionStats()
+        headers = DEFAULT_HEADERS if headers is None else headers
+        host_pool_sizes = HTTP_HOST_POOL_SIZES if host_pool_sizes is None else host_pool_sizes
+        if http2:
+            self._client = self._httpx_client(headers, pool_size, max_sockets, host_pool_sizes)
+            self.errors: tuple[type[Exception], ...] = (_get_httpx().HTTPError,)
+        else:
+            self._client = self._requests_session(headers, pool_size, max_sockets, host_pool_sizes)
+            self.errors = (requests.RequestException,)
+        _transport_opened()
+
+    def _requests_session(self, headers, pool_size, max_sockets, host_pool_sizes):
+        session = requests.Session()
+        session.headers.update(headers)
+        # Sockets are about (host pools kept) x (connections per pool): pools
+        # block when full, but a pool dropped from the LRU only closes its
+        # idle connections
+        for prefix in ("http://", "https://"):
+            session.mount(prefix, _CountingAdapter(
+                self._stats, pool_connections=max(1, max_sockets // pool_size),
+                pool_maxsize=pool_size, pool_block=True))
+        for host, size in host_pool_sizes.items():
+            for scheme in ("http", "https"):
+                session.mount(f"{scheme}://{host}/", _CountingAdapter(
+                    self._stats, pool_connections=1, pool_maxsize=size, pool_block=True))
+        return session
+
+    def _httpx_client(self, headers, pool_size, max_sockets, host_pool_sizes):
+        # HTTP/2 multiplexes each host over one connection, so only the total
+        # bound applies by default; per-host overrides get their own pools
+        httpx = _get_httpx()
+        mounts = {
+            f"all://{host}": httpx.HTTPTransport(
+                http2=True, limits=httpx.Limits(max_connections=size,
+                                                max_keepalive_connections=size))
+            for host, size in host_pool_sizes.items()
+        }
+        return httpx.Client(
+            headers=headers, http2=True, follow_redirects=True, mounts=mounts,
+            limits=httpx.Limits(max_connections=max_sockets,
+                                max_keepalive_connections=max_sockets),
+        )
+
+    def _trace(self, event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            self._stats.opened()
+
+    def get(self, url: str, timeout: tuple[float, float], headers: dict | None = None):
+        """GET ``url`` following redirects; ``timeout`` is (connect, read).
+
+        ``headers`` are sent in addition to the client's default headers.
+        """
+        self._stats.requests += 1
+        if not self.http2:
+            with self._dns.active():
+                return self._client.get(url, timeout=timeout, headers=headers,
+                                        allow_redirects=True)
+        connect, read = timeout
+        with self._dns.active():
+            resp = self._client.get(url, timeout=_get_httpx().Timeout(read, connect=connect),
+                                    headers=headers, extensions={"trace": self._trace})
+        if resp.http_version == "HTTP/2":
+            self._stats.http2_requests += 1
+        return resp
+
+    def stats(self) -> dict:
+        """Connection-reuse and DNS cache counters since this transport started."""
+        return {
+            "backend": "httpx/h2" if self.http2 else "requests",
+            **self._stats.as_dict(),
+            "dns_cache_hits": self._dns.hits,
+            "dns_cache_misses": self._dns.misses,
+        }
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._client.close()
+        _transport_closed()
@@ -0,0 +1,221 @@
+"""Archive fetched pages as gzip-compressed WARC files in evidence/warc/.
+
+Every record is its own gzip member, so a record can be read back by
+seeking to its offset. A page whose payload digest was archived before
+gets a small ``revisit`` record pointing at the original instead of a
+second full copy. Evidence pointers have the form
+``warc/<file>.warc.gz#<offset>``, relative to the evidence/ directory.
+"""
+from __future__ import annotations
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+from .config import EVIDENCE_DIR, WARC_DIR, WARC_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "index.json"
+REVISIT_PROFILE = "http://netpreserve.org/warc/1.1/revisit/identical-payload-digest"
+# Body encodings are already undone by the HTTP client, so these would lie
+_DROP_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+
+def _sha1(data: bytes) -> str:
+    return "sha1:" + base64.b32encode(hashlib.sha1(data).digest()).decode("ascii")
+
+
+def _warc_date() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _http_headers(resp) -> bytes:
+    """Status line and headers of a requests/httpx response, as HTTP/1.1 text."""
+    reason = getattr(resp, "reason", None) or getattr(resp, "reason_phrase", "")
+    lines = [f"HTTP/1.1 {resp.status_code} {reason}".rstrip()]
+    for name, value in resp.headers.items():
+        if name.lower() not in _DROP_HEADERS:
+            lines.append(f"{name}: {value}")
+    lines.append(f"Content-Length: {len(resp.content)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8", errors="replace")
+
+
+def _record(headers: dict[str, str], block: bytes) -> bytes:
+    head = "WARC/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+    head += f"Content-Length: {len(block)}\r\n\r\n"
+    return head.encode("utf-8") + block + b"\r\n\r\n"
+
+
+class WarcWriter:
+    """Append response/revisit records to rotating ``.warc.gz`` files.
+
+    Args:
+        directory: Where WARC files and the digest index live
+        max_bytes: Start a new file once the current one reaches this size
+    """
+
+    def __init__(self, directory: str = WARC_DIR, max_bytes: int = WARC_MAX_BYTES):
+        self._dir = directory
+        self._max_bytes = max_bytes
+        self._file = None
+        self._name = ""
+        self._serial = 0
+        self._stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        # payload digest -> original record; URL -> latest record pointer
+        self._digests, self._urls = self._load_index()
+        self._new_digests: dict[str, dict] = {}
+        self._new_urls: dict[str, str] = {}
+        self.responses = 0
+        self.revisits = 0
+        self.bytes_written = 0
+
+    def _index_path(self) -> str:
+        return os.path.join(self._dir, INDEX_NAME)
+
+    def _load_index(self) -> tuple[dict, dict]:
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data.get("digests", {}), data.get("urls", {})
+        except FileNotFoundError:
+            return {}, {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Ignoring unreadable WARC index: %s", e)
+            return {}, {}
+
+    def _open(self) -> None:
+        os.makedirs(self._dir, exist_ok=True)
+        while True:
+            self._name = f"crawl-{self._stamp}-{os.getpid()}-{self._serial:05d}.warc.gz"
+            self._serial += 1
+            if not os.path.exists(os.path.join(self._dir, self._name)):
+                break
+        self._file = open(os.path.join(self._dir, self._name), "ab")
+        info = b"software: cnyvslny-crawler\r\nformat: WARC File Format 1.1\r\n"
+        self._append({
+            "WARC-Type": "warcinfo",
+            "WARC-Record-ID": f"<urn:uuid:{uuid.uuid4()}>",
+            "WARC-Date": _warc_date(),
+            "WARC-Filename": self._name,
+            "Content-Type": "application/warc-fields",
+        }, info)
+
+    def _append(self, headers: dict[str, str], block: bytes) -> str:
+        offset = self._file.tell()
+        data = gzip.compress(_record(headers, block))
+        self._file.write(data)
+        self.bytes_written += len(data)
+        return f"{os.path.relpath(self._dir, EVIDENCE_DIR)}/{self._name}#{offset}"
+
+    def write_response(self, url: str, resp) -> str:
+        """Archive an HTTP response; returns its evidence pointer."""
+        if self._file is None or self._file.tell() >= self._max_bytes:
+            self.close_file()
+            self._open()
+        payload = resp.content
+        http_head = _http_headers(resp)
+        digest = _sha1(payload)
+        record_id = f"<urn:uuid:{uuid.uuid4()}>"
+        date = _warc_date()
+        headers = {
+            "WARC-Type": "response",
+            "WARC-Record-ID": record_id,
+            "WARC-Date": date,
+            "WARC-Target-URI": url,
+            "WARC-Payload-Digest": digest,
+            "Content-Type": "application/http; msgtype=response",
+        }
+        original = self._digests.get(digest) or self._new_digests.get(digest)
+        if original:
+            headers.update({
+                "WARC-Type": "revisit",
+                "WARC-Profile": REVISIT_PROFILE,
+                "WARC-Refers-To": original["record_id"],
+                "WARC-Refers-To-Target-URI": original["uri"],
+                "WARC-Refers-To-Date": original["date"],
+            })
+            block = http_head
+            self.revisits += 1
+        else:
+            block = http_head + payload
+            self.responses += 1
+        headers["WARC-Block-Digest"] = _sha1(block)
+        pointer = self._append(headers, block)
+        if not original:
+            self._new_digests[digest] = {"record_id": record_id, "uri": url,
+                                         "date": date, "pointer": pointer}
+        self._new_urls[url] = pointer
+        return pointer
+
+    def pointer_for(self, url: str) -> str | None:
+        """Evidence pointer of the latest record archived for ``url``."""
+        return self._new_urls.get(url) or self._urls.get(url)
+
+    def stats(self) -> dict:
+        return {"responses": self.responses, "revisits": self.revisits,
+                "bytes_written": self.bytes_written}
+
+    def close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        """Close the current file and merge this run's records into the index."""
+        self.close_file()
+        if not self._new_digests and not self._new_urls:
+            return
+        # Re-read so concurrent shards/workers do not drop each other's records
+        digests, urls = self._load_index()
+        for digest, original in self._new_digests.items():
+            digests.setdefault(digest, original)
+        urls.update(self._new_urls)
+        tmp = f"{self._index_path()}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "digests": digests, "urls": urls},
+                          f, ensure_ascii=False)
+            os.replace(tmp, self._index_path())
+        except OSError as e:
+            logger.warning("WARC index write failed: %s", e)
+        self._digests, self._urls = digests, urls
+        self._new_digests, self._new_urls = {}, {}
+
+
+def read_record(pointer: str, evidence_dir: str = EVIDENCE_DIR) -> tuple[dict[str, str], bytes]:
+    """Read the WARC record at an evidence pointer. Returns ``(headers, block)``."""
+    path, _, offset = pointer.partition("#")
+    with open(os.path.join(evidence_dir, path), "rb") as f:
+        f.seek(int(offset or 0))
+        decomp = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        data = b""
+        while not decomp.eof:
+            chunk = f.read(65536)
+            if not chunk:
+                break
+            data += decomp.decompress(chunk)
+    head, _, rest = data.partition(b"\r\n\r\n")
+    headers = {}
+    for line in head.decode("utf-8").split("\r\n")[1:]:
+        name, _, value = line.partition(": ")
+        headers[name] = value
+    return headers, rest[:int(headers.get("Content-Length", len(rest)))]
+
+
+def read_payload(pointer: str, evidence_dir: str = EVIDENCE_DIR) -> bytes:
+    """HTTP body archived at ``pointer``, following revisit records."""
+    headers, block = read_record(pointer, evidence_dir)
+    if headers.get("WARC-Type") == "revisit":
+        index_path = os.path.join(evidence_dir, os.path.dirname(pointer.partition("#")[0]),
+                                  INDEX_NAME)
+        with open(index_path, "r", encoding="utf-8") as f:
+            original = json.load(f)["digests"][headers["WARC-Payload-Digest"]]
+        headers, block = read_record(original["pointer"], evidence_dir)
+    return block.partition(b"\r\n\r\n")[2]
@@ -0,0 +1,113 @@
+"""File-based (SQLite) work queue of crawl domains with expiring leases."""
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+
+from .config import OUTPUT_DIR
+
+QUEUE_PATH = os.path.join(OUTPUT_DIR, "queue.sqlite")
+DEFAULT_LEASE_SECONDS = 30 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    domain        TEXT PRIMARY KEY,
+    status        TEXT NOT NULL DEFAULT 'pending',  -- pending | leased | done
+    owner         TEXT,
+    lease_expires REAL,
+    attempts      INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+"""
+
+
+class WorkQueue:
+    """Domains to crawl, leased to workers in batches.
+
+    A lease that is not completed before it expires (e.g. the worker
+    crashed) makes the domain available again, so no domain is lost. Live
+    workers ``renew`` their leases as they go, so no two of them crawl the
+    same domain however long a batch takes.
+    """
+
+    def __init__(self, path: str = QUEUE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def enqueue(self, domains: set[str], reset: bool = False) -> int:
+        """Add domains as pending; finished ones are queued again, leased ones left alone.
+
+        With ``reset``, the queue is emptied first, which also drops domains
+        no longer given and releases current leases.
+        """
+        before = self._conn.total_changes
+        self._conn.execute("BEGIN IMMEDIATE")
+        if reset:
+            self._conn.execute("DELETE FROM tasks")
+        self._conn.executemany(
+            "INSERT INTO tasks (domain) VALUES (?) ON CONFLICT (domain) DO UPDATE SET "
+            "status = 'pending', owner = NULL, lease_expires = NULL, attempts = 0 "
+            "WHERE status = 'done'",
+            [(d,) for d in sorted(domains)],
+        )
+        self._conn.execute("COMMIT")
+        return self._conn.total_changes - before
+
+    def lease(self, owner: str, batch_size: int = 10,
+              lease_seconds: float = DEFAULT_LEASE_SECONDS) -> list[str]:
+        """Atomically lease up to ``batch_size`` pending or expired domains."""
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._conn.execute(
+                "SELECT domain FROM tasks WHERE status = 'pending' "
+                "OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY attempts, domain LIMIT ?",
+                (now, batch_size),
+            ).fetchall()
+            domains = [r[0] for r in rows]
+            self._conn.executemany(
+                "UPDATE tasks SET status = 'leased', owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE domain = ?",
+                [(owner, now + lease_seconds, d) for d in domains],
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return domains
+
+    def renew(self, owner: str, domains: list[str],
+              lease_seconds: float = DEFAULT_LEASE_SECONDS) -> list[str]:
+        """Extend ``owner``'s leases; returns the domains it no longer holds."""
+        expires = time.time() + lease_seconds
+        lost = []
+        for domain in domains:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET lease_expires = ? "
+                "WHERE domain = ? AND owner = ? AND status = 'leased'",
+                (expires, domain, owner))
+            if cursor.rowcount == 0:
+                lost.append(domain)
+        return lost
+
+    def complete(self, owner: str, domains: list[str]) -> int:
+        """Mark domains done (only if still leased by ``owner``); returns how many were."""
+        before = self._conn.total_changes
+        self._conn.executemany(
+            "UPDATE tasks SET status = 'done', lease_expires = NULL "
+            "WHERE domain = ? AND owner = ? AND status = 'leased'",
+            [(d, owner) for d in domains],
+        )
+        return self._conn.total_changes - before
+
+    def counts(self) -> dict[str, int]:
+        rows = self._conn.execute(
+            "SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return {status: n for status, n in rows}
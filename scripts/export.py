@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Export the dataset to a columnar format for analytics.
+
+Usage:
+    python scripts/export.py                     # Arrow IPC (memory-mappable)
+    python scripts/export.py --format parquet    # Parquet
+    python scripts/export.py --force             # Rewrite every partition
+
+Output layout (under exports/<format>/):
+    entries/year=<YYYY>.<ext>   one row per entry, categorical columns
+    sources/year=<YYYY>.<ext>   one row per source, joined on (year, row_id)
+    google_trends.<ext>         monthly Google Trends interest per term
+
+Only partitions whose data/<year>.jsonl changed since the last export are
+rewritten.
+"""
+
+import argparse
+import logging
+import sys
+
+from crawl.config import EXPORT_DIR
+from crawl.export import FORMATS, export_dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export data/*.jsonl and Google Trends data to Arrow/Parquet",
+    )
+    parser.add_argument(
+        "--format", choices=FORMATS, default="arrow",
+        help="Output format (default: arrow)",
+    )
+    parser.add_argument(
+        "--output-dir", type=str, default=EXPORT_DIR,
+        help="Export root directory (default: exports/)",
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Rewrite all partitions even if unchanged",
+    )
+    parser.add_argument(
+        "--verbose", "-v", action="store_true",
+        help="Enable verbose/debug logging",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s",
+        datefmt="%H:%M:%S",
+    )
+
+    try:
+        result = export_dataset(export_dir=args.output_dir, fmt=args.format,
+                                force=args.force)
+    except ImportError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Written:   {', '.join(result['written']) or '-'}")
+    print(f"Unchanged: {', '.join(result['unchanged']) or '-'}")
+    if result["removed"]:
+        print(f"Removed:   {', '.join(result['removed'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Build the site's sharded full-text search index.
+
+Reads every data partition (plain or compacted) through crawl.datastore
+and writes site/public/search/:
+
+  manifest.json      entry count, per-entry column ("c"/"l"/"b"), shard keys
+  docs-<n>.json      entries in display order (newest first), DOC_CHUNK per file
+  t-<hex>.json       {token: [entry ids]} for tokens starting with one prefix
+
+entity_name, exact_phrase, platform and notes are indexed. Words are
+lowercased and matched by prefix; CJK text, which has no spaces, is
+indexed as single characters and overlapping bigrams, so a query such
+as 春节 matches inside a longer phrase. Shards are keyed by a token's
+first two characters (first one for CJK), so the site fetches only the
+shards and entry chunks a query touches. Uses only the Python standard
+library.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import unicodedata
+
+from crawl.columns import column
+from crawl.datastore import DataStore
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+OUTPUT_DIR = os.path.join(ROOT_DIR, "site", "public", "search")
+
+INDEX_VERSION = 1
+DOC_CHUNK = 100
+FIELDS = ("entity_name", "exact_phrase", "platform", "notes")
+
+# Kana, CJK ideographs and Hangul; keep in sync with site/src/scripts/app.ts
+CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+TOKEN_RE = re.compile(f"[{CJK}]+|[^\\W_{CJK}]+")
+CJK_RE = re.compile(f"[{CJK}]")
+
+
+def tokenize(text):
+    """Lowercased words; CJK runs become their characters and bigrams."""
+    tokens = []
+    for run in TOKEN_RE.findall(unicodedata.normalize("NFKC", text).lower()):
+        if CJK_RE.match(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def shard_key(token):
+    return token[:1] if CJK_RE.match(token) else token[:2]
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def build(store):
+    # Display order: newest captured_on first, newer partitions first on ties
+    entries = []
+    for year in sorted(store.years(), reverse=True):
+        entries.extend(store.iter_entries(year))
+    entries.sort(key=lambda e: e.get("captured_on", ""), reverse=True)
+
+    shards = {}
+    for doc_id, entry in enumerate(entries):
+        tokens = set()
+        for field in FIELDS:
+            value = entry.get(field)
+            if isinstance(value, str):
+                tokens.update(tokenize(value))
+        for token in tokens:
+            shards.setdefault(shard_key(token), {}).setdefault(token, []).append(doc_id)
+    return entries, shards
+
+
+def shard_name(key):
+    return f"t-{key.encode('utf-8').hex()}.json"
+
+
+def write_json(path, obj):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def main():
+    output = sys.argv[1] if len(sys.argv) > 1 else OUTPUT_DIR
+    store = DataStore()
+    inputs = {str(year): file_sha256(store.source_path(year)) for year in store.years()}
+    manifest_path = os.path.join(output, "manifest.json")
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == INDEX_VERSION and manifest.get("inputs") == inputs:
+                print(f"Search index up to date: {os.path.relpath(output, ROOT_DIR)}")
+                return
+        except (OSError, json.JSONDecodeError):
+            pass
+
+    entries, shards = build(store)
+    os.makedirs(output, exist_ok=True)
+    for stale in glob.glob(os.path.join(output, "t-*.json")) + glob.glob(
+            os.path.join(output, "docs-*.json")):
+        os.remove(stale)
+    for n in range(0, len(entries), DOC_CHUNK):
+        write_json(os.path.join(output, f"docs-{n // DOC_CHUNK}.json"),
+                   entries[n:n + DOC_CHUNK])
+    for key, postings in shards.items():
+        write_json(os.path.join(output, shard_name(key)), postings)
+    write_json(manifest_path, {
+        "version": INDEX_VERSION,
+        "inputs": inputs,
+        "total": len(entries),
+        "doc_chunk": DOC_CHUNK,
+        "columns": "".join(column(e) for e in entries),
+        "shards": sorted(shards),
+    })
+    print(f"Wrote {os.path.relpath(output, ROOT_DIR)}: {len(entries)} entry/entries, "
+          f"{len(shards)} shard(s).")
+
+
+if __name__ == "__main__":
+    main()
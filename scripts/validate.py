@@ -1,19 +1,34 @@
 #!/usr/bin/env python3
 """Validate JSONL data files against the project schema.
 
+Duplicates are detected across entity-name variants ("Apple" and
+"Apple Inc." with the same first source URL). Compacted years
+(data/<year>.jsonl.gz, see scripts/compact.py) are checked against their
+block table.
+
+With --profile cpu|mem|both, the run is profiled per stage (see
+scripts/crawl/profiling.py) into scripts/crawl/output/validate_profile.*.
+
 Uses only the Python standard library. Exit code 0 on success, 1 on any error.
 """
 
+import argparse
 import json
 import glob
+import gzip
 import os
 import re
 import sys
 
+from crawl.config import OUTPUT_DIR
+from crawl.entities import DedupKeys
+from crawl.profiling import MODES, Profiler
+
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.dirname(SCRIPT_DIR)
 SCHEMA_PATH = os.path.join(ROOT_DIR, "data", "schema.json")
-DATA_GLOB = os.path.join(ROOT_DIR, "data", "*.jsonl")
+DATA_GLOBS = (os.path.join(ROOT_DIR, "data", "*.jsonl"),
+              os.path.join(ROOT_DIR, "data", "*.jsonl.gz"))
 
 URL_RE = re.compile(r"^https?://\S+$")
 DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
@@ -94,45 +109,104 @@ def validate_entry(entry, schema, errors, filename, line_num):
                     errors.append(f"{sp}: unexpected keys {extra}")
 
 
+def open_data_file(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def check_archive(filepath, lines, errors):
+    """Compare a compacted year with its data/<year>.blocks.json block table."""
+    filename = os.path.relpath(filepath, ROOT_DIR)
+    plain = filepath[:-len(".gz")]
+    if os.path.exists(plain):
+        errors.append(f"{filename}: {os.path.basename(plain)} also exists; "
+                      f"an archived year must not have a plain partition")
+    sidecar = filepath[:-len(".jsonl.gz")] + ".blocks.json"
+    if not os.path.exists(sidecar):
+        errors.append(f"{filename}: missing block table {os.path.basename(sidecar)}")
+        return
+    with open(sidecar, "r", encoding="utf-8") as f:
+        table = json.load(f)
+    if table.get("entries") != lines:
+        errors.append(f"{filename}: block table lists {table.get('entries')} "
+                      f"entries, archive has {lines}")
+    blocks = table.get("blocks", [])
+    end = blocks[-1][0] + blocks[-1][1] if blocks else 0
+    if end != os.path.getsize(filepath):
+        errors.append(f"{filename}: block table does not cover the whole archive")
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Validate data/ against the schema")
+    parser.add_argument("--profile", choices=MODES, default=None,
+                        help="Profile CPU, memory or both per stage")
+    args = parser.parse_args()
+    profiler = Profiler(args.profile, output_dir=OUTPUT_DIR, name="validate")
+    profiler.start()
+    try:
+        validate(profiler.stage)
+    finally:
+        for path in profiler.stop():
+            print(f"Profile: {os.path.relpath(path)}")
+
+
+def validate(stage):
     if not os.path.exists(SCHEMA_PATH):
         print(f"ERROR: schema not found at {SCHEMA_PATH}", file=sys.stderr)
         sys.exit(1)
 
-    schema = load_schema(SCHEMA_PATH)
-    jsonl_files = sorted(glob.glob(DATA_GLOB))
+    with stage("load_schema"):
+        schema = load_schema(SCHEMA_PATH)
+    jsonl_files = sorted(p for pattern in DATA_GLOBS for p in glob.glob(pattern))
 
     if not jsonl_files:
         print("WARNING: no JSONL files found in data/")
         sys.exit(0)
 
     errors = []
-    seen = set()
+    seen = DedupKeys()
 
     for filepath in jsonl_files:
         filename = os.path.relpath(filepath, ROOT_DIR)
-        with open(filepath, "r", encoding="utf-8") as f:
+        lines = 0
+        with open_data_file(filepath) as f:
             for line_num, line in enumerate(f, start=1):
                 line = line.strip()
                 if not line:
                     continue
+                lines += 1
                 try:
-                    entry = json.loads(line)
+                    with stage("parse"):
+                        entry = json.loads(line)
                 except json.JSONDecodeError as e:
                     errors.append(f"{filename}:{line_num}: invalid JSON: {e}")
                     continue
 
-                validate_entry(entry, schema, errors, filename, line_num)
+                with stage("validate"):
+                    validate_entry(entry, schema, errors, filename, line_num)
 
                 sources = entry.get("sources", [])
                 first_url = sources[0]["url"] if sources else None
-                dup_key = (entry.get("entity_name"), first_url)
-                if dup_key in seen:
+                dup_key = (entry.get("entity_name") or "", first_url)
+                with stage("dedup"):
+                    original = seen.match(dup_key)
+                if original is None:
+                    seen.add(dup_key)
+                elif original[0] == dup_key[0]:
                     errors.append(
                         f"{filename}:{line_num}: duplicate entry "
                         f"(entity_name={dup_key[0]!r}, sources[0].url={dup_key[1]!r})"
                     )
-                seen.add(dup_key)
+                else:
+                    errors.append(
+                        f"{filename}:{line_num}: duplicate entry "
+                        f"(entity_name={dup_key[0]!r} is a variant of {original[0]!r}, "
+                        f"sources[0].url={dup_key[1]!r})"
+                    )
+        if filepath.endswith(".gz"):
+            with stage("check_archive"):
+                check_archive(filepath, lines, errors)
 
     if errors:
         print(f"Validation failed with {len(errors)} error(s):\n", file=sys.stderr)
@@ -1,25 +1,28 @@
 import fs from 'node:fs';
 import path from 'node:path';
-import type { Entry } from '../types/entry';
+import type { Entry, Stats } from '../types/entry';
 
-export function loadEntries(): Entry[] {
-  const dataDir = path.resolve(import.meta.dirname, '../../../data');
-  const files = fs.readdirSync(dataDir).filter((f) => f.endsWith('.jsonl')).sort().reverse();
+const statsPath = path.resolve(import.meta.dirname, '../../public/stats.json');
+const searchDir = path.resolve(import.meta.dirname, '../../public/search');
 
-  const entries: Entry[] = [];
-
-  for (const file of files) {
-    const content = fs.readFileSync(path.join(dataDir, file), 'utf-8');
-    for (const line of content.split('\n')) {
-      const trimmed = line.trim();
-      if (trimmed) {
-        entries.push(JSON.parse(trimmed) as Entry);
-      }
-    }
+/** Precomputed aggregates written by scripts/aggregate.py. */
+export function loadStats(): Stats {
+  if (!fs.existsSync(statsPath)) {
+    throw new Error(`${statsPath} not found — run python scripts/aggregate.py first`);
   }
+  return JSON.parse(fs.readFileSync(statsPath, 'utf-8')) as Stats;
+}
 
-  // Sort newest first by captured_on
-  entries.sort((a, b) => b.captured_on.localeCompare(a.captured_on));
-
-  return entries;
+/** Search index manifest and first entry chunk, written by scripts/search_index.py. */
+export function loadSearchIndex(): { manifest: unknown; docs: Entry[] } {
+  const manifestPath = path.join(searchDir, 'manifest.json');
+  if (!fs.existsSync(manifestPath)) {
+    throw new Error(`${manifestPath} not found — run python scripts/search_index.py first`);
+  }
+  const manifest = JSON.parse(fs.readFileSync(manifestPath, 'utf-8')) as { total: number; inputs?: unknown };
+  // Input digests only matter to the build step
+  delete manifest.inputs;
+  const docsPath = path.join(searchDir, 'docs-0.json');
+  const docs = manifest.total > 0 ? (JSON.parse(fs.readFileSync(docsPath, 'utf-8')) as Entry[]) : [];
+  return { manifest, docs };
 }
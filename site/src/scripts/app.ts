@@ -14,22 +14,37 @@ interface Entry {
 
 type Column = 'cny' | 'lny';
 
+/** site/public/search/manifest.json, written by scripts/search_index.py. */
+interface SearchManifest {
+  version: number;
+  total: number;
+  doc_chunk: number;
+  /** Column of each entry in display order: 'c', 'l' or 'b' (both) */
+  columns: string;
+  /** Keys of the term shards t-<hex of key>.json */
+  shards: string[];
+}
+
+/** by_column of site/public/stats.json, written by scripts/aggregate.py. */
+interface ColumnCounts {
+  cny: number;
+  lny: number;
+  both: number;
+}
+
 declare global {
   interface Window {
-    __CNYVSLNY_DATA__: Entry[];
+    __CNYVSLNY_SEARCH__: { manifest: SearchManifest; docs: Entry[]; counts: ColumnCounts };
   }
 }
 
 const PAGE_SIZE = 20;
+const SEARCH_URL = `${import.meta.env.BASE_URL.replace(/\/?$/, '/')}search/`;
 
-function classifyEntry(entry: Entry): Column | 'both' {
-  const terms = Array.isArray(entry.term_used) ? entry.term_used : [entry.term_used];
-  const hasChinese = terms.some(t => /chinese/i.test(t));
-  const hasLunar = terms.some(t => /lunar/i.test(t));
-  if (hasChinese && hasLunar) return 'both';
-  if (hasLunar) return 'lny';
-  return 'cny';
-}
+// Kana, CJK ideographs and Hangul; keep in sync with scripts/search_index.py
+const CJK = '\\u3040-\\u30ff\\u3400-\\u4dbf\\u4e00-\\u9fff\\uac00-\\ud7af\\uf900-\\ufaff';
+const TOKEN_RE = new RegExp(`[${CJK}]+|(?:(?![${CJK}])[\\p{L}\\p{N}])+`, 'gu');
+const CJK_RE = new RegExp(`^[${CJK}]`, 'u');
 
 function escapeHtml(str: string): string {
   const div = document.createElement('div');
@@ -102,8 +117,99 @@ function renderCard(entry: Entry, column: Column): string {
   </div>`;
 }
 
+interface QueryToken {
+  token: string;
+  prefix: boolean;
+}
+
+/** Words match index tokens by prefix; CJK runs become exact characters or bigrams. */
+function tokenizeQuery(query: string): QueryToken[] {
+  const tokens: QueryToken[] = [];
+  for (const run of query.normalize('NFKC').toLowerCase().match(TOKEN_RE) ?? []) {
+    const chars = [...run];
+    if (!CJK_RE.test(run)) {
+      tokens.push({ token: run, prefix: true });
+    } else if (chars.length === 1) {
+      tokens.push({ token: run, prefix: false });
+    } else {
+      for (let i = 0; i + 1 < chars.length; i++) {
+        tokens.push({ token: chars[i] + chars[i + 1], prefix: false });
+      }
+    }
+  }
+  return tokens;
+}
+
+function shardFile(key: string): string {
+  const hex = Array.from(new TextEncoder().encode(key), (b) => b.toString(16).padStart(2, '0')).join('');
+  return `${SEARCH_URL}t-${hex}.json`;
+}
+
+const shardCache = new Map<string, Promise<Record<string, number[]>>>();
+const chunkCache = new Map<number, Promise<Entry[]>>();
+
+function fetchCached<K, T>(cache: Map<K, Promise<T>>, key: K, url: string): Promise<T> {
+  let pending = cache.get(key);
+  if (!pending) {
+    pending = fetch(url).then((res) => {
+      if (!res.ok) throw new Error(`${url}: HTTP ${res.status}`);
+      return res.json() as Promise<T>;
+    });
+    // Let a failed request be retried by the next search
+    pending.catch(() => cache.delete(key));
+    cache.set(key, pending);
+  }
+  return pending;
+}
+
+/** Sorted ids of the entries containing `query.token` (or a word it prefixes). */
+async function tokenPostings(manifest: SearchManifest, query: QueryToken): Promise<number[]> {
+  const chars = [...query.token];
+  // Shards are keyed by a token's first two characters (one for CJK); a
+  // one-letter prefix needs every shard starting with that letter
+  const keys = CJK_RE.test(query.token)
+    ? [chars[0]]
+    : chars.length >= 2
+      ? [chars.slice(0, 2).join('')]
+      : manifest.shards.filter((k) => k.startsWith(query.token));
+  const available = new Set(manifest.shards);
+  const shards = await Promise.all(
+    keys.filter((k) => available.has(k)).map((k) => fetchCached(shardCache, k, shardFile(k))),
+  );
+  const ids = new Set<number>();
+  for (const shard of shards) {
+    for (const [token, postings] of Object.entries(shard)) {
+      if (query.prefix ? token.startsWith(query.token) : token === query.token) {
+        for (const id of postings) ids.add(id);
+      }
+    }
+  }
+  return [...ids].sort((a, b) => a - b);
+}
+
+/** Ids (display order) of entries matching every query token, or null for no query. */
+async function search(manifest: SearchManifest, query: string): Promise<number[] | null> {
+  const tokens = tokenizeQuery(query);
+  if (tokens.length === 0) return null;
+  const lists = await Promise.all(tokens.map((t) => tokenPostings(manifest, t)));
+  lists.sort((a, b) => a.length - b.length);
+  const rest = lists.slice(1).map((l) => new Set(l));
+  return lists[0].filter((id) => rest.every((set) => set.has(id)));
+}
+
+/** Entries by id, fetching the docs-<n>.json chunks not loaded yet. */
+async function fetchEntries(manifest: SearchManifest, ids: number[]): Promise<Entry[]> {
+  const chunks = [...new Set(ids.map((id) => Math.floor(id / manifest.doc_chunk)))];
+  const loaded = new Map<number, Entry[]>();
+  await Promise.all(
+    chunks.map(async (n) => loaded.set(n, await fetchCached(chunkCache, n, `${SEARCH_URL}docs-${n}.json`))),
+  );
+  return ids.map((id) => loaded.get(Math.floor(id / manifest.doc_chunk))![id % manifest.doc_chunk]);
+}
+
 function init() {
-  const allEntries: Entry[] = window.__CNYVSLNY_DATA__ || [];
+  const { manifest, docs, counts } = window.__CNYVSLNY_SEARCH__;
+  chunkCache.set(0, Promise.resolve(docs));
   const searchInput = document.getElementById('search-input') as HTMLInputElement;
   const cnyCards = document.getElementById('cny-cards')!;
   const lnyCards = document.getElementById('lny-cards')!;
@@ -115,67 +221,70 @@ function init() {
   const cnyColumn = document.getElementById('cny-column')!;
   const lnyColumn = document.getElementById('lny-column')!;
 
-  let cnyFiltered: Entry[] = [];
-  let lnyFiltered: Entry[] = [];
+  let cnyFiltered: number[] = [];
+  let lnyFiltered: number[] = [];
   let cnyPage = 0;
   let lnyPage = 0;
   let cnyObserver: IntersectionObserver | null = null;
   let lnyObserver: IntersectionObserver | null = null;
+  // Pages render in order per column; a reset discards renders still loading
+  let generation = 0;
+  let cnyRendering = Promise.resolve();
+  let lnyRendering = Promise.resolve();
 
-  function filterEntries(query: string) {
-    const q = query.toLowerCase();
-    const filtered = q
-      ? allEntries.filter((e) =>
-          e.entity_name.toLowerCase().includes(q) ||
-          e.exact_phrase.toLowerCase().includes(q) ||
-          e.platform.toLowerCase().includes(q) ||
-          (e.notes && e.notes.toLowerCase().includes(q))
-        )
-      : allEntries;
-
+  function filterEntries(ids: number[] | null) {
     cnyFiltered = [];
     lnyFiltered = [];
-    for (const entry of filtered) {
-      const col = classifyEntry(entry);
-      if (col === 'both') {
-        cnyFiltered.push(entry);
-        lnyFiltered.push(entry);
-      } else if (col === 'cny') {
-        cnyFiltered.push(entry);
-      } else {
-        lnyFiltered.push(entry);
-      }
+    const count = ids ? ids.length : manifest.total;
+    for (let i = 0; i < count; i++) {
+      const id = ids ? ids[i] : i;
+      const col = manifest.columns[id];
+      if (col !== 'l') cnyFiltered.push(id);
+      if (col !== 'c') lnyFiltered.push(id);
     }
   }
 
   function renderPage(column: Column) {
-    const entries = column === 'cny' ? cnyFiltered : lnyFiltered;
+    const ids = column === 'cny' ? cnyFiltered : lnyFiltered;
     const page = column === 'cny' ? cnyPage : lnyPage;
     const container = column === 'cny' ? cnyCards : lnyCards;
     const start = page * PAGE_SIZE;
-    const end = Math.min(start + PAGE_SIZE, entries.length);
-
-    if (start >= entries.length) return;
+    const end = Math.min(start + PAGE_SIZE, ids.length);
 
-    const fragment = document.createDocumentFragment();
-    for (let i = start; i < end; i++) {
-      const wrapper = document.createElement('div');
-      wrapper.innerHTML = renderCard(entries[i], column);
-      fragment.appendChild(wrapper.firstElementChild!);
-    }
-    container.appendChild(fragment);
+    if (start >= ids.length) return;
 
     if (column === 'cny') {
       cnyPage++;
     } else {
       lnyPage++;
     }
+
+    const gen = generation;
+    const entries = fetchEntries(manifest, ids.slice(start, end));
+    const render = async (previous: Promise<void>) => {
+      await previous;
+      const loaded = await entries;
+      if (gen !== generation) return;
+      const fragment = document.createDocumentFragment();
+      for (const entry of loaded) {
+        const wrapper = document.createElement('div');
+        wrapper.innerHTML = renderCard(entry, column);
+        fragment.appendChild(wrapper.firstElementChild!);
+      }
+      container.appendChild(fragment);
+    };
+    const done = (previous: Promise<void>) => render(previous).catch((err) => console.error(err));
+    if (column === 'cny') {
+      cnyRendering = done(cnyRendering);
+    } else {
+      lnyRendering = done(lnyRendering);
+    }
   }
 
   function hasMore(column: Column): boolean {
-    const entries = column === 'cny' ? cnyFiltered : lnyFiltered;
+    const ids = column === 'cny' ? cnyFiltered : lnyFiltered;
     const page = column === 'cny' ? cnyPage : lnyPage;
-    return page * PAGE_SIZE < entries.length;
+    return page * PAGE_SIZE < ids.length;
   }
 
   function setupObserver(column: Column) {
@@ -202,7 +311,11 @@ function init() {
     return observer;
   }
 
-  function reset() {
+  /** Re-render both columns; counts are precomputed unless `searching`. */
+  function reset(searching: boolean) {
+    generation++;
+    cnyRendering = Promise.resolve();
+    lnyRendering = Promise.resolve();
     cnyCards.innerHTML = '';
     lnyCards.innerHTML = '';
     cnyPage = 0;
@@ -211,9 +324,11 @@ function init() {
     if (cnyObserver) cnyObserver.disconnect();
     if (lnyObserver) lnyObserver.disconnect();
 
-    cnyCount.textContent = String(cnyFiltered.length);
-    lnyCount.textContent = String(lnyFiltered.length);
-    totalCount.textContent = `${cnyFiltered.length + lnyFiltered.length} entries collected`;
+    const cnyTotal = searching ? cnyFiltered.length : counts.cny + counts.both;
+    const lnyTotal = searching ? lnyFiltered.length : counts.lny + counts.both;
+    cnyCount.textContent = String(cnyTotal);
+    lnyCount.textContent = String(lnyTotal);
+    totalCount.textContent = `${cnyTotal + lnyTotal} entries collected`;
 
     renderPage('cny');
     renderPage('lny');
@@ -222,19 +337,27 @@ function init() {
     lnyObserver = setupObserver('lny');
   }
 
-  // Debounced search
+  // Debounced search; only the latest query's results are shown
   let debounceTimer: ReturnType<typeof setTimeout>;
+  let searchSeq = 0;
   searchInput.addEventListener('input', () => {
     clearTimeout(debounceTimer);
-    debounceTimer = setTimeout(() => {
-      filterEntries(searchInput.value.trim());
-      reset();
+    debounceTimer = setTimeout(async () => {
+      const seq = ++searchSeq;
+      try {
+        const ids = await search(manifest, searchInput.value.trim());
+        if (seq !== searchSeq) return;
+        filterEntries(ids);
+        reset(ids !== null);
+      } catch (err) {
+        console.error(err);
+      }
     }, 200);
   });
 
   // Initial render
-  filterEntries('');
-  reset();
+  filterEntries(null);
+  reset(false);
 }
 
 document.addEventListener('DOMContentLoaded', init);
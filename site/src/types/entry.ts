@@ -12,6 +12,29 @@ export interface Entry {
   notes?: string;
 }
 
+export interface ColumnCounts {
+  cny: number;
+  lny: number;
+  both: number;
+}
+
+export interface Stats {
+  inputs: Record<string, string>;
+  total_entries: number;
+  by_term: Record<string, number>;
+  /** Entries per home page column; `both` entries appear in each */
+  by_column: ColumnCounts;
+  counts: {
+    dimensions: ['term', 'entity_type', 'country_or_region', 'context', 'count'];
+    rows: [string, string, string, string, number][];
+  };
+  timeseries: {
+    month: string;
+    entries: Record<string, number>;
+    trends: { lunar_new_year: number; chinese_new_year: number } | null;
+  }[];
+}
+
 export type Column = 'cny' | 'lny';
 
 export function classifyEntry(entry: Entry): Column | 'both' {